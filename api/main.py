@@ -1,18 +1,23 @@
 # api/main.py — Crypto ML API (Secure)
 
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+from typing import Optional
 from src.live_trading_engine import predict_and_trade
-from src.position_manager import position_state
+from src.position_manager import get_position_state
+from src.aggregate_cache import get_aggregate_cache
 from src.config import API_TOKEN
-import pandas as pd
-import os
+from src.daemon import get_daemon
+from src.accuracy_tracker import AccuracyTracker
+from src import metrics
 
 app = FastAPI(title="Crypto ML API")
 
 class PredictResponse(BaseModel):
     signal: str
     confidence: float
+    candle_time: Optional[str] = None
 
 def verify_token(request: Request):
     token = request.headers.get("Authorization")
@@ -23,16 +28,61 @@ def verify_token(request: Request):
 def root():
     return {"status": "Crypto ML API is live!"}
 
+@app.get("/health")
+def health():
+    # Liveness probe for alert_manager: constant time, no model, no exchange calls, no secrets
+    daemon = get_daemon()
+    return {"status": "ok", "daemon": daemon is not None,
+            "candles_warm": bool(daemon and daemon.candles.is_warm)}
+
 @app.get("/predict", response_model=PredictResponse)
 def predict(request: Request):
     verify_token(request)
+    daemon = get_daemon()
+    if daemon is not None:
+        # The live loop already scored (and logged) the latest closed candle: serve that result
+        # rather than predicting again, which would log the candle twice
+        if daemon.last_result is None:
+            raise HTTPException(status_code=503, detail="No candle scored yet")
+        return daemon.last_result
     signal, confidence = predict_and_trade(return_result=True)
     return {"signal": signal, "confidence": confidence}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Unauthenticated like a typical scrape target; exposes timings and counts only
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/accuracy")
+def accuracy(request: Request):
+    verify_token(request)
+    return AccuracyTracker.load().metrics()
+
+# === Daemon control (only available when running under `python main.py --daemon`) ===
+def require_daemon():
+    daemon = get_daemon()
+    if daemon is None:
+        raise HTTPException(status_code=503, detail="Daemon not running")
+    return daemon
+
+@app.get("/status")
+def status(request: Request):
+    verify_token(request)
+    return require_daemon().status()
+
+@app.post("/jobs/{name}")
+def run_job(name: str, request: Request):
+    verify_token(request)
+    daemon = require_daemon()
+    if name not in daemon.runtime.jobs:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {name}")
+    return {"job": name, "started": daemon.runtime.submit(name, reason="api")}
+
 @app.get("/dashboard-data")
 def dashboard_data(request: Request):
     verify_token(request)
 
+    position_state = get_position_state()
     data = {
         "last_signal": position_state["type"] or "None",
         "is_open": position_state["is_open"],
@@ -41,10 +91,8 @@ def dashboard_data(request: Request):
         "cooldown_until": str(position_state["cooldown_until"]) if position_state["cooldown_until"] else "None",
     }
 
-    if os.path.exists("logs/virtual_positions.csv"):
-        df = pd.read_csv("logs/virtual_positions.csv")
-        if not df.empty:
-            last_pnl = df['pnl_percent'].iloc[-1]
-            data["last_pnl"] = round(last_pnl, 2)
+    last_trade = get_aggregate_cache().last_trade()
+    if last_trade:
+        data["last_pnl"] = round(float(last_trade["pnl_percent"]), 2)
 
     return data
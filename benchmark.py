@@ -0,0 +1,392 @@
+# benchmark.py — Offline hot-path benchmarks on synthetic data
+#
+#   python benchmark.py run [--sizes 10000,100000,1000000] [--repeat 3] [--only indicators]
+#   python benchmark.py compare logs/benchmarks/old.json logs/benchmarks/new.json [--threshold 0.15]
+#   python benchmark.py importtime [--module main] [--top 15]
+#   python benchmark.py sentiment [--scorers textblob,vader,transformer] [--workers 1,4] [--n 5000]
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(REPO_ROOT, "logs", "benchmarks")
+sys.path.insert(0, REPO_ROOT)
+
+
+@contextmanager
+def quiet():
+    """Silence stdout at the file-descriptor level (also hides `clear` from the dashboard)."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with quiet():
+            func()
+        times.append(time.perf_counter() - start)
+    return {"median_s": round(statistics.median(times), 6), "min_s": round(min(times), 6)}
+
+
+# === Benchmark definitions: name → (setup returning a zero-arg callable, items processed) ===
+def bench_indicators(n):
+    from src.feature_engineering import add_technical_indicators
+    from src.synthetic_data import generate_ohlcv
+    df = generate_ohlcv(n)
+    return lambda: add_technical_indicators(df), n
+
+def bench_prepare_data(n):
+    from src.feature_engineering import add_technical_indicators, merge_sentiment
+    from src.model_trainer import prepare_data
+    from src.synthetic_data import generate_ohlcv, FEATURES
+    df = merge_sentiment(add_technical_indicators(generate_ohlcv(n)))
+    return lambda: prepare_data(df, feature_cols=FEATURES), n
+
+def _fixture_inputs(n_windows):
+    import numpy as np
+    from keras.models import load_model
+    from src.synthetic_data import build_fixture_artifacts
+    model_path, _ = build_fixture_artifacts()
+    model = load_model(model_path)
+    X = np.random.default_rng(0).uniform(0, 1, (n_windows, 10, 4)).astype("float32")
+    return model, X
+
+def bench_inference_single(reps=50):
+    model, X = _fixture_inputs(1)
+    return lambda: [model.predict(X, verbose=0) for _ in range(reps)], reps
+
+def bench_inference_batched(n_windows=1_000):
+    model, X = _fixture_inputs(n_windows)
+    return lambda: model.predict(X, batch_size=256, verbose=0), n_windows
+
+def bench_backtest(n=1_500):
+    from src.backtest_engine import run_backtest
+    from src.synthetic_data import build_fixture_artifacts, generate_ohlcv
+    model_path, scaler_path = build_fixture_artifacts()
+    ohlcv = generate_ohlcv(n)
+    return lambda: run_backtest(model_path=model_path, scaler_path=scaler_path,
+                                ohlcv=ohlcv, save_to_file=False), n
+
+def bench_event_backtest(n=1_000_000):
+    import numpy as np
+    from src.event_backtest import run_event_backtest
+    from src.synthetic_data import generate_ohlcv
+    df = generate_ohlcv(n)
+    df["signal"] = np.where(np.random.default_rng(0).uniform(size=n) < 0.5, "LONG", "SHORT")
+    return lambda: run_event_backtest(df, save_to_file=False), n
+
+def bench_bootstrap(n=1_000):
+    import numpy as np
+    from src.analytics import BOOTSTRAP_RESAMPLES, block_bootstrap
+    returns = np.random.default_rng(0).normal(0.001, 0.01, n)
+    return lambda: block_bootstrap(returns), BOOTSTRAP_RESAMPLES
+
+def bench_log_append(n=500):
+    from src.utils import log_prediction
+    return lambda: [log_prediction("LONG", 0.71, 28.5, 30_000.0) for _ in range(n)], n
+
+def _write_logs(n):
+    from src.synthetic_data import generate_confidence_log, generate_virtual_positions
+    os.makedirs("logs", exist_ok=True)
+    generate_virtual_positions(n).to_csv("logs/virtual_positions.csv", index=False)
+    generate_confidence_log(n).to_csv("logs/confidence_log.csv", index=False)
+
+def _forget_aggregates():
+    # As on a first run: no persisted aggregates, no in-process cache, no reports yet
+    import shutil
+    import src.aggregate_cache as aggregate_cache
+    from src.report_generator import REPORTS_DIR
+    aggregate_cache._cache = None
+    if os.path.exists(aggregate_cache.AGGREGATE_PATH):
+        os.remove(aggregate_cache.AGGREGATE_PATH)
+    shutil.rmtree(REPORTS_DIR, ignore_errors=True)
+
+def _cold_and_warm(view):
+    """
+    (cold, warm) setups for an aggregate-backed view. Cold re-reads the whole log every call;
+    warm is the steady state after a first call, with nothing appended since.
+    """
+    def cold(n):
+        _write_logs(n)
+        def call():
+            _forget_aggregates()
+            view()
+        return call, n
+
+    def warm(n):
+        _write_logs(n)
+        _forget_aggregates()
+        view()
+        return view, n
+
+    return cold, warm
+
+def _dashboard():
+    from src.cli_dashboard import display_dashboard
+    display_dashboard()
+
+def _daily_report():
+    from src.report_generator import generate_daily_report
+    generate_daily_report()
+
+def _daily_summary_log():
+    from src.utils import generate_daily_summary_log
+    generate_daily_summary_log()
+
+def _trade_headline():
+    from src.trade_analyzer import analyze_performance
+    analyze_performance(full=False)
+
+bench_dashboard_cold, bench_dashboard_warm = _cold_and_warm(_dashboard)
+bench_daily_report_cold, bench_daily_report_warm = _cold_and_warm(_daily_report)
+bench_daily_summary_log_cold, bench_daily_summary_log_warm = _cold_and_warm(_daily_summary_log)
+bench_trade_headline_cold, bench_trade_headline_warm = _cold_and_warm(_trade_headline)
+
+def bench_trade_analyzer(n):
+    # Full analysis reads the whole log on every call: there is no warm path to separate
+    from src.trade_analyzer import analyze_performance
+    _write_logs(n)
+    return analyze_performance, n
+
+def build_suite(sizes):
+    suite = [
+        ("indicators_10k", lambda: bench_indicators(10_000)),
+        ("indicators_100k", lambda: bench_indicators(100_000)),
+        ("prepare_data_10k", lambda: bench_prepare_data(10_000)),
+        ("inference_single_window", bench_inference_single),
+        ("inference_batched_1k", bench_inference_batched),
+        ("backtest_full_1500", bench_backtest),
+        ("event_backtest_1m", bench_event_backtest),
+        ("bootstrap_10k_resamples", bench_bootstrap),
+        ("log_append_500", bench_log_append),
+    ]
+    for n in sizes:
+        label = f"{n // 1000}k" if n < 1_000_000 else f"{n // 1_000_000}m"
+        suite += [
+            (f"dashboard_{label}_cold", lambda n=n: bench_dashboard_cold(n)),
+            (f"dashboard_{label}_warm", lambda n=n: bench_dashboard_warm(n)),
+            (f"daily_report_{label}_cold", lambda n=n: bench_daily_report_cold(n)),
+            (f"daily_report_{label}_warm", lambda n=n: bench_daily_report_warm(n)),
+            (f"trade_analyzer_{label}", lambda n=n: bench_trade_analyzer(n)),
+            (f"trade_headline_{label}_cold", lambda n=n: bench_trade_headline_cold(n)),
+            (f"trade_headline_{label}_warm", lambda n=n: bench_trade_headline_warm(n)),
+            (f"daily_summary_log_{label}_cold", lambda n=n: bench_daily_summary_log_cold(n)),
+            (f"daily_summary_log_{label}_warm", lambda n=n: bench_daily_summary_log_warm(n)),
+        ]
+    return suite
+
+
+# === Commands ===
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    out = os.path.abspath(args.out) if args.out else \
+        os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="cfml_bench_")
+    os.chdir(workdir)   # Every relative logs/ and models/ path lands in the scratch dir
+
+    for name, setup in build_suite(sizes):
+        if args.only and args.only not in name:
+            continue
+        try:
+            with quiet():
+                func, items = setup()
+            result = measure(func, args.repeat)
+            result["items"] = items
+            result["items_per_s"] = round(items / result["median_s"], 2) if result["median_s"] else None
+            print(f"⏱️ {name:<28} {result['median_s']:>10.4f}s  ({result['items_per_s']} items/s)")
+        except ImportError as e:
+            result = {"skipped": f"missing dependency: {e.name}"}
+            print(f"⏭️ {name:<28} skipped ({result['skipped']})")
+        except Exception as e:
+            result = {"failed": str(e)}
+            print(f"❌ {name:<28} failed: {e}")
+        results[name] = result
+
+    commit = subprocess.getoutput(f"git -C {REPO_ROOT} rev-parse --short HEAD").strip()
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark results saved to {out}")
+
+def compare(args):
+    with open(args.old) as f:
+        old = json.load(f)["results"]
+    with open(args.new) as f:
+        new = json.load(f)["results"]
+
+    regressions = []
+    print(f"{'benchmark':<28} {'old (s)':>10} {'new (s)':>10} {'change':>9}")
+    for name in sorted(set(old) & set(new)):
+        if "median_s" not in old[name] or "median_s" not in new[name]:
+            continue
+        before, after = old[name]["median_s"], new[name]["median_s"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  ❌ REGRESSION"
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = "  ✅ faster"
+        print(f"{name:<28} {before:>10.4f} {after:>10.4f} {change:>+8.1%}{flag}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}.")
+
+def importtime(args):
+    """Cold-interpreter import profile of an entry point (python -X importtime)."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+                          cwd=REPO_ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        print(f"❌ Importing {args.module} failed:\n{proc.stderr.splitlines()[-1]}")
+        sys.exit(1)
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+
+    top_level = sorted((e for e in entries if e[1] == 0), key=lambda e: -e[3])
+    print(f"🧪 import {args.module}: {wall:.3f}s wall (interpreter start included), "
+          f"{sum(e[3] for e in top_level) / 1e6:.3f}s in imports, {len(entries)} modules")
+    print(f"\n{'top-level import':<40} {'cumulative':>12}")
+    for name, _, _, cumulative in top_level[:args.top]:
+        print(f"{name:<40} {cumulative / 1000:>10.1f}ms")
+    print(f"\n{'slowest modules (self time)':<40} {'self':>12}")
+    for name, _, self_us, _ in sorted(entries, key=lambda e: -e[2])[:args.top]:
+        print(f"{name:<40} {self_us / 1000:>10.1f}ms")
+
+def _sentiment_child(scorer, workers, n):
+    """Runs in a fresh interpreter so peak RSS belongs to this scorer/worker setup alone."""
+    import resource
+    from src.sentiment_scoring import ScoringEngine
+    from src.synthetic_data import generate_tweet_corpus
+
+    try:
+        engine = ScoringEngine(scorer, workers=workers)
+        start = time.perf_counter()
+        engine.score(generate_tweet_corpus(512, seed=99, duplicate_rate=0))   # Load model / start pool
+        load_s = time.perf_counter() - start
+
+        texts = generate_tweet_corpus(n)
+        start = time.perf_counter()
+        engine.score(texts)
+        cold_s = time.perf_counter() - start
+        start = time.perf_counter()
+        engine.score(texts)
+        cached_s = time.perf_counter() - start
+        engine.close()
+    except ImportError as e:
+        print(json.dumps({"skipped": f"missing dependency: {e.name}"}))
+        return
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({
+        "load_s": round(load_s, 4),
+        "texts_per_s": round(n / cold_s, 1),
+        "cached_texts_per_s": round(n / cached_s, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "peak_worker_rss_mb": round(children_kb / 1024, 1) if workers > 1 else None,
+    }))
+
+def sentiment(args):
+    if args.child:
+        scorer, workers = args.child.split(":")
+        return _sentiment_child(scorer, int(workers), args.n)
+
+    results = {}
+    print(f"{'scorer':<12} {'workers':>7} {'texts/s':>10} {'cached/s':>11} {'load (s)':>9} {'RSS (MB)':>9}")
+    for scorer in args.scorers.split(","):
+        for workers in [int(w) for w in args.workers.split(",")]:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "sentiment", "--n", str(args.n),
+                                   "--child", f"{scorer}:{workers}"], cwd=REPO_ROOT, capture_output=True, text=True)
+            lines = proc.stdout.strip().splitlines()
+            result = json.loads(lines[-1]) if proc.returncode == 0 and lines else \
+                {"failed": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+            results[f"{scorer}_w{workers}"] = result
+            if "texts_per_s" in result:
+                rss = result["peak_rss_mb"] + (result["peak_worker_rss_mb"] or 0) * workers
+                print(f"{scorer:<12} {workers:>7} {result['texts_per_s']:>10} {result['cached_texts_per_s']:>11} "
+                      f"{result['load_s']:>9} {rss:>9.0f}")
+            else:
+                print(f"{scorer:<12} {workers:>7}  ⏭️ {result.get('skipped') or result.get('failed')}")
+
+    out = os.path.join(RESULTS_DIR, f"sentiment_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "texts": args.n,
+                            "python": platform.python_version(), "cpus": os.cpu_count()},
+                   "results": results}, f, indent=2)
+    print(f"✅ Sentiment benchmark saved to {out}")
+
+def main():
+    parser = argparse.ArgumentParser(description="CryptoFuturesML offline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the suite and save JSON results")
+    run_parser.add_argument("--sizes", default="10000,100000,1000000", help="Log sizes for dashboard/report benchmarks")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--only", help="Only run benchmarks whose name contains this")
+    run_parser.add_argument("--out", help="Output JSON path")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = sub.add_parser("compare", help="Flag regressions between two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown (0.15 = 15%%)")
+    compare_parser.set_defaults(func=compare)
+
+    importtime_parser = sub.add_parser("importtime", help="Import-time profile of an entry point")
+    importtime_parser.add_argument("--module", default="main", help="Module to import (main, job_scheduler, api.main)")
+    importtime_parser.add_argument("--top", type=int, default=15)
+    importtime_parser.set_defaults(func=importtime)
+
+    sentiment_parser = sub.add_parser("sentiment", help="Sentiment scorer throughput and memory on a fixture corpus")
+    sentiment_parser.add_argument("--scorers", default="textblob,vader,transformer")
+    sentiment_parser.add_argument("--workers", default=f"1,{max(2, (os.cpu_count() or 2) - 1)}")
+    sentiment_parser.add_argument("--n", type=int, default=5_000, help="Texts in the fixture corpus")
+    sentiment_parser.add_argument("--child", help=argparse.SUPPRESS)
+    sentiment_parser.set_defaults(func=sentiment)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
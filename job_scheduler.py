@@ -1,44 +1,72 @@
 # job_schedular.py — Scheduled retraining, drift monitoring, summaries
 
-import schedule
-import time
 from datetime import datetime
 import os
-from src.retraining_pipeline import retrain_pipeline
-from src.trade_simulator import simulate_trade_pnl
-from src.daily_summary import send_daily_summary
-from src.monitoring import drift_detected
-from src.report_generator import generate_daily_report
-from src.alert_manager import check_critical_alerts
+from src.job_runtime import Job, JobRuntime
+
+# Job modules are imported only when their job first runs ("module:function" targets),
+# so the scheduler starts without loading TensorFlow, MLflow or pandas.
 
 # Ensure logs directory exists
 os.makedirs("logs", exist_ok=True)
 log_file = "logs/retrain_log.txt"
 
-def retrain_job_if_drift():
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    try:
-        if drift_detected():
-            retrain_pipeline(versioned=True)
-            msg = f"[{timestamp}] 🔁 Drift detected → Retraining triggered.\n"
-        else:
-            msg = f"[{timestamp}] ✅ No significant drift. No retraining.\n"
-    except Exception as e:
-        msg = f"[{timestamp}] ❌ Drift check/retraining failed: {str(e)}\n"
-
+def write_retrain_log(msg):
     with open(log_file, "a") as f:
         f.write(msg)
     print(msg.strip())
 
-# Scheduled Tasks
-schedule.every().monday.at("07:00").do(retrain_job_if_drift)       # Weekly check
-schedule.every().day.at("19:50").do(simulate_trade_pnl)            # Daily PnL
-schedule.every().day.at("20:00").do(send_daily_summary)            # Telegram
-schedule.every().day.at("20:10").do(generate_daily_report)         # Report Generator
-schedule.every().day.at("20:15").do(check_critical_alerts)         # Critical alerts
+# Returning False stops the DAG here (no retrain, no post-retrain report)
+def drift_check_job():
+    from src.monitoring import drift_detected
+    from src.accuracy_tracker import accuracy_degraded
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if drift_detected():
+        write_retrain_log(f"[{timestamp}] 🔁 Drift detected → Retraining triggered.\n")
+        return True
+    if accuracy_degraded():
+        write_retrain_log(f"[{timestamp}] 🔁 Realized accuracy degraded → Retraining triggered.\n")
+        return True
+    write_retrain_log(f"[{timestamp}] ✅ No significant drift. No retraining.\n")
+    return False
+
+def retrain_job():
+    from src.retraining_pipeline import retrain_pipeline
 
-print("📅 Scheduler started. Waiting for scheduled jobs...")
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        succeeded = retrain_pipeline(versioned=True)
+    except Exception as e:
+        write_retrain_log(f"[{timestamp}] ❌ Drift check/retraining failed: {str(e)}\n")
+        raise
+    # The pipeline logs its own failure and returns False: raise so the run is recorded
+    # as failed and retried, instead of a successful run that merely halts the chain
+    if not succeeded:
+        raise RuntimeError("Retraining failed (see logs/retrain_log.txt)")
+    return True
 
-while True:
-    schedule.run_pending()
-    time.sleep(60)
+# Scheduled Tasks (drift_check → retrain runs as one chain; jobs with a timeout run in their own process)
+JOBS = [
+    Job("drift_check", drift_check_job, weekday="monday", at="07:00"),                # Weekly check
+    Job("retrain", retrain_job, depends_on=["drift_check"], timeout=2 * 3600),
+    Job("daily_pnl_log", "src.utils:generate_daily_summary_log", at="19:50", timeout=300),   # Daily PnL
+    Job("daily_summary", "src.daily_summary:send_daily_summary", at="20:00", timeout=300),   # Telegram
+    Job("daily_report", "src.report_generator:generate_daily_report", at="20:10", timeout=600),  # Report Generator
+    # In-process (no timeout): run_checks bounds each check itself, and the job shares the
+    # daemon's aggregate cache and alert dispatcher instead of spawning an interpreter a minute
+    Job("critical_alerts", "src.alert_manager:check_critical_alerts", every_minutes=1,
+        catch_up=False),                                                                     # Critical alerts
+]
+
+def build_runtime():
+    return JobRuntime(JOBS, max_workers=4)
+
+if __name__ == "__main__":
+    runtime = build_runtime()
+    print("📅 Scheduler started. Waiting for scheduled jobs...")
+    try:
+        runtime.run_forever(poll_seconds=30)
+    except KeyboardInterrupt:
+        runtime.stop()
+        print("🛑 Scheduler stopped.")
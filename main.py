@@ -1,21 +1,20 @@
 # main.py
 
-from src.live_trading_engine import predict_and_trade
-from src.retraining_pipeline import retrain_pipeline
-from src.trade_analyzer import analyze_performance
-from src.cli_dashboard import display_dashboard
+# Heavy modules (TensorFlow, matplotlib, MLflow, pandas, ccxt) are imported inside the
+# menu option that needs them, so the menu shows instantly.
+# Profile startup with: python benchmark.py importtime
+
 from src.utils import (
     init_log_files,
     inject_virtual_trade_test_row,
-    model_artifacts_exist,
-    generate_daily_summary_log
-)
-from src.confidence_visualizer import (
-    plot_confidence_over_time,
-    plot_signal_distribution
+    model_artifacts_exist
 )
+from src.config import API_TOKEN, DAEMON_URL
 from colorama import Fore, Style, init as colorama_init
+import json
+import sys
 import time
+import urllib.request
 
 colorama_init(autoreset=True)
 
@@ -38,6 +37,9 @@ def print_menu():
     print("────────────────────────────")
 
 def run_live_loop(cycles=3):
+    from src.live_trading_engine import predict_and_trade
+    from src.cli_dashboard import display_dashboard
+
     for i in range(cycles):
         print(f"\n🔁 Live loop cycle {i+1}/{cycles}")
         predict_and_trade()
@@ -45,10 +47,40 @@ def run_live_loop(cycles=3):
         time.sleep(5)
     print(Fore.YELLOW + "\n🛑 Live loop completed. Returning to menu...")
 
+# === Thin client: forward work to a running daemon instead of loading the model here ===
+def daemon_call(method, path, timeout=60):
+    req = urllib.request.Request(f"{DAEMON_URL}{path}", method=method,
+                                 headers={"Authorization": f"Bearer {API_TOKEN}"})
+    with urllib.request.urlopen(req, timeout=timeout) as res:
+        return json.loads(res.read())
+
+def daemon_available():
+    try:
+        daemon_call("GET", "/status", timeout=0.5)
+        return True
+    except Exception:
+        return False
+
+def print_daemon_status():
+    status = daemon_call("GET", "/status")
+    print(f"🛰️ Daemon up since {status['started_at']} | Cycles: {status['cycles']} | Last: {status['last_result']}")
+    for name, job in status["jobs"].items():
+        print(f"   • {name}: {job.get('last_status') or 'never run'} ({job.get('last_run') or '-'})")
+
 def main():
-    if not model_artifacts_exist():
+    if "--daemon" in sys.argv:
+        from src.daemon import run_daemon
+        run_daemon(trade="--no-trade" not in sys.argv)
+        return
+
+    if daemon_available():
+        print(Fore.CYAN + f"🛰️ Connected to daemon at {DAEMON_URL} — heavy work runs there.")
+        remote = True
+    elif not model_artifacts_exist():
         print(Fore.RED + "❌ Model or scaler artifacts not found. Please run Option 2 first to retrain.")
         return
+    else:
+        remote = False
 
     while True:
         print_menu()
@@ -56,18 +88,32 @@ def main():
 
         if choice == "1":
             print("\n▶️ Running live prediction...")
-            predict_and_trade()
+            if remote:
+                result = daemon_call("GET", "/predict")
+                print(f"📢 Signal: {result['signal']} | Confidence: {result['confidence']:.2%}")
+            else:
+                from src.live_trading_engine import predict_and_trade
+                predict_and_trade()
 
         elif choice == "2":
             print("\n🔁 Retraining model...\n")
-            retrain_pipeline()
+            if remote:
+                started = daemon_call("POST", "/jobs/retrain")["started"]
+                print("✅ Retrain job started on daemon." if started else "⏳ Retrain already running on daemon.")
+            else:
+                from src.retraining_pipeline import retrain_pipeline
+                retrain_pipeline()
 
         elif choice == "3":
             print("\n📊 Analyzing trade performance...")
+            from src.trade_analyzer import analyze_performance
             analyze_performance()
 
         elif choice == "4":
-            run_live_loop()
+            if remote:
+                print_daemon_status()
+            else:
+                run_live_loop()
 
         elif choice == "5":
             print(Fore.MAGENTA + "\n👋 Exiting. Stay profitable!")
@@ -75,14 +121,17 @@ def main():
 
         elif choice == "6":
             print("\n📈 Confidence Trend...")
+            from src.confidence_visualizer import plot_confidence_over_time
             plot_confidence_over_time()
 
         elif choice == "7":
             print("\n📊 Signal Type Breakdown...")
+            from src.confidence_visualizer import plot_signal_distribution
             plot_signal_distribution()
 
         elif choice == "8":
             print("\n📝 Generating Daily Summary Log...")
+            from src.utils import generate_daily_summary_log
             generate_daily_summary_log()
 
         else:
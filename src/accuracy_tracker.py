@@ -0,0 +1,229 @@
+# src/accuracy_tracker.py — Realized accuracy of live predictions, resolved candle by candle
+
+import json
+import os
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.config import BINANCE_SYMBOL, BINANCE_TIMEFRAME
+from src.utils import timeframe_to_seconds
+
+CONFIDENCE_LOG_PATH = "logs/confidence_log.csv"
+STATE_PATH = "logs/accuracy_state.json"
+WINDOW_SIZE = 288            # Rolling window: last day of resolved 5m predictions
+N_CALIBRATION_BINS = 10
+SIGNALS = ["LONG", "SHORT", "FILTERED"]
+MAX_PENDING = 64             # Unresolved predictions kept (older ones are dropped)
+MIN_ACCURACY = 0.5           # Below coin-flip on a full window → retrain
+MIN_SAMPLES = 100
+
+# Matches prepare_data: a window ending at candle t is labelled close[t+2] > close[t+1]
+RESOLVE_OFFSETS = (1, 2)
+
+
+class RollingAccuracy:
+    """Fixed-size window of resolved predictions with running sums, so every update is O(1)."""
+
+    def __init__(self, size=WINDOW_SIZE, n_bins=N_CALIBRATION_BINS):
+        self.size = size
+        self.n_bins = n_bins
+        self.ring = []               # [confidence, label, signal index]
+        self.pos = 0
+        self.correct = 0
+        self.brier_sum = 0.0
+        self.bin_count = [0] * n_bins
+        self.bin_pos = [0] * n_bins
+        self.bin_conf = [0.0] * n_bins
+        self.signal_count = [0] * len(SIGNALS)
+        self.signal_hits = [0] * len(SIGNALS)
+
+    def _apply(self, confidence, label, signal_idx, sign):
+        hit = int((confidence > 0.5) == bool(label))
+        b = min(int(confidence * self.n_bins), self.n_bins - 1)
+        self.correct += sign * hit
+        self.brier_sum += sign * (confidence - label) ** 2
+        self.bin_count[b] += sign
+        self.bin_pos[b] += sign * label
+        self.bin_conf[b] += sign * confidence
+        self.signal_count[signal_idx] += sign
+        self.signal_hits[signal_idx] += sign * hit
+
+    def add(self, confidence, label, signal):
+        entry = [float(confidence), int(label), SIGNALS.index(signal) if signal in SIGNALS else 2]
+        if len(self.ring) < self.size:
+            self.ring.append(entry)
+        else:
+            self._apply(*self.ring[self.pos], sign=-1)
+            self.ring[self.pos] = entry
+            self.pos = (self.pos + 1) % self.size
+        self._apply(*entry, sign=1)
+
+    def metrics(self):
+        n = len(self.ring)
+        if n == 0:
+            return {"samples": 0}
+        return {
+            "samples": n,
+            "accuracy": round(self.correct / n, 4),
+            "brier": round(self.brier_sum / n, 4),
+            "calibration": [
+                {
+                    "bin": f"{i / self.n_bins:.1f}-{(i + 1) / self.n_bins:.1f}",
+                    "count": self.bin_count[i],
+                    "avg_confidence": round(self.bin_conf[i] / self.bin_count[i], 4),
+                    "up_rate": round(self.bin_pos[i] / self.bin_count[i], 4),
+                }
+                for i in range(self.n_bins) if self.bin_count[i]
+            ],
+            "hit_rate_by_signal": {
+                signal: round(self.signal_hits[i] / self.signal_count[i], 4)
+                for i, signal in enumerate(SIGNALS) if self.signal_count[i]
+            },
+        }
+
+
+class AccuracyTracker:
+    def __init__(self, path=STATE_PATH, timeframe=BINANCE_TIMEFRAME):
+        self.path = path
+        self.step = timedelta(seconds=timeframe_to_seconds(timeframe))
+        self.window = RollingAccuracy()
+        self.pending = {}            # candle time (iso) -> [confidence, signal]
+        self.closes = {}             # candle time (iso) -> close, only what pending needs
+        self.resolved_total = 0
+        self._lock = threading.Lock()
+
+    # === Online updates ===
+    def observe_candles(self, timestamps, closes):
+        """Record final closes of closed candles and resolve every prediction they complete."""
+        with self._lock:
+            for ts, close in zip(timestamps, closes):
+                self.closes[pd.Timestamp(ts).isoformat()] = float(close)
+            self._resolve()
+            self.save()
+
+    def record_prediction(self, candle_time, confidence, signal):
+        with self._lock:
+            self.pending[pd.Timestamp(candle_time).isoformat()] = [float(confidence), signal]
+            if len(self.pending) > MAX_PENDING:
+                for key in sorted(self.pending)[:-MAX_PENDING]:
+                    del self.pending[key]
+            self.save()
+
+    def _resolve(self):
+        for key in sorted(self.pending):
+            t = pd.Timestamp(key)
+            first, second = (self.closes.get((t + k * self.step).isoformat()) for k in RESOLVE_OFFSETS)
+            if first is None or second is None:
+                continue
+            confidence, signal = self.pending.pop(key)
+            self.window.add(confidence, int(second > first), signal)
+            self.resolved_total += 1
+
+        # Keep only closes that an unresolved prediction can still use
+        oldest = min(self.pending) if self.pending else None
+        self.closes = {k: v for k, v in self.closes.items() if oldest and k > oldest}
+
+    def metrics(self):
+        with self._lock:
+            return {**self.window.metrics(), "resolved_total": self.resolved_total,
+                    "pending": len(self.pending)}
+
+    # === Backfill ===
+    def backfill(self, log_path=CONFIDENCE_LOG_PATH, candles=None):
+        """
+        Label every logged prediction in one vectorized pass and rebuild the rolling window
+        from the most recent ones. Returns whole-history metrics.
+        """
+        log = pd.read_csv(log_path, usecols=lambda c: c in ("timestamp", "signal", "confidence", "candle_time"),
+                          parse_dates=["timestamp"])
+        if log.empty:
+            print("📭 No predictions to backfill.")
+            return {}
+
+        if candles is None:
+            from src.market_data_collector import fetch_ohlcv_range
+            candles = fetch_ohlcv_range(BINANCE_SYMBOL, start=log["timestamp"].min() - self.step,
+                                        end=log["timestamp"].max() + 3 * self.step)
+        close = candles.set_index("timestamp")["close"]
+
+        # Resolve against the candle that was scored (logged as candle_time, as record_prediction
+        # does online); rows logged before that column existed fall back to the candle forming then
+        candle_time = log["timestamp"].dt.floor(self.step)
+        if "candle_time" in log:
+            candle_time = pd.to_datetime(log["candle_time"]).fillna(candle_time)
+        first = close.reindex(candle_time + RESOLVE_OFFSETS[0] * self.step).to_numpy()
+        second = close.reindex(candle_time + RESOLVE_OFFSETS[1] * self.step).to_numpy()
+        resolved = ~(np.isnan(first) | np.isnan(second))
+
+        labels = (second[resolved] > first[resolved]).astype(int)
+        conf = log["confidence"].to_numpy()[resolved]
+        signals = log["signal"].to_numpy()[resolved]
+        hits = (conf > 0.5) == labels.astype(bool)
+
+        with self._lock:
+            self.window = RollingAccuracy()
+            for c, y, s in zip(conf[-WINDOW_SIZE:], labels[-WINDOW_SIZE:], signals[-WINDOW_SIZE:]):
+                self.window.add(c, y, s)
+            self.resolved_total = int(resolved.sum())
+            self.save()
+
+        summary = {
+            "resolved": int(resolved.sum()),
+            "unresolved": int((~resolved).sum()),
+            "accuracy": round(float(hits.mean()), 4) if len(hits) else None,
+            "brier": round(float(np.mean((conf - labels) ** 2)), 4) if len(hits) else None,
+        }
+        print(f"✅ Backfilled accuracy over {summary['resolved']} predictions: {summary}")
+        return summary
+
+    # === Persistence ===
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        state = {"window": self.window.__dict__, "pending": self.pending,
+                 "closes": self.closes, "resolved_total": self.resolved_total}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        tracker = cls(path=path)
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    state = json.load(f)
+                tracker.window.__dict__.update(state["window"])
+                tracker.pending = state.get("pending", {})
+                tracker.closes = state.get("closes", {})
+                tracker.resolved_total = state.get("resolved_total", 0)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Could not load accuracy state, starting fresh: {e}")
+        return tracker
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+def get_accuracy_tracker():
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = AccuracyTracker.load()
+        return _tracker
+
+def accuracy_degraded(min_accuracy=MIN_ACCURACY, min_samples=MIN_SAMPLES):
+    """Retrain trigger: realized accuracy over a well-filled window fell below `min_accuracy`."""
+    metrics = AccuracyTracker.load().metrics()
+    if metrics["samples"] < min_samples:
+        return False
+    if metrics["accuracy"] < min_accuracy:
+        print(f"📉 Realized accuracy {metrics['accuracy']:.2%} over {metrics['samples']} predictions.")
+        return True
+    return False
+
+if __name__ == "__main__":
+    AccuracyTracker.load().backfill()
@@ -0,0 +1,232 @@
+# src/aggregate_cache.py — Per-day running aggregates of closed trades and signals (constant-time summaries)
+
+import csv
+import io
+import json
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+
+AGGREGATE_PATH = "logs/aggregates.json"
+TAIL_BYTES = 64              # Bytes before the read offset kept to tell an append from a rewrite
+POSITION_LOG = "logs/virtual_positions.csv"
+CONFIDENCE_LOG = "logs/confidence_log.csv"
+
+
+def _trade_bucket():
+    return {"count": 0, "wins": 0, "losses": 0, "pnl_sum": 0.0, "pnl_sq": 0.0, "win_sum": 0.0, "last_balance": None}
+
+def _signal_bucket():
+    return {}                    # signal -> [count, confidence sum]
+
+def trade_bucket_stats(bucket):
+    """trades, win_rate, avg_pnl, std_pnl, total_pnl, avg_win, avg_loss, last_balance of one bucket."""
+    n = bucket["count"]
+    mean = bucket["pnl_sum"] / n if n else 0.0
+    var = (bucket["pnl_sq"] - n * mean * mean) / (n - 1) if n > 1 else 0.0
+    losses_sum = bucket["pnl_sum"] - bucket["win_sum"]
+    return {
+        "trades": n,
+        "win_rate": bucket["wins"] / n * 100 if n else 0.0,
+        "avg_pnl": mean,
+        "std_pnl": math.sqrt(max(var, 0.0)),
+        "total_pnl": bucket["pnl_sum"],
+        "avg_win": bucket["win_sum"] / bucket["wins"] if bucket["wins"] else 0.0,
+        "avg_loss": losses_sum / bucket["losses"] if bucket["losses"] else 0.0,
+        "last_balance": bucket["last_balance"],
+    }
+
+def summarize_buckets(buckets):
+    """Stats of consecutive day buckets (oldest first) merged into one."""
+    merged = _trade_bucket()
+    for bucket in buckets:
+        for key in ("count", "wins", "losses", "pnl_sum", "pnl_sq", "win_sum"):
+            merged[key] += bucket[key]
+        if bucket["last_balance"] is not None:
+            merged["last_balance"] = bucket["last_balance"]
+    return trade_bucket_stats(merged)
+
+
+class AggregateCache:
+    """
+    Day buckets of running sums for closed trades (count, wins, PnL sum and sum of squares,
+    last balance) and for logged signals (count + confidence sum per signal), persisted as JSON.
+
+    The cache remembers how far it has read each log; `refresh` costs one stat per log and
+    folds in only the rows appended since (by any process). A log that shrank or was replaced
+    is re-read from the start, and `rebuild` re-derives everything from the logs on demand.
+    """
+
+    def __init__(self, path=AGGREGATE_PATH, position_log=POSITION_LOG, confidence_log=CONFIDENCE_LOG):
+        self.path = path
+        self.sources = {"trades": position_log, "signals": confidence_log}
+        self._lock = threading.RLock()
+        self._state = self._empty()
+        self._load()
+
+    @staticmethod
+    def _empty():
+        return {"offsets": {"trades": 0, "signals": 0}, "tails": {"trades": "", "signals": ""}, "trades": {}, "signals": {},
+                "total": _trade_bucket(), "last_trade": None}
+
+    # === Persistence ===
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._state = {**self._empty(), **json.load(f)}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read aggregate cache, rebuilding: {e}")
+            self._state = self._empty()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._state, f)
+        os.replace(tmp_path, self.path)
+
+    # === Updates ===
+    def refresh(self):
+        """Fold in rows appended to the logs since the last call; returns True if anything changed."""
+        with self._lock:
+            changed = False
+            for stream, log_path in self.sources.items():
+                changed |= self._catch_up(stream, log_path)
+            if changed:
+                self._save()
+            return changed
+
+    def rebuild(self):
+        """Forget everything and re-read both logs from the start."""
+        with self._lock:
+            self._state = self._empty()
+            self.refresh()
+            self._save()
+            print(f"✅ Aggregates rebuilt: {self._state['total']['count']} trades over {len(self._state['trades'])} days")
+
+    def _catch_up(self, stream, log_path):
+        offsets, tails = self._state["offsets"], self._state["tails"]
+        size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        if size == offsets[stream]:
+            return False
+
+        with open(log_path, "rb") as f:
+            header = f.readline()
+            if size < offsets[stream] or not self._same_tail(f, offsets[stream], tails[stream]):
+                self._reset(stream)                      # Truncated or rewritten: this stream starts over
+            start = max(offsets[stream], len(header))
+            f.seek(start)
+            chunk = f.read(size - start)
+        complete = chunk[:chunk.rfind(b"\n") + 1]      # A half-written last line waits for the next refresh
+        offsets[stream] = start + len(complete)
+        before = header if start == len(header) else tails[stream].encode("latin-1")
+        tails[stream] = (before + complete)[-TAIL_BYTES:].decode("latin-1")
+
+        columns = next(csv.reader([header.decode("utf-8").strip()]), [])
+        rows = csv.DictReader(io.StringIO(complete.decode("utf-8")), fieldnames=columns)
+        fold = self._add_trade if stream == "trades" else self._add_signal
+        for row in rows:
+            try:
+                fold(row)
+            except (KeyError, TypeError, ValueError):
+                continue                                 # Malformed row: skipped, as pandas would NaN it
+        return True
+
+    @staticmethod
+    def _same_tail(f, offset, tail):
+        if not offset:
+            return True
+        expected = tail.encode("latin-1")
+        f.seek(offset - len(expected))
+        return f.read(len(expected)) == expected
+
+    def _reset(self, stream):
+        self._state["offsets"][stream] = 0
+        self._state["tails"][stream] = ""
+        self._state[stream] = {}
+        if stream == "trades":
+            self._state["total"] = _trade_bucket()
+            self._state["last_trade"] = None
+
+    def _add_trade(self, row):
+        pnl = float(row["pnl_percent"])
+        if math.isnan(pnl):
+            return
+        balance = float(row["balance_after"]) if row.get("balance_after") not in (None, "") else None
+        day = row["timestamp"][:10]
+        for bucket in (self._state["trades"].setdefault(day, _trade_bucket()), self._state["total"]):
+            bucket["count"] += 1
+            bucket["wins"] += pnl > 0
+            bucket["losses"] += pnl < 0
+            bucket["pnl_sum"] += pnl
+            bucket["pnl_sq"] += pnl * pnl
+            bucket["win_sum"] += pnl if pnl > 0 else 0.0
+            if balance is not None:
+                bucket["last_balance"] = balance
+        self._state["last_trade"] = {k: row.get(k) for k in
+                                     ("timestamp", "entry_time", "signal", "pnl_percent", "balance_after")}
+
+    def _add_signal(self, row):
+        confidence = float(row["confidence"])
+        bucket = self._state["signals"].setdefault(row["timestamp"][:10], _signal_bucket())
+        counts = bucket.setdefault(row["signal"], [0, 0.0])
+        counts[0] += 1
+        counts[1] += confidence
+
+    # === Queries (call refresh() first for up-to-date answers) ===
+    @staticmethod
+    def _days(days, end):
+        end = end or datetime.utcnow().date()
+        return [(end - timedelta(days=i)).isoformat() for i in range(days)]
+
+    def trade_stats(self, days=1, end=None):
+        """Closed-trade stats for the `days` UTC days ending at `end` (default today)."""
+        with self._lock:
+            buckets = [self._state["trades"][day] for day in reversed(self._days(days, end))
+                       if day in self._state["trades"]]
+        return summarize_buckets(buckets)
+
+    def daily_trades(self):
+        """[(ISO day, bucket)] for every day with closed trades, oldest first (copies)."""
+        with self._lock:
+            return [(day, dict(bucket)) for day, bucket in sorted(self._state["trades"].items())]
+
+    def total_stats(self):
+        with self._lock:
+            return trade_bucket_stats(self._state["total"])
+
+    def last_trade(self):
+        with self._lock:
+            return dict(self._state["last_trade"]) if self._state["last_trade"] else None
+
+    def signal_stats(self, days=1, end=None):
+        """{signal: {"count", "avg_confidence"}} for the `days` UTC days ending at `end`."""
+        merged = {}
+        with self._lock:
+            for day in self._days(days, end):
+                for signal, (count, confidence) in self._state["signals"].get(day, {}).items():
+                    totals = merged.setdefault(signal, [0, 0.0])
+                    totals[0] += count
+                    totals[1] += confidence
+        return {signal: {"count": count, "avg_confidence": confidence / count if count else 0.0}
+                for signal, (count, confidence) in merged.items()}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_aggregate_cache():
+    """Shared cache, already caught up with the logs."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AggregateCache()
+    _cache.refresh()
+    return _cache
+
+if __name__ == "__main__":
+    # Rebuild from the logs: python -m src.aggregate_cache
+    AggregateCache().rebuild()
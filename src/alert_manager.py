@@ -1,65 +1,172 @@
-# src/alert_manager.py
+# src/alert_manager.py — Critical system checks, run concurrently, alerting only on state changes
 
+import json
 import os
-import pandas as pd
-from datetime import datetime, timedelta
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+from src.config import DAEMON_URL
 from src.telegram_alerts import send_alert
-from src.config import API_TOKEN
 
 # Thresholds and Endpoints
 CRITICAL_BALANCE_THRESHOLD = 500           # 🚨 Minimum allowed balance
 INACTIVITY_HOURS = 12                      # ⏰ Alert if no trades in this time
-PREDICT_ENDPOINT = "http://localhost:8000/predict"  # FastAPI health check
+HEALTH_ENDPOINT = f"{DAEMON_URL}/health"   # Cheap liveness probe (never /predict: that predicts and may trade)
 MODEL_PATH_FILE = "models/model_latest_path.txt"    # Verifies model path
+RETRAIN_LOG = "logs/retrain_log.txt"
+ALERT_STATE_PATH = "logs/alert_state.json"          # Read offsets + currently active alerts
+CHECK_TIMEOUT = 10                         # ⌛ Seconds per check before it counts as failed
+HTTP_TIMEOUT = 5
 
 
-def check_critical_alerts():
-    alerts_triggered = []
-
-    # 🔁 Retraining failures
-    retrain_log = "logs/retrain_log.txt"
-    if os.path.exists(retrain_log):
-        with open(retrain_log, "r") as f:
-            lines = f.readlines()
-            if lines and "❌" in lines[-1]:
-                alerts_triggered.append("❗ Retraining failed:\n" + lines[-1].strip())
-
-    # 💰 Balance check
-    position_log = "logs/virtual_positions.csv"
-    if os.path.exists(position_log):
-        df = pd.read_csv(position_log)
-        if not df.empty:
-            last_balance = df["balance_after"].iloc[-1]
-            if last_balance < CRITICAL_BALANCE_THRESHOLD:
-                alerts_triggered.append(f"⚠️ Balance critically low: ${last_balance:.2f}")
-
-            # ⏳ Inactivity alert
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            latest_trade_time = df["timestamp"].max()
-            hours_since_last = (datetime.utcnow() - latest_trade_time).total_seconds() / 3600
-            if hours_since_last > INACTIVITY_HOURS:
-                alerts_triggered.append(f"⏳ No trades in the last {hours_since_last:.1f} hours.")
-
-    # 🧠 Model version mismatch
+# === Checks ===
+# Each check gets its own persisted state dict and returns None (healthy) or (key, message).
+# The key identifies the condition: an alert is sent when it appears or its key changes,
+# not again while it persists, and a resolved notice when it clears.
+
+def check_retrain_log(state):
+    # Only bytes appended since the last run are read; the last line decides the status
+    if not os.path.exists(RETRAIN_LOG):
+        return None
+    size = os.path.getsize(RETRAIN_LOG)
+    offset = state.get("offset", 0)
+    if size < offset:                      # Rotated or truncated
+        offset, state["last_line"] = 0, None
+    if size > offset:
+        with open(RETRAIN_LOG, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(size - offset)
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        lines = [line for line in complete.decode("utf-8", "replace").splitlines() if line.strip()]
+        if lines:
+            state["last_line"] = lines[-1].strip()
+        state["offset"] = offset + len(complete)
+    last_line = state.get("last_line")
+    if last_line and "❌" in last_line:
+        return last_line, "❗ Retraining failed:\n" + last_line
+    return None
+
+def check_balance(state):
+    from src.aggregate_cache import get_aggregate_cache
+    last = get_aggregate_cache().last_trade()        # Catches up on appended positions only
+    if last and float(last["balance_after"]) < CRITICAL_BALANCE_THRESHOLD:
+        return "low_balance", f"⚠️ Balance critically low: ${float(last['balance_after']):.2f}"
+    return None
+
+def check_inactivity(state):
+    from src.aggregate_cache import get_aggregate_cache
+    last = get_aggregate_cache().last_trade()
+    if last:
+        hours_since_last = (datetime.utcnow() - datetime.fromisoformat(last["timestamp"])).total_seconds() / 3600
+        if hours_since_last > INACTIVITY_HOURS:
+            return "inactive", f"⏳ No trades in the last {hours_since_last:.1f} hours."
+    return None
+
+def check_model_path(state):
     if os.path.exists(MODEL_PATH_FILE):
         with open(MODEL_PATH_FILE) as f:
             expected_path = f.read().strip()
         if not os.path.exists(expected_path):
-            alerts_triggered.append(f"🔁 Live model missing or version mismatch:\n{expected_path}")
+            return expected_path, f"🔁 Live model missing or version mismatch:\n{expected_path}"
+    return None
 
-    # 🔌 API Uptime Check
+def check_api(state):
+    import requests
     try:
-        res = requests.get(PREDICT_ENDPOINT, headers={"Authorization": f"Bearer {API_TOKEN}"}, timeout=5)
+        res = requests.get(HEALTH_ENDPOINT, timeout=HTTP_TIMEOUT)
         if res.status_code != 200:
-            alerts_triggered.append(f"❌ API /predict endpoint returned status {res.status_code}")
+            return f"status_{res.status_code}", f"❌ API /health returned status {res.status_code}"
     except Exception as e:
-        alerts_triggered.append(f"❌ API /predict unreachable: {str(e)}")
+        return "unreachable", f"❌ API /health unreachable: {str(e)}"
+    return None
+
+CHECKS = {
+    "retrain": check_retrain_log,
+    "balance": check_balance,
+    "inactivity": check_inactivity,
+    "model": check_model_path,
+    "api": check_api,
+}
+
+
+# === State ===
+_state_lock = threading.Lock()     # One run at a time per process (the job runs every minute)
+
+def _load_state():
+    try:
+        with open(ALERT_STATE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"checks": {}, "active": {}}
+
+def _save_state(state):
+    os.makedirs(os.path.dirname(ALERT_STATE_PATH), exist_ok=True)
+    tmp_path = ALERT_STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, ALERT_STATE_PATH)
+
+
+# === Runner ===
+def run_checks(checks=CHECKS, timeout=CHECK_TIMEOUT, state=None):
+    """
+    Run every check in its own thread; a check that raises or exceeds `timeout` seconds is
+    reported as failing. Returns {name: None | (key, message)} and updates `state` in place.
+    """
+    state = state if state is not None else {"checks": {}, "active": {}}
+    pool = ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix="alert")
+    futures = {}
+    for name, check in checks.items():
+        # A check that times out keeps a private copy, so its late writes are dropped
+        check_state = dict(state["checks"].get(name, {}))
+        futures[name] = (pool.submit(check, check_state), check_state)
+    wait([future for future, _ in futures.values()], timeout=timeout)
+
+    results = {}
+    for name, (future, check_state) in futures.items():
+        if not future.done():
+            future.cancel()
+            results[name] = ("timeout", f"⌛ Check '{name}' did not finish within {timeout}s")
+            continue
+        try:
+            results[name] = future.result()
+            state["checks"][name] = check_state
+        except Exception as e:
+            results[name] = ("error", f"❌ Check '{name}' failed: {e}")
+    pool.shutdown(wait=False, cancel_futures=True)   # A hung check must not hold up the next run
+    return results
+
+def check_critical_alerts():
+    with _state_lock:
+        state = _load_state()
+        results = run_checks(state=state)
+
+        new_alerts, resolved = [], []
+        for name, result in results.items():
+            previous = state["active"].get(name)
+            if result is None:
+                if previous is not None:
+                    resolved.append(f"✅ Resolved: {previous['message'].splitlines()[0]}")
+                    del state["active"][name]
+                continue
+            key, message = result
+            if previous is None or previous["key"] != key:
+                new_alerts.append(message)
+            state["active"][name] = {"key": key, "message": message,
+                                     "since": previous["since"] if previous and previous["key"] == key
+                                     else datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")}
+        _save_state(state)
 
-    # Send alert if any triggered
-    if alerts_triggered:
-        alert_msg = "🚨 CryptoFuturesML — Critical Alert(s):\n\n" + "\n\n".join(alerts_triggered)
+    # Send alert if anything changed
+    if new_alerts:
+        alert_msg = "🚨 CryptoFuturesML — Critical Alert(s):\n\n" + "\n\n".join(new_alerts)
         send_alert(alert_msg)
         print("📤 Critical alert sent.")
-    else:
+    if resolved:
+        send_alert("\n".join(resolved))
+    if not state["active"]:
         print("✅ All system checks passed.")
+    elif not new_alerts:
+        print(f"🔕 {len(state['active'])} known alert(s) still active; not re-sent.")
+    return results
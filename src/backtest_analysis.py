@@ -1,35 +1,30 @@
 # src/backtest_analysis.py
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
-import numpy as np
 from datetime import datetime
 
+from src.analytics import drawdowns, equity_curve, risk_ratios, trade_stats
+from src.plotting import downsample, new_figure, save_figure
+
 def compute_backtest_metrics(df, strategy_name="DefaultStrategy"):
     if df.empty:
         return None
 
     df = df.sort_values("timestamp").reset_index(drop=True)
-    df['cumulative_return'] = (1 + df['pnl_percent'] / 100).cumprod()
-
-    returns = df['pnl_percent'] / 100
-    win_rate = (returns > 0).sum() / len(returns)
-    avg_pnl = returns.mean()
-    std_pnl = returns.std()
-    sharpe = (avg_pnl / std_pnl) * np.sqrt(12) if std_pnl > 0 else 0
-
-    peak = df['cumulative_return'].cummax()
-    drawdown = (df['cumulative_return'] - peak) / peak
-    max_dd = drawdown.min()
+    returns = df['pnl_percent'].to_numpy(dtype=float) / 100
+    stats = trade_stats(df['pnl_percent'])
+    # Sharpe annualized by the trade frequency the timestamps imply (not a fixed sqrt(12))
+    ratios = risk_ratios(returns, df['timestamp'])
+    max_dd = drawdowns(equity_curve(returns))["max_drawdown"]
 
     summary = {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "strategy": strategy_name,
         "num_trades": len(df),
-        "win_rate": round(win_rate * 100, 2),
-        "avg_pnl": round(avg_pnl * 100, 2),
-        "sharpe_ratio": round(sharpe, 2),
+        "win_rate": round(stats["win_rate"], 2),
+        "avg_pnl": round(stats["avg_pnl"], 2),
+        "sharpe_ratio": round(ratios["sharpe"], 2),
         "max_drawdown": round(max_dd * 100, 2),
     }
 
@@ -63,11 +58,12 @@ def plot_backtest_results(log_path="logs/backtest_trades.csv"):
         return
 
     df = df.sort_values("timestamp").reset_index(drop=True)
-    df['cumulative_return'] = (1 + df['pnl_percent'] / 100).cumprod()
+    df['cumulative_return'] = equity_curve(df['pnl_percent'] / 100)
+    points = downsample(df, 'timestamp', 'cumulative_return')
 
-    fig, axes = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+    fig, axes = new_figure(figsize=(12, 8), nrows=2, ncols=1)
 
-    axes[0].plot(df['timestamp'], df['cumulative_return'], color='green', linewidth=2)
+    axes[0].plot(points['timestamp'], points['cumulative_return'], color='green', linewidth=2)
     axes[0].set_title("📈 Cumulative Equity Curve")
     axes[0].set_ylabel("Equity (x initial capital)")
     axes[0].grid(True)
@@ -78,5 +74,7 @@ def plot_backtest_results(log_path="logs/backtest_trades.csv"):
     axes[1].set_ylabel("Frequency")
     axes[1].grid(True)
 
-    plt.tight_layout()
-    plt.show()
+    # Saved, never shown: there is no display on the VPS
+    path = save_figure(fig, "backtest_results.png")
+    print(f"📊 Saved: {path}")
+    return path
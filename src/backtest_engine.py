@@ -3,14 +3,15 @@
 import pandas as pd
 import numpy as np
 from datetime import timedelta
-import joblib
-from tensorflow.keras.models import load_model
 
-from src.feature_engineering import add_technical_indicators, merge_sentiment
-from src.market_data_collector import fetch_ohlcv
-from src.sentiment_pipeline import fetch_twitter_sentiment
+from src.feature_engineering import build_features, merge_sentiment
+from src.feature_store import get_feature_store
+from src.live_trading_engine import load_artifacts
+from src.prediction_cache import FEATURES, WINDOW_SIZE, cached_confidences, predict_windows
 from src.backtest_analysis import compute_backtest_metrics, log_backtest_summary
+from src import metrics
 
+@metrics.timed("backtest.total")
 def run_backtest(
     pair="BTC/USDT",
     model_path="models/lstm_model.h5",
@@ -22,34 +23,39 @@ def run_backtest(
     hold_minutes=30,
     limit=1500,
     save_to_file=True,
-    strategy_name="LSTM_v1_5m_RSI30_70"
+    strategy_name="LSTM_v1_5m_RSI30_70",
+    ohlcv=None
 ):
     print("📦 Running backtest with strategy + filters...")
 
-    # Load historical OHLCV
-    df = fetch_ohlcv(pair, timeframe="5m", limit=limit)
-    df = add_technical_indicators(df)
-
-    # Merge mock sentiment
-    sentiment_scores = fetch_twitter_sentiment(limit=30)
-    df = merge_sentiment(df, sentiment_scores)
-    df = df.dropna().reset_index(drop=True)
-
-    # Load model + scaler
-    model = load_model(model_path)
-    scaler = joblib.load(scaler_path)
-
-    # Prepare features
-    features = ['rsi_14', 'ema_21', 'macd', 'sentiment']
-    scaled_features = scaler.transform(df[features].values)
+    # Read stored features for the last `limit` candles (or engineer the frame passed in, e.g. synthetic candles).
+    # Sentiment is only read from the store the daemon's collector fills; each candle gets the value known at its close.
+    if ohlcv is None:
+        store = get_feature_store(pair, "5m")
+        with metrics.span("backtest.fetch_ohlcv"):
+            store.catch_up(limit=limit)
+        with metrics.span("backtest.read_features"):
+            df = store.tail(limit)
+    else:
+        with metrics.span("backtest.indicators"):
+            df = build_features(merge_sentiment(ohlcv.copy()))
+    df = df.dropna(subset=FEATURES).reset_index(drop=True)
+
+    # Confidence for candle i comes from the window ending at i - 1. Stored candles go through the
+    # prediction cache (only unseen windows hit the model); the rest are predicted in one batch.
+    candles = np.arange(lookback, len(df) - int(hold_minutes / 5))
+    with metrics.span("backtest.model"):
+        if ohlcv is None and lookback == WINDOW_SIZE:
+            confidences = cached_confidences(df, pair, "5m", rows=candles - 1, model_path=model_path,
+                                             scaler_path=scaler_path, window=lookback)
+        else:
+            model, scaler = load_artifacts(model_path, scaler_path)
+            confidences = predict_windows(df, model, scaler, candles - 1, window=lookback)
 
     trades = []
 
-    for i in range(lookback, len(df) - int(hold_minutes / 5)):
-        window = scaled_features[i - lookback:i]
-        input_data = np.expand_dims(window, axis=0)
-        prediction = model.predict(input_data, verbose=0)
-        confidence = float(prediction[0][0])
+    for i in candles:
+        confidence = float(confidences[i - lookback])
         rsi = df['rsi_14'].iloc[i]
 
         signal = "HOLD"
@@ -88,6 +94,7 @@ def run_backtest(
         })
 
     results = pd.DataFrame(trades)
+    metrics.inc("backtest_trades_total", len(results))
 
     if save_to_file:
         results.to_csv("logs/backtest_trades.csv", index=False)
@@ -1,5 +1,7 @@
 # src/binance_executor.py
 
+import threading
+
 import ccxt
 from src.config import (
     BINANCE_API_KEY,
@@ -8,50 +10,53 @@ from src.config import (
     BINANCE_SYMBOL,
     BINANCE_ENV
 )
+from src.utils import binance_futures_urls
+
+_client = None
+_client_lock = threading.Lock()
 
-# 🔐 Initialize Binance Futures client (Testnet or Mainnet)
+# 🔐 Binance Futures client (Testnet or Mainnet), created once and reused (keeps its HTTP session and market cache)
 def get_binance_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = _create_client()
+        return _client
+
+def _create_client():
     return ccxt.binance({
         'apiKey': BINANCE_API_KEY,
         'secret': BINANCE_SECRET,
         'enableRateLimit': True,
         'options': {
-            'defaultType': 'future'
+            'defaultType': 'future',
+            'fetchMarkets': {'types': ['linear']},   # Only USDⓈ-M futures are traded
+            'fetchCurrencies': False
         },
+        # ccxt routes futures calls through the fapi* URLs (plain 'public'/'private' are spot)
         'urls': {
-            'api': {
-                'public': BINANCE_API_URL,
-                'private': BINANCE_API_URL
-            }
+            'api': binance_futures_urls(BINANCE_API_URL)
         }
     })
 
-# 🟢 Place a market order (buy or sell)
-def place_order(side="buy", amount=0.001, symbol=BINANCE_SYMBOL):
+# 🟢 Place a market order (buy or sell) synchronously — the trading path uses src/order_executor.py
+def place_order(side="buy", amount=0.001, symbol=BINANCE_SYMBOL, client_order_id=None):
     try:
         client = get_binance_client()
-        order = client.create_market_order(symbol=symbol, side=side, amount=amount)
+        params = {"clientOrderId": client_order_id} if client_order_id else {}
+        order = client.create_market_order(symbol=symbol, side=side, amount=amount, params=params)
         print(f"✅ Order executed: {side.upper()} {amount} {symbol}")
         return order
     except Exception as e:
         print(f"❌ Failed to place order: {e}")
         return None
 
-# 🧹 Cancel all open orders for a symbol
+# 🧹 Cancel all open orders for a symbol (one cancel-all request instead of one per order)
 def cancel_all_orders(symbol=BINANCE_SYMBOL):
     try:
         client = get_binance_client()
-        orders = client.fetch_open_orders(symbol)
-
-        if not orders:
-            print(f"✅ No open orders to cancel for {symbol}")
-            return
-
-        for order in orders:
-            client.cancel_order(order['id'], symbol)
-            print(f"🚫 Canceled order ID: {order['id']}")
-
-        print(f"🧹 Total {len(orders)} open orders cancelled for {symbol}")
+        client.cancel_all_orders(symbol)
+        print(f"🧹 All open orders cancelled for {symbol}")
 
     except Exception as e:
         print(f"❌ Failed to cancel orders: {e}")
@@ -1,72 +1,89 @@
 # src/confidence_visualizer.py
 
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
+from datetime import datetime, timedelta
+
+from src.plotting import downsample, new_figure, read_time_range, render_parallel, save_figure
 
 CONFIDENCE_LOG_PATH = "logs/confidence_log.csv"
+PLOT_DAYS = 30               # Default window: the last 30 days, not the whole log
+SIGNAL_COLORS = {"LONG": "green", "SHORT": "red"}
 
 # === Plot Confidence Over Time ===
-def plot_confidence_over_time():
+def plot_confidence_over_time(days=PLOT_DAYS, start=None, end=None):
     if not os.path.exists(CONFIDENCE_LOG_PATH):
         print("⚠️ Confidence log not found.")
         return
 
     try:
-        df = pd.read_csv(CONFIDENCE_LOG_PATH, usecols=["timestamp", "confidence", "signal"])
+        start = start or (datetime.utcnow() - timedelta(days=days) if days else None)
+        df = read_time_range(CONFIDENCE_LOG_PATH, start, end, usecols=["timestamp", "confidence", "signal"])
         if df.empty:
             print("⚠️ Confidence log is empty.")
             return
 
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-        plt.figure(figsize=(10, 5))
-        plt.plot(df['timestamp'], df['confidence'], label='Confidence')
-        plt.axhline(0.6, color='green', linestyle='--', label='LONG Threshold')
-        plt.axhline(0.4, color='red', linestyle='--', label='SHORT Threshold')
-        plt.title('Confidence Over Time')
-        plt.xlabel('Timestamp')
-        plt.ylabel('Confidence')
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
-
-        os.makedirs("logs/plots", exist_ok=True)
-        path = "logs/plots/confidence_over_time.png"
-        plt.savefig(path)
+        points = downsample(df.dropna(subset=["confidence"]), "timestamp", "confidence")
+
+        fig, ax = new_figure(figsize=(10, 5))
+        ax.plot(points['timestamp'], points['confidence'], label='Confidence', linewidth=0.8)
+        ax.axhline(0.6, color='green', linestyle='--', label='LONG Threshold')
+        ax.axhline(0.4, color='red', linestyle='--', label='SHORT Threshold')
+        ax.set_title(f'Confidence Over Time ({len(df)} predictions, {len(points)} plotted)')
+        ax.set_xlabel('Timestamp')
+        ax.set_ylabel('Confidence')
+        ax.legend()
+        ax.grid(True)
+
+        path = save_figure(fig, "confidence_over_time.png")
         print(f"📊 Saved: {path}")
+        return path
 
     except Exception as e:
         print(f"❌ Plotting failed: {e}")
 
 
 # === Plot Signal Frequency ===
-def plot_signal_distribution():
-    if not os.path.exists(CONFIDENCE_LOG_PATH):
-        print("⚠️ Confidence log not found.")
-        return
+def plot_signal_distribution(days=PLOT_DAYS):
+    from src.aggregate_cache import get_aggregate_cache
 
     try:
-        df = pd.read_csv(CONFIDENCE_LOG_PATH, usecols=["signal"])
-        if df.empty:
+        # Per-day signal counts are already kept by the aggregate cache
+        signal_counts = get_aggregate_cache().signal_stats(days=days)
+        if not signal_counts:
             print("⚠️ No signal data available.")
             return
 
-        signal_counts = df["signal"].value_counts()
+        signals = sorted(signal_counts, key=lambda s: -signal_counts[s]["count"])
+        fig, ax = new_figure(figsize=(6, 4))
+        ax.bar(signals, [signal_counts[s]["count"] for s in signals],
+               color=[SIGNAL_COLORS.get(s, "gray") for s in signals])
+        ax.set_title(f"Signal Distribution (last {days} days)")
+        ax.set_ylabel("Frequency")
+        ax.grid(axis="y")
 
-        plt.figure(figsize=(6, 4))
-        signal_counts.plot(kind="bar", color=["green", "red", "gray"])
-        plt.title("Signal Distribution")
-        plt.ylabel("Frequency")
-        plt.xticks(rotation=0)
-        plt.tight_layout()
-        plt.grid(axis="y")
-
-        os.makedirs("logs/plots", exist_ok=True)
-        path = "logs/plots/signal_distribution.png"
-        plt.savefig(path)
+        path = save_figure(fig, "signal_distribution.png")
         print(f"📊 Saved: {path}")
+        return path
 
     except Exception as e:
         print(f"❌ Signal plot failed: {e}")
 
+
+# === All charts at once ===
+def render_all_plots(days=PLOT_DAYS, backtest_log="logs/backtest_trades.csv"):
+    """Confidence trend, signal breakdown and (if present) backtest results, rendered in parallel."""
+    from src.backtest_analysis import plot_backtest_results
+
+    tasks = [(plot_confidence_over_time, {"days": days}), (plot_signal_distribution, {"days": days})]
+    if os.path.exists(backtest_log):
+        tasks.append((plot_backtest_results, {"log_path": backtest_log}))
+    return [path for path in render_parallel(tasks) if path]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render the monitoring charts to logs/plots/")
+    parser.add_argument("--days", type=int, default=PLOT_DAYS)
+    args = parser.parse_args()
+    render_all_plots(args.days)
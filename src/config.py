@@ -6,9 +6,12 @@ load_dotenv()
 
 # ==== API and Secrets from .env ====
 TWITTER_BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
+TWITTER_API_URL = os.getenv("TWITTER_API_URL", "https://api.twitter.com/2")  # Point at a local fake server for testing
+SENTIMENT_SCORER = os.getenv("SENTIMENT_SCORER", "textblob")  # textblob | vader | transformer
 API_TOKEN = os.getenv("API_TOKEN", "secret-ml-token")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")  # Point at a local fake server for testing
 
 # ==== Binance Environment Selection ====
 BINANCE_ENV = os.getenv("BINANCE_ENV", "testnet").lower()
@@ -17,10 +20,20 @@ if BINANCE_ENV == "testnet":
     BINANCE_API_KEY = os.getenv("BINANCE_TEST_API_KEY")
     BINANCE_SECRET = os.getenv("BINANCE_TEST_API_SECRET")
     BINANCE_API_URL = "https://testnet.binancefuture.com"
+elif BINANCE_ENV == "sim":   # Local simulator: python -m src.exchange_simulator
+    BINANCE_API_KEY = os.getenv("BINANCE_SIM_API_KEY", "sim-key")
+    BINANCE_SECRET = os.getenv("BINANCE_SIM_API_SECRET", "sim-secret")
+    BINANCE_API_URL = "http://127.0.0.1:8090"
 else:
     BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
     BINANCE_SECRET = os.getenv("BINANCE_SECRET")
     BINANCE_API_URL = "https://fapi.binance.com"
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", BINANCE_API_URL)
+
+# ==== Daemon (single process hosting live loop, scheduler and API) ====
+DAEMON_HOST = os.getenv("DAEMON_HOST", "0.0.0.0")
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8000"))
+DAEMON_URL = os.getenv("DAEMON_URL", f"http://localhost:{DAEMON_PORT}")
 
 # ==== Trading Settings ====
 BINANCE_SYMBOL = "BTC/USDT"
@@ -0,0 +1,117 @@
+# src/daemon.py — One long-running process: candle-driven live loop + scheduler + API
+
+import threading
+import time
+from datetime import datetime
+
+from src.config import DAEMON_HOST, DAEMON_PORT, BINANCE_TIMEFRAME
+from src.market_data_collector import get_candle_buffer
+from src.sentiment_collector import get_sentiment_collector
+from src.utils import timeframe_to_seconds
+
+CANDLE_SETTLE_SECONDS = 3    # Wait after a candle boundary so the exchange has closed it
+
+
+class Daemon:
+    """
+    Hosts the live loop, the job runtime and the FastAPI app in one process,
+    so they share the candle buffer and the warm model cache (position state is journaled on disk).
+    """
+
+    def __init__(self, trade=True):
+        self.trade = trade
+        self.candles = get_candle_buffer()
+        self.runtime = None
+        self.started_at = None
+        self.last_cycle = None
+        self.last_result = None
+        self.cycles = 0
+        self._stop = threading.Event()
+
+    # === Live loop ===
+    def seconds_until_next_candle(self):
+        step = timeframe_to_seconds(BINANCE_TIMEFRAME)
+        return step - (time.time() % step) + CANDLE_SETTLE_SECONDS
+
+    def run_cycle(self):
+        from src.live_trading_engine import predict_and_trade
+        from src.position_manager import handle_signal
+
+        self.candles.refresh()
+        df = self.candles.snapshot(closed_only=True)
+        signal, confidence = predict_and_trade(return_result=True, df=df)
+        if self.trade and signal in ("LONG", "SHORT"):
+            handle_signal(signal, float(df["close"].iloc[-1]), candle_time=df["timestamp"].iloc[-1])
+
+        self.cycles += 1
+        self.last_cycle = datetime.utcnow()
+        self.last_result = {"signal": signal, "confidence": confidence,
+                            "candle_time": str(df["timestamp"].iloc[-1]) if df is not None and len(df) else None}
+
+    def live_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                print(f"❌ Live cycle failed: {e}")
+            self._stop.wait(self.seconds_until_next_candle())
+
+    # === Lifecycle ===
+    def start_background(self):
+        from job_scheduler import build_runtime
+        from src.live_trading_engine import load_latest_artifacts
+        from src.sentiment_pipeline import collect_sentiment
+
+        self.started_at = datetime.utcnow()
+        load_latest_artifacts()  # Warm the model before the first candle
+        collect_sentiment()      # Start the background sentiment collector
+        if self.trade:
+            from src.order_executor import get_order_executor
+            get_order_executor()  # Resumes an order a previous run left pending
+        self.runtime = build_runtime()
+        self.runtime.start()
+        threading.Thread(target=self.live_loop, name="live-loop", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self.runtime:
+            self.runtime.stop()
+
+    def status(self):
+        jobs = {}
+        if self.runtime:
+            for name in self.runtime.jobs:
+                entry = self.runtime.state.get(name, {})
+                jobs[name] = {
+                    "last_run": entry.get("last_run"),
+                    "last_status": entry.get("last_status"),
+                    **self.runtime.duration_stats(name),
+                }
+        return {
+            "started_at": str(self.started_at),
+            "cycles": self.cycles,
+            "last_cycle": str(self.last_cycle) if self.last_cycle else None,
+            "last_result": self.last_result,
+            "sentiment": get_sentiment_collector().latest(),
+            "jobs": jobs,
+        }
+
+
+_daemon = None
+
+def get_daemon():
+    return _daemon
+
+def run_daemon(host=DAEMON_HOST, port=DAEMON_PORT, trade=True):
+    global _daemon
+    import uvicorn
+    from api.main import app
+
+    _daemon = Daemon(trade=trade)
+    _daemon.start_background()
+    print(f"🛰️ Daemon running: live loop + scheduler + API on {host}:{port}")
+    try:
+        uvicorn.run(app, host=host, port=port)
+    finally:
+        _daemon.stop()
+        print("🛑 Daemon stopped.")
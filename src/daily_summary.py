@@ -1,31 +1,28 @@
 # src/daily_summary.py
 
-import pandas as pd
 from datetime import datetime
+from src.aggregate_cache import get_aggregate_cache
 from src.telegram_alerts import send_alert
 
 def send_daily_summary():
     try:
-        df = pd.read_csv("logs/trade_log.csv")
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-        today = datetime.now().date()
-        today_trades = df[df['timestamp'].dt.date == today]
-
-        if today_trades.empty:
+        # Executed signals come from confidence_log.csv (same rows as log_trade), PnL from closed positions
+        cache = get_aggregate_cache()
+        today = datetime.utcnow().date()
+        signals = cache.signal_stats(days=1, end=today)
+        executed = {s: signals.get(s, {"count": 0, "avg_confidence": 0.0}) for s in ("LONG", "SHORT", "HOLD")}
+
+        total = sum(s["count"] for s in executed.values())
+        if not total:
             send_alert("📭 No trades recorded today.")
             return
 
-        total = len(today_trades)
-        longs = (today_trades['signal'] == "LONG").sum()
-        shorts = (today_trades['signal'] == "SHORT").sum()
-        holds = (today_trades['signal'] == "HOLD").sum()
-        avg_conf = today_trades['confidence'].mean()
+        longs, shorts, holds = (executed[s]["count"] for s in ("LONG", "SHORT", "HOLD"))
+        avg_conf = sum(s["count"] * s["avg_confidence"] for s in executed.values()) / total
 
         # PnL metrics
-        closed_trades = today_trades[today_trades['pnl_percent'].notna()]
-        avg_pnl = closed_trades['pnl_percent'].mean() if not closed_trades.empty else 0.0
-        win_rate = (closed_trades['pnl_percent'] > 0).mean() * 100 if not closed_trades.empty else 0.0
+        closed = cache.trade_stats(days=1, end=today)
+        avg_pnl, win_rate = closed["avg_pnl"], closed["win_rate"]
 
         summary = (
             f"📊 Daily Summary ({today}):\n"
@@ -34,7 +31,7 @@ def send_daily_summary():
             f"🟩 LONG: {longs} | 🔻 SHORT: {shorts} | ⚪ HOLD: {holds}\n"
             f"⚡ Avg Confidence: {avg_conf:.2%}\n"
             f"💰 Avg PnL: {avg_pnl:.2f}%\n"
-            f"🥇 Win Rate: {win_rate:.1f}% ({len(closed_trades)} closed)\n"
+            f"🥇 Win Rate: {win_rate:.1f}% ({closed['trades']} closed)\n"
             f"🕒 Sent at: {datetime.now().strftime('%H:%M:%S')}"
         )
 
@@ -0,0 +1,291 @@
+# src/drift_monitor.py — Streaming drift detection over model inputs and confidences
+
+import json
+import os
+import threading
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+
+MONITORED_FEATURES = ['rsi_14', 'ema_21', 'macd', 'sentiment', 'confidence']
+STATE_PATH = "logs/drift_state.json"               # Rolling windows, rewritten every candle
+REFERENCE_PATH = "logs/drift_reference.json"       # Frozen reference, written only when it is set
+WARMUP_PATH = "logs/drift_warmup.jsonl"            # Values appended while a reference is still filling
+REFERENCE_SIZE = 2016        # One week of 5m candles frozen as the reference
+RECENT_SIZE = 288            # Sliding window of the last day of 5m candles
+N_BINS = 20                  # Quantile bins fixed from the reference window
+PSI_THRESHOLD = 0.25         # Common "significant shift" cut-off for PSI
+EPS = 1e-4
+
+REFERENCE_FIELDS = ("reference_size", "n_bins", "edges", "reference_counts", "scale", "frozen_at")
+ROLLING_FIELDS = ("recent_size", "ring", "recent_counts", "pos", "filled", "frozen_at")
+
+
+class StreamingHistogram:
+    """
+    Fixed-size histogram pair for one feature.
+
+    The first `reference_size` values fix quantile bin edges and the reference counts;
+    afterwards each value updates a sliding window of `recent_size` bin indices in O(1).
+    """
+
+    def __init__(self, reference_size=REFERENCE_SIZE, recent_size=RECENT_SIZE, n_bins=N_BINS):
+        self.reference_size = reference_size
+        self.recent_size = recent_size
+        self.n_bins = n_bins
+        self.reference_values = []
+        self.edges = None            # Inner bin edges; values outside land in overflow bins
+        self.reference_counts = None
+        self.scale = 1.0
+        self.frozen_at = None        # Identifies the reference the rolling window was filled against
+        self.ring = [0] * recent_size
+        self.recent_counts = None
+        self.pos = 0
+        self.filled = 0
+
+    @property
+    def is_frozen(self):
+        return self.edges is not None
+
+    def freeze(self, values=None):
+        values = np.asarray(self.reference_values if values is None else values, dtype=float)
+        values = values[np.isfinite(values)]
+        self.edges = np.unique(np.quantile(values, np.linspace(0, 1, self.n_bins + 1))).tolist()
+        self.reference_counts = [0] * (len(self.edges) + 1)
+        for value in values:
+            self.reference_counts[bisect_right(self.edges, value)] += 1
+        std = float(values.std())
+        self.scale = std if std > 0 else 1.0
+        self.frozen_at = datetime.utcnow().isoformat()
+        self.reference_values = []
+        self.clear_recent()
+
+    def clear_recent(self):
+        self.recent_counts = [0] * (len(self.edges) + 1)
+        self.ring = [0] * self.recent_size
+        self.pos = 0
+        self.filled = 0
+
+    def update(self, value):
+        if value is None or not np.isfinite(value):
+            return
+        if not self.is_frozen:
+            self.reference_values.append(float(value))
+            if len(self.reference_values) >= self.reference_size:
+                self.freeze()
+            return
+
+        b = bisect_right(self.edges, value)
+        if self.filled == self.recent_size:
+            self.recent_counts[self.ring[self.pos]] -= 1
+        else:
+            self.filled += 1
+        self.ring[self.pos] = b
+        self.recent_counts[b] += 1
+        self.pos = (self.pos + 1) % self.recent_size
+
+    def _distributions(self):
+        p = np.asarray(self.reference_counts, dtype=float)
+        q = np.asarray(self.recent_counts, dtype=float)
+        return p / max(p.sum(), 1.0), q / max(q.sum(), 1.0)
+
+    def _bin_positions(self):
+        edges = np.asarray(self.edges)
+        if len(edges) == 1:
+            return np.array([edges[0], edges[0]])
+        centers = (edges[:-1] + edges[1:]) / 2
+        return np.concatenate([[edges[0] - (centers[0] - edges[0])], centers,
+                               [edges[-1] + (edges[-1] - centers[-1])]])
+
+    def wasserstein(self):
+        """1-Wasserstein distance between binned distributions, in reference std units."""
+        p, q = self._distributions()
+        gaps = np.diff(self._bin_positions())
+        return float(np.sum(np.abs(np.cumsum(p) - np.cumsum(q))[:-1] * gaps) / self.scale)
+
+    def psi(self):
+        p, q = self._distributions()
+        p, q = np.clip(p, EPS, None), np.clip(q, EPS, None)
+        return float(np.sum((q - p) * np.log(q / p)))
+
+    def to_dict(self, fields=None):
+        return {k: v for k, v in self.__dict__.items() if fields is None or k in fields}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data.get("reference_size", REFERENCE_SIZE), data.get("recent_size", RECENT_SIZE),
+                   data.get("n_bins", N_BINS))
+        hist.__dict__.update(data)
+        if hist.is_frozen and hist.recent_counts is None:
+            hist.clear_recent()          # Reference without a matching rolling window
+        return hist
+
+
+class DriftMonitor:
+    def __init__(self, features=MONITORED_FEATURES, path=STATE_PATH, reference_path=REFERENCE_PATH,
+                 warmup_path=WARMUP_PATH):
+        self.path = path
+        self.reference_path = reference_path
+        self.warmup_path = warmup_path
+        self.histograms = {feature: StreamingHistogram() for feature in features}
+        self.last_candle = None
+        self._saved_mtime = None
+        self._lock = threading.Lock()
+
+    def _sync_from_disk(self):
+        # Another process (e.g. a retrain re-seeding the reference) may have rewritten the state
+        if os.path.exists(self.path) and os.path.getmtime(self.path) != self._saved_mtime:
+            fresh = DriftMonitor.load(self.path, self.reference_path, self.warmup_path)
+            self.histograms, self.last_candle = fresh.histograms, fresh.last_candle
+            self._saved_mtime = fresh._saved_mtime
+
+    def update(self, values, candle_time=None):
+        """Feed one candle's feature values (dict-like, may include 'confidence') once."""
+        with self._lock:
+            self._sync_from_disk()
+            if candle_time is not None:
+                candle_time = str(candle_time)
+                if candle_time == self.last_candle:
+                    return False
+                self.last_candle = candle_time
+
+            warming, froze = {}, False
+            for feature, hist in self.histograms.items():
+                if feature not in values:
+                    continue
+                value, was_frozen = float(values[feature]), hist.is_frozen
+                hist.update(value)
+                if hist.is_frozen and not was_frozen:
+                    froze = True
+                elif not hist.is_frozen and np.isfinite(value):
+                    warming[feature] = [value]
+
+            if froze:
+                self.save_reference()
+            self.save()
+            if warming and not froze:
+                self._append_warmup(warming)
+            return True
+
+    def reset_reference(self, reference):
+        """Re-seed reference windows (e.g. with a fresh model's training data) and clear recent windows."""
+        with self._lock:
+            for feature, hist in self.histograms.items():
+                if feature in reference and len(reference[feature]):
+                    hist.freeze(np.asarray(reference[feature])[-hist.reference_size:])
+                else:
+                    self.histograms[feature] = StreamingHistogram()
+            self.save_reference()
+            self.save()
+
+    def ready_features(self):
+        return [f for f, h in self.histograms.items() if h.is_frozen and h.filled >= h.recent_size // 2]
+
+    def evaluate(self, wd_threshold=0.15, psi_threshold=PSI_THRESHOLD):
+        metrics, drifted = {}, []
+        with self._lock:
+            for feature in self.ready_features():
+                hist = self.histograms[feature]
+                metrics[f"{feature}_wd"] = round(hist.wasserstein(), 4)
+                metrics[f"{feature}_psi"] = round(hist.psi(), 4)
+                if metrics[f"{feature}_wd"] > wd_threshold or metrics[f"{feature}_psi"] > psi_threshold:
+                    drifted.append(feature)
+        return metrics, drifted
+
+    # === Persistence ===
+    # Per candle only the fixed-size rolling windows are rewritten (plus one appended line while a
+    # reference is still filling); the frozen reference is written once, when it is set.
+    def save(self):
+        state = {
+            "last_candle": self.last_candle,
+            "histograms": {f: h.to_dict(ROLLING_FIELDS) for f, h in self.histograms.items()},
+        }
+        _write_json(self.path, state)
+        self._saved_mtime = os.path.getmtime(self.path)
+
+    def save_reference(self):
+        reference = {f: h.to_dict(REFERENCE_FIELDS) for f, h in self.histograms.items() if h.is_frozen}
+        _write_json(self.reference_path, reference)
+
+        # Values of references still filling, in one line (the per-candle lines they came from are dropped)
+        warming = {f: h.reference_values for f, h in self.histograms.items() if not h.is_frozen and h.reference_values}
+        if warming:
+            tmp_path = self.warmup_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(json.dumps(warming) + "\n")
+            os.replace(tmp_path, self.warmup_path)
+        elif os.path.exists(self.warmup_path):
+            os.remove(self.warmup_path)
+
+    def _append_warmup(self, values):
+        with open(self.warmup_path, "a") as f:
+            f.write(json.dumps(values) + "\n")
+
+    @classmethod
+    def load(cls, path=STATE_PATH, reference_path=REFERENCE_PATH, warmup_path=WARMUP_PATH):
+        monitor = cls(path=path, reference_path=reference_path, warmup_path=warmup_path)
+        try:
+            state = _read_json(path) or {}
+            reference = _read_json(reference_path) or {}
+            warmup = _read_warmup(warmup_path)
+            rolling = state.get("histograms", {})
+            # Older single-file state kept each full histogram (reference included) in drift_state.json
+            legacy = not reference and any("edges" in data for data in rolling.values())
+
+            monitor.last_candle = state.get("last_candle")
+            for feature in monitor.histograms:
+                ref, window = reference.get(feature, {}), rolling.get(feature, {})
+                if not legacy and window.get("frozen_at") != ref.get("frozen_at"):
+                    window = {}              # Rolling window belongs to an older reference
+                hist = StreamingHistogram.from_dict({**ref, **window})
+                if not hist.is_frozen and not legacy:
+                    hist.reference_values = warmup.get(feature, [])
+                monitor.histograms[feature] = hist
+
+            if os.path.exists(path):
+                monitor._saved_mtime = os.path.getmtime(path)
+            if legacy:
+                monitor.save_reference()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Could not load drift state, starting fresh: {e}")
+            monitor = cls(path=path, reference_path=reference_path, warmup_path=warmup_path)
+        return monitor
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _read_warmup(path):
+    values = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    chunk = json.loads(line)
+                except ValueError:
+                    continue                 # Torn last line after a crash
+                for feature, feature_values in chunk.items():
+                    values.setdefault(feature, []).extend(feature_values)
+    return values
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_drift_monitor():
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = DriftMonitor.load()
+        return _monitor
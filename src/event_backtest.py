@@ -0,0 +1,241 @@
+# src/event_backtest.py — Event-driven backtest of the live position state machine over precomputed signals
+
+import os
+import time
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+from src.config import BINANCE_SYMBOL, BINANCE_TIMEFRAME
+from src.position_manager import COOLDOWN_MINUTES
+from src.utils import timeframe_to_seconds
+
+TRADES_DIR = "logs/event_backtest"   # One virtual_positions-schema CSV per symbol
+POSITION_COLUMNS = ["timestamp", "entry_time", "signal", "entry_price", "exit_price", "pnl_percent", "balance_after"]
+
+
+# === Signals ===
+def encode_signals(signals):
+    """"LONG"/"SHORT"/anything else → int8 codes 1/-1/0."""
+    signals = np.asarray(signals)
+    return np.where(signals == "LONG", 1, np.where(signals == "SHORT", -1, 0)).astype(np.int8)
+
+def _next_true(mask):
+    # nxt[k] = first j >= k with mask[j] (len(mask) when none), with a trailing sentinel
+    n = len(mask)
+    idx = np.where(mask, np.arange(n), n)
+    return np.append(np.minimum.accumulate(idx[::-1])[::-1], n)
+
+
+# === Core loop ===
+def simulate(times, prices, codes, cooldown_minutes=COOLDOWN_MINUTES, balance=10000.0):
+    """
+    position_manager.handle_signal over a whole series: flat → open on any signal; open →
+    close on the opposite signal (no re-open on that candle); after a close, signals before
+    close time + cooldown are skipped; balance compounds by each trade's return.
+
+    `times` are decision times (int64 ns or datetime64), `codes` come from encode_signals.
+    Only bars carrying a signal are visited, and within those the loop jumps straight to
+    the next opposite signal / end of cooldown, so the Python work is O(trades).
+    Returns {"entry", "exit", "side", "pnl", "balance", "open"} (bar indices, numpy arrays).
+    """
+    times = np.asarray(times).astype("datetime64[ns]").astype(np.int64)
+    prices = np.asarray(prices, dtype=float)
+    events = np.flatnonzero(codes)
+    event_times, event_codes = times[events], np.asarray(codes)[events]
+    next_long, next_short = _next_true(event_codes > 0), _next_true(event_codes < 0)
+    cooldown_ns = int(cooldown_minutes * 60 * 1e9)
+
+    # Plain lists + bisect: per-trade scalar access is far cheaper than on numpy arrays
+    t, c, nl, ns = event_times.tolist(), event_codes.tolist(), next_long.tolist(), next_short.tolist()
+    n, k = len(events), 0
+    entries, exits, open_at = [], [], -1
+    while k < n:
+        j = ns[k + 1] if c[k] > 0 else nl[k + 1]
+        if j >= n:
+            open_at = int(events[k])            # Still open at the end of the series
+            break
+        entries.append(k)
+        exits.append(j)
+        k = max(j + 1, bisect_left(t, t[j] + cooldown_ns, j + 1))
+
+    entry, exit_ = events[entries], events[exits]
+    side = event_codes[entries]
+    entry_price, exit_price = prices[entry], prices[exit_]
+    pnl = np.where(side > 0, (exit_price - entry_price) / entry_price, (entry_price - exit_price) / entry_price)
+    # Same multiplication order as the live balance update, so results match it exactly
+    balances = np.cumprod(np.concatenate([[balance], 1 + pnl]))[1:]
+    return {"entry": entry, "exit": exit_, "side": side, "pnl": pnl, "balance": balances, "open": open_at}
+
+def _trade_log(result, decision_times, prices):
+    return pd.DataFrame({
+        "timestamp": decision_times[result["exit"]],
+        "entry_time": decision_times[result["entry"]],
+        "signal": np.where(result["side"] > 0, "LONG", "SHORT"),
+        "entry_price": np.round(prices[result["entry"]], 2),
+        "exit_price": np.round(prices[result["exit"]], 2),
+        "pnl_percent": np.round(result["pnl"] * 100, 2),
+        "balance_after": np.round(result["balance"], 2),
+    }, columns=POSITION_COLUMNS)
+
+
+# === Portfolio run ===
+@metrics.timed("event_backtest.total")
+def run_event_backtest(frames, cooldown_minutes=COOLDOWN_MINUTES, balance=10000.0, weights=None,
+                       timeframe=BINANCE_TIMEFRAME, save_to_file=True, strategy_name="LSTM_v1_live_state_machine"):
+    """
+    Backtest one or more symbols with the live position semantics.
+
+    `frames` maps symbol → DataFrame with timestamp (candle open), close and either a `signal`
+    column (LONG/SHORT/other) or `confidence` + `rsi_14` (mapped with the live signal rule).
+    A bare DataFrame is treated as BINANCE_SYMBOL. Each symbol trades its own slice of
+    `balance` (`weights`, equal by default) and compounds it independently.
+    Returns (trades per symbol in the virtual_positions.csv schema, summary dict).
+    """
+    from src.backtest_analysis import compute_backtest_metrics, log_backtest_summary
+    from src.live_trading_engine import classify_signals
+
+    if isinstance(frames, pd.DataFrame):
+        frames = {BINANCE_SYMBOL: frames}
+    weights = weights or {symbol: 1 / len(frames) for symbol in frames}
+    step = pd.Timedelta(seconds=timeframe_to_seconds(timeframe))
+
+    trades, per_symbol, bars = {}, {}, 0
+    start = time.perf_counter()
+    for symbol, df in frames.items():
+        signals = df["signal"].values if "signal" in df else classify_signals(df["confidence"].values,
+                                                                               df["rsi_14"].values)
+        decision_times = (pd.to_datetime(df["timestamp"]) + step).values   # Decided once the candle closes
+        prices = df["close"].to_numpy(dtype=float)
+        sleeve = balance * weights[symbol]
+
+        with metrics.span("event_backtest.simulate"):
+            codes = encode_signals(signals)
+            result = simulate(decision_times, prices, codes, cooldown_minutes, sleeve)
+        trades[symbol] = _trade_log(result, decision_times, prices)
+        final = float(result["balance"][-1]) if len(result["balance"]) else sleeve
+        per_symbol[symbol] = {
+            "bars": len(df),
+            "trades": len(trades[symbol]),
+            "start_balance": round(sleeve, 2),
+            "final_balance": round(final, 2),
+            "return_pct": round((final / sleeve - 1) * 100, 2),
+            "open_position": None if result["open"] < 0 else ("LONG" if codes[result["open"]] > 0 else "SHORT"),
+        }
+        bars += len(df)
+    elapsed = time.perf_counter() - start
+
+    final_balance = sum(s["final_balance"] for s in per_symbol.values())
+    combined = pd.concat(list(trades.values()), ignore_index=True)
+    base = compute_backtest_metrics(combined, strategy_name=strategy_name)
+    summary = {
+        **(base or {"strategy": strategy_name, "num_trades": 0}),
+        "final_balance": round(final_balance, 2),
+        "return_pct": round((final_balance / balance - 1) * 100, 2),
+        "bars_per_second": round(bars / elapsed) if elapsed else None,
+        "symbols": per_symbol,
+    }
+    metrics.inc("backtest_trades_total", len(combined))
+
+    if save_to_file:
+        os.makedirs(TRADES_DIR, exist_ok=True)
+        for symbol, symbol_trades in trades.items():
+            symbol_trades.to_csv(os.path.join(TRADES_DIR, f"virtual_positions_{symbol.replace('/', '')}.csv"),
+                                 index=False)
+        log_backtest_summary(base)   # Same columns as run_backtest's rows
+        print(f"✅ Event backtest complete. {len(combined)} trades saved to {TRADES_DIR}/")
+
+    return trades, summary
+
+
+# === Checks and throughput ===
+def _random_signals(n, density, seed):
+    rng = np.random.default_rng(seed)
+    codes = np.where(rng.uniform(size=n) < density, rng.choice(np.array(["LONG", "SHORT"]), n), "FILTERED")
+    return codes
+
+def run_checks():
+    """Parity with the real position manager (via src.replay_driver) on identical signals."""
+    import shutil
+    import tempfile
+    from src import replay_driver
+    from src.synthetic_data import generate_ohlcv
+
+    df = generate_ohlcv(n=50_000)
+    workdir = tempfile.mkdtemp(prefix="cfml_event_bt_")
+    saved_dir, replay_driver.REPLAY_DIR = replay_driver.REPLAY_DIR, workdir
+    try:
+        for density, cooldown in ((0.02, COOLDOWN_MINUTES), (0.5, 0), (0.5, 60)):
+            df["signal"] = _random_signals(len(df), density, seed=int(density * 100) + cooldown)
+            expected, replayed = replay_driver.replay_positions(df, np.full(len(df), np.nan), name="check",
+                                                                cooldown_minutes=cooldown, signals=df["signal"].values)
+            trades, summary = run_event_backtest(df, cooldown_minutes=cooldown, save_to_file=False)
+            got = trades[BINANCE_SYMBOL]
+            assert len(got) == len(expected), (len(got), len(expected))
+            assert (pd.to_datetime(got["timestamp"]).values == pd.to_datetime(expected["timestamp"]).values).all()
+            assert got["signal"].tolist() == expected["signal"].tolist()
+            assert summary["final_balance"] == replayed["final_balance"], (summary["final_balance"], replayed["final_balance"])
+            assert summary["symbols"][BINANCE_SYMBOL]["open_position"] == replayed["open_position"]
+            print(f"✅ density {density} cooldown {cooldown}m: {len(got)} trades match the position manager "
+                  f"(balance {summary['final_balance']:.2f})")
+
+        # Two symbols: each sleeve equals a single-symbol run on half the capital
+        other = generate_ohlcv(n=30_000, seed=7)
+        other["signal"] = _random_signals(len(other), 0.1, seed=9)
+        _, portfolio = run_event_backtest({"BTC/USDT": df, "ETH/USDT": other}, save_to_file=False)
+        _, alone = run_event_backtest({"ETH/USDT": other}, balance=5000.0, save_to_file=False)
+        assert portfolio["symbols"]["ETH/USDT"] == alone["symbols"]["ETH/USDT"]
+        print(f"✅ Portfolio of 2 symbols: {portfolio['num_trades']} trades, balance {portfolio['final_balance']:.2f}")
+    finally:
+        replay_driver.REPLAY_DIR = saved_dir
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def run_bench(n=1_000_000):
+    """Bars/second of the core loop for sparse (live-like) and dense signals."""
+    from src.synthetic_data import generate_ohlcv
+
+    df = generate_ohlcv(n=n)
+    times = (df["timestamp"] + pd.Timedelta(minutes=5)).values
+    prices = df["close"].to_numpy()
+    for density in (0.015, 0.2, 1.0):
+        codes = encode_signals(_random_signals(n, density, seed=1))
+        start = time.perf_counter()
+        result = simulate(times, prices, codes)
+        elapsed = time.perf_counter() - start
+        print(f"⏱️ {n} bars, signal density {density:.1%}: {len(result['pnl'])} trades in {elapsed * 1000:.1f} ms "
+              f"({n / elapsed / 1e6:.1f}M bars/s)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Event-driven backtest with live position semantics")
+    parser.add_argument("--symbols", default=BINANCE_SYMBOL, help="Comma-separated, e.g. BTC/USDT,ETH/USDT")
+    parser.add_argument("--source", default="store", help="store | synthetic | path to a features CSV")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--signals", default="model", choices=["model", "random"])
+    parser.add_argument("--cooldown", type=float, default=COOLDOWN_MINUTES)
+    parser.add_argument("--check", action="store_true", help="Parity check against the position manager")
+    parser.add_argument("--bench", action="store_true", help="Throughput of the core loop")
+    args = parser.parse_args()
+
+    if args.check:
+        run_checks()
+    elif args.bench:
+        run_bench()
+    else:
+        try:
+            from src.replay_driver import load_history, model_confidences, random_confidences
+            frames = {}
+            for symbol in args.symbols.split(","):
+                df = load_history(args.source, args.days, symbol=symbol)
+                cache_symbol = symbol if args.source == "store" else None   # Only stored candles are cached
+                df["confidence"] = model_confidences(df, cache_symbol) if args.signals == "model" \
+                    else random_confidences(len(df))
+                frames[symbol] = df
+            _, summary = run_event_backtest(frames, cooldown_minutes=args.cooldown)
+            print(summary)
+        except Exception as e:
+            print(f"❌ Event backtest failed: {e}")
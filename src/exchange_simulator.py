@@ -0,0 +1,842 @@
+# src/exchange_simulator.py — Local Binance-Futures-compatible exchange: order book, matching, fees, funding, candle replay
+#
+#   python -m src.exchange_simulator [--port 8090] [--candles synthetic|store|file.csv] [--speed 60]
+#   python -m src.exchange_simulator --check   → drive it through ccxt (BINANCE_ENV=sim) and the order executor
+#   python -m src.exchange_simulator --bench   → orders/sec through the engine and over HTTP
+#
+# Point the bot at it with BINANCE_ENV=sim (and BINANCE_API_URL if not on 127.0.0.1:8090).
+# Signatures are not verified; any X-MBX-APIKEY opens (or reuses) an account.
+
+import base64
+import hashlib
+import heapq
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from src.utils import timeframe_to_seconds
+
+DEFAULT_PORT = 8090
+STARTING_BALANCE = 10_000.0  # USDT per new account
+MAKER_FEE = 0.0002           # Binance Futures VIP0 maker
+TAKER_FEE = 0.0005           # ...and taker
+FUNDING_RATE = 0.0001        # Per funding interval (longs pay shorts when positive)
+FUNDING_INTERVAL_MS = 8 * 3600 * 1000
+DEFAULT_LEVERAGE = 20
+SPREAD_BPS = 1.0             # Synthetic liquidity quotes last price ± half of this
+SYNTHETIC_DEPTH = 100.0      # Quantity shown for the synthetic quote in /depth (fills are unlimited)
+TICK_SIZE = 0.1
+STEP_SIZE = 0.001
+MIN_NOTIONAL = 5.0           # USDT; low enough for the bot's 0.001 BTC orders
+WS_QUEUE_SIZE = 1000         # Events buffered per websocket client before it is dropped
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+
+
+class SimError(Exception):
+    """Rejected request, rendered as Binance's {"code", "msg"} error body."""
+
+    def __init__(self, code, msg, status=400):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+        self.status = status
+
+
+class Order:
+    __slots__ = ("order_id", "client_order_id", "account", "symbol", "side", "type", "tif", "price",
+                 "quantity", "executed", "cum_quote", "status", "reduce_only", "time", "update_time")
+
+    def __init__(self, order_id, client_order_id, account, symbol, side, type_, tif, price, quantity,
+                 reduce_only, now):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.account = account
+        self.symbol = symbol
+        self.side = side
+        self.type = type_
+        self.tif = tif
+        self.price = price
+        self.quantity = quantity
+        self.executed = 0.0
+        self.cum_quote = 0.0
+        self.status = "NEW"
+        self.reduce_only = reduce_only
+        self.time = self.update_time = now
+
+    @property
+    def remaining(self):
+        return round(self.quantity - self.executed, 8)
+
+    def to_binance(self):
+        avg = self.cum_quote / self.executed if self.executed else 0.0
+        return {
+            "orderId": self.order_id, "symbol": self.symbol, "status": self.status,
+            "clientOrderId": self.client_order_id, "price": f"{self.price or 0:.2f}", "avgPrice": f"{avg:.5f}",
+            "origQty": f"{self.quantity:.3f}", "executedQty": f"{self.executed:.3f}", "cumQty": f"{self.executed:.3f}",
+            "cumQuote": f"{self.cum_quote:.5f}", "timeInForce": self.tif, "type": self.type,
+            "reduceOnly": self.reduce_only, "closePosition": False, "side": self.side, "positionSide": "BOTH",
+            "stopPrice": "0", "workingType": "CONTRACT_PRICE", "priceProtect": False, "origType": self.type,
+            "time": self.time, "updateTime": self.update_time,
+        }
+
+
+class OrderBook:
+    """Price levels of resting limit orders (FIFO per level), best prices via lazily cleaned heaps."""
+
+    def __init__(self):
+        self.levels = {"BUY": {}, "SELL": {}}    # side -> price -> deque[Order]
+        self._heaps = {"BUY": [], "SELL": []}    # bids stored negated (max-heap)
+
+    def add(self, order):
+        levels = self.levels[order.side]
+        if order.price not in levels:
+            levels[order.price] = deque()
+            heapq.heappush(self._heaps[order.side], -order.price if order.side == "BUY" else order.price)
+        levels[order.price].append(order)
+
+    def remove(self, order):
+        level = self.levels[order.side].get(order.price)
+        if level is not None and order in level:
+            level.remove(order)
+            if not level:
+                del self.levels[order.side][order.price]
+
+    def best(self, side):
+        heap, levels = self._heaps[side], self.levels[side]
+        while heap:
+            price = -heap[0] if side == "BUY" else heap[0]
+            if price in levels:
+                return price
+            heapq.heappop(heap)
+        return None
+
+    def depth(self, side, limit):
+        prices = sorted(self.levels[side], reverse=(side == "BUY"))[:limit]
+        return [(p, sum(o.remaining for o in self.levels[side][p])) for p in prices]
+
+
+class Account:
+    def __init__(self, key, balance=STARTING_BALANCE):
+        self.key = key
+        self.balance = balance
+        self.positions = {}          # symbol -> [signed qty, entry price]
+        self.leverage = {}
+        self.orders = {}             # order id -> Order (all, for lookups)
+        self.open_orders = {}        # order id -> Order resting in the book
+        self.open_notional = 0.0     # Sum of remaining qty * price over open_orders (margin check)
+        self.by_client_id = {}       # client order id -> Order
+        self.trades = []
+        self.income = []
+
+
+class ExchangeSimulator:
+    """
+    Matching engine for USDT-margined perpetuals driven by a replayed candle series.
+
+    Incoming orders match resting orders (price-time priority) and then synthetic liquidity quoted
+    at the last price ± SPREAD_BPS/2, so market orders always fill. `advance()` replays the next
+    candle: resting limits its range crosses fill as makers, last/mark price moves to the close and
+    funding is settled at each 8h boundary. The clock is the replayed candle time.
+    """
+
+    def __init__(self, candles, symbol="BTCUSDT", timeframe="5m", start_index=1000,
+                 maker_fee=MAKER_FEE, taker_fee=TAKER_FEE, funding_rate=FUNDING_RATE, spread_bps=SPREAD_BPS):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.step_ms = timeframe_to_seconds(timeframe) * 1000
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.funding_rate = funding_rate
+        self.spread = spread_bps / 10_000
+
+        ts = candles["timestamp"].astype("datetime64[ms]").astype("int64").to_numpy()
+        self.candles = np.column_stack([ts, candles[["open", "high", "low", "close", "volume"]].to_numpy(dtype=float)])
+        self.book = OrderBook()
+        self.accounts = {}
+        self._subscribers = []       # (streams, queue) for websocket clients
+        self.lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._set_cursor(min(start_index, len(self.candles) - 1))
+        self.next_funding = (self.now // FUNDING_INTERVAL_MS + 1) * FUNDING_INTERVAL_MS
+
+    # === Clock / prices ===
+    def _set_cursor(self, index):
+        # Clock, last price and synthetic quotes only change with the candle, so they're cached
+        self.cursor = index                                  # Last closed candle
+        self.now = int(self.candles[index, 0]) + self.step_ms
+        self.last_price = float(self.candles[index, 4])
+        self._quotes = {side: round(round(self.last_price * (1 + sign * self.spread / 2) / TICK_SIZE) * TICK_SIZE, 2)
+                        for side, sign in (("BUY", 1), ("SELL", -1))}
+
+    def quote(self, side):
+        """Synthetic price a taker `side` order fills at."""
+        return self._quotes[side]
+
+    def account(self, key):
+        if not key:
+            raise SimError(-2015, "Invalid API-key, IP, or permissions for action.", status=401)
+        if key not in self.accounts:
+            self.accounts[key] = Account(key)
+        return self.accounts[key]
+
+    # === Orders ===
+    def place_order(self, key, symbol, side, type_, quantity, price=None, client_order_id=None,
+                    time_in_force="GTC", reduce_only=False):
+        with self.lock:
+            account = self.account(key)
+            if symbol != self.symbol:
+                raise SimError(-1121, "Invalid symbol.")
+            side, type_ = side.upper(), type_.upper()
+            if side not in ("BUY", "SELL"):
+                raise SimError(-1117, "Invalid side.")
+            if type_ not in ("MARKET", "LIMIT"):
+                raise SimError(-1116, "Invalid orderType.")
+            quantity = round(float(quantity), 3)
+            if quantity < STEP_SIZE:
+                raise SimError(-4003, "Quantity less than or equal to zero.")
+            if type_ == "LIMIT":
+                if price is None:
+                    raise SimError(-1102, "Mandatory parameter 'price' was not sent, was empty/null, or malformed.")
+                price = round(round(float(price) / TICK_SIZE) * TICK_SIZE, 2)
+            else:
+                price, time_in_force = None, "GTC"
+            if quantity * (price or self.last_price) < MIN_NOTIONAL:
+                raise SimError(-4164, f"Order's notional must be no smaller than {MIN_NOTIONAL:g}")
+            client_order_id = client_order_id or f"sim-{next(self._ids)}-{time.time_ns()}"
+            if client_order_id in account.by_client_id:
+                raise SimError(-4116, "ClientOrderId is duplicated.")
+            self._check_margin(account, side, quantity, price or self.quote(side), reduce_only)
+
+            order = Order(next(self._ids), client_order_id, account, symbol, side, type_, time_in_force,
+                          price, quantity, reduce_only, self.now)
+            account.orders[order.order_id] = order
+            account.by_client_id[client_order_id] = order
+            self._match(order)
+            if order.remaining > 0:
+                if type_ == "LIMIT" and time_in_force == "GTC":
+                    self.book.add(order)
+                    account.open_orders[order.order_id] = order
+                    account.open_notional += order.remaining * order.price
+                    order.status = "PARTIALLY_FILLED" if order.executed else "NEW"
+                else:
+                    order.status = "EXPIRED"
+            if self._subscribers:
+                self._publish(f"{symbol.lower()}@orderUpdate", order.to_binance())
+            return order
+
+    def _check_margin(self, account, side, quantity, price, reduce_only):
+        qty, _ = account.positions.get(self.symbol, (0.0, 0.0))
+        signed = quantity if side == "BUY" else -quantity
+        if reduce_only or abs(qty + signed) <= abs(qty):
+            return
+        leverage = account.leverage.get(self.symbol, DEFAULT_LEVERAGE)
+        needed = abs(qty + signed) * price / leverage
+        if needed > self._available(account) + abs(qty) * self.last_price / leverage:
+            raise SimError(-2019, "Margin is insufficient.")
+
+    def _available(self, account):
+        leverage = account.leverage.get(self.symbol, DEFAULT_LEVERAGE)
+        qty, entry = account.positions.get(self.symbol, (0.0, 0.0))
+        unrealized = qty * (self.last_price - entry)
+        return account.balance + unrealized - (abs(qty) * self.last_price + account.open_notional) / leverage
+
+    def _match(self, order):
+        opposite = "SELL" if order.side == "BUY" else "BUY"
+        better = (lambda a, b: a <= b) if order.side == "BUY" else (lambda a, b: a >= b)
+        while order.remaining > 0:
+            synthetic = self.quote(order.side)
+            resting = self.book.best(opposite)
+            if resting is not None and better(resting, synthetic):
+                if order.price is not None and not better(resting, order.price):
+                    return
+                level = self.book.levels[opposite][resting]
+                maker = level[0]
+                qty = min(order.remaining, maker.remaining)
+                self._fill(maker, qty, resting, is_maker=True)
+                if maker.remaining <= 0:
+                    level.popleft()
+                    if not level:
+                        del self.book.levels[opposite][resting]
+                self._fill(order, qty, resting, is_maker=False)
+            else:
+                if order.price is not None and not better(synthetic, order.price):
+                    return
+                self._fill(order, order.remaining, synthetic, is_maker=False)
+
+    def _fill(self, order, qty, price, is_maker):
+        account = order.account
+        fee = qty * price * (self.maker_fee if is_maker else self.taker_fee)
+        pos_qty, entry = account.positions.get(order.symbol, (0.0, 0.0))
+        signed = qty if order.side == "BUY" else -qty
+        realized = 0.0
+        if pos_qty == 0 or (pos_qty > 0) == (signed > 0):
+            entry = (abs(pos_qty) * entry + qty * price) / (abs(pos_qty) + qty)
+        else:
+            closing = min(qty, abs(pos_qty))
+            realized = closing * (price - entry) * (1 if pos_qty > 0 else -1)
+            if qty > abs(pos_qty):
+                entry = price
+        new_qty = round(pos_qty + signed, 8)
+        account.positions[order.symbol] = [new_qty, entry if new_qty else 0.0]
+        account.balance += realized - fee
+
+        if is_maker:
+            account.open_notional -= qty * order.price
+        order.executed = round(order.executed + qty, 8)
+        order.cum_quote += qty * price
+        order.status = "FILLED" if order.remaining <= 0 else "PARTIALLY_FILLED"
+        if order.status == "FILLED":
+            account.open_orders.pop(order.order_id, None)
+        order.update_time = self.now
+        trade = (next(self._trade_ids), order.order_id, order.side, price, qty, fee, realized, is_maker, self.now)
+        account.trades.append(trade)
+        if not is_maker and self._subscribers:
+            self._publish(f"{order.symbol.lower()}@aggTrade", {
+                "e": "aggTrade", "E": self.now, "s": order.symbol, "a": trade[0], "p": f"{price:.2f}",
+                "q": f"{qty:.3f}", "T": self.now, "m": order.side == "SELL"})
+
+    def cancel(self, key, symbol, order_id=None, client_order_id=None):
+        with self.lock:
+            order = self.get_order(key, symbol, order_id, client_order_id)
+            if order.status not in ("NEW", "PARTIALLY_FILLED"):
+                raise SimError(-2011, "Unknown order sent.")
+            self.book.remove(order)
+            order.account.open_orders.pop(order.order_id, None)
+            order.account.open_notional -= order.remaining * order.price
+            order.status = "CANCELED"
+            order.update_time = self.now
+            return order
+
+    def cancel_all(self, key, symbol):
+        with self.lock:
+            account = self.account(key)
+            for order in list(account.open_orders.values()):
+                if order.symbol == symbol:
+                    self.book.remove(order)
+                    del account.open_orders[order.order_id]
+                    account.open_notional -= order.remaining * order.price
+                    order.status = "CANCELED"
+                    order.update_time = self.now
+
+    def get_order(self, key, symbol, order_id=None, client_order_id=None):
+        with self.lock:
+            account = self.account(key)
+            order = account.orders.get(int(order_id)) if order_id else account.by_client_id.get(client_order_id)
+            if order is None or order.symbol != symbol:
+                raise SimError(-2013, "Order does not exist.")
+            return order
+
+    def open_orders(self, key, symbol=None):
+        with self.lock:
+            return [o for o in self.account(key).open_orders.values() if symbol is None or o.symbol == symbol]
+
+    # === Replay ===
+    def advance(self, steps=1):
+        """Replay the next `steps` candles. Returns the number actually replayed."""
+        done = 0
+        with self.lock:
+            while done < steps and self.cursor + 1 < len(self.candles):
+                self._set_cursor(self.cursor + 1)
+                ts, open_, high, low, close, volume = self.candles[self.cursor]
+                self._fill_resting("BUY", lambda p: p >= low, lambda p: min(p, open_))
+                self._fill_resting("SELL", lambda p: p <= high, lambda p: max(p, open_))
+                while self.next_funding <= self.now:
+                    self._settle_funding()
+                    self.next_funding += FUNDING_INTERVAL_MS
+                self._publish(f"{self.symbol.lower()}@kline_{self.timeframe}", self._kline_event(self.cursor))
+                done += 1
+        return done
+
+    def _fill_resting(self, side, crossed, fill_price):
+        while True:
+            best = self.book.best(side)
+            if best is None or not crossed(best):
+                return
+            for order in list(self.book.levels[side][best]):
+                self._fill(order, order.remaining, round(fill_price(best), 2), is_maker=True)
+            del self.book.levels[side][best]
+
+    def _settle_funding(self):
+        mark = self.last_price
+        for account in self.accounts.values():
+            qty, _ = account.positions.get(self.symbol, (0.0, 0.0))
+            if not qty:
+                continue
+            payment = qty * mark * self.funding_rate
+            account.balance -= payment
+            account.income.append({"symbol": self.symbol, "incomeType": "FUNDING_FEE", "income": f"{-payment:.8f}",
+                                   "asset": "USDT", "time": self.next_funding, "info": "", "tranId": next(self._trade_ids),
+                                   "tradeId": ""})
+
+    # === Market data ===
+    def klines(self, start=None, end=None, limit=500):
+        end_index = self.cursor + 1
+        ts = self.candles[:end_index, 0]
+        lo = int(np.searchsorted(ts, start)) if start is not None else None
+        hi = int(np.searchsorted(ts, end, side="right")) if end is not None else end_index
+        lo = max(hi - limit, 0) if lo is None else lo
+        rows = self.candles[lo:min(hi, lo + limit)]
+        return [[int(r[0]), f"{r[1]:.2f}", f"{r[2]:.2f}", f"{r[3]:.2f}", f"{r[4]:.2f}", f"{r[5]:.3f}",
+                 int(r[0]) + self.step_ms - 1, f"{r[5] * r[4]:.2f}", 0, "0", "0", "0"] for r in rows]
+
+    def _kline_event(self, index):
+        t, o, h, l, c, v = self.candles[index]
+        return {"e": "kline", "E": self.now, "s": self.symbol, "k": {
+            "t": int(t), "T": int(t) + self.step_ms - 1, "s": self.symbol, "i": self.timeframe, "o": f"{o:.2f}",
+            "h": f"{h:.2f}", "l": f"{l:.2f}", "c": f"{c:.2f}", "v": f"{v:.3f}", "x": True}}
+
+    # === Websocket fan-out ===
+    def subscribe(self, streams):
+        q = queue.Queue(maxsize=WS_QUEUE_SIZE)
+        with self.lock:
+            self._subscribers.append((set(streams), q))
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self._subscribers = [(s, sq) for s, sq in self._subscribers if sq is not q]
+
+    def _publish(self, stream, payload):
+        for streams, q in self._subscribers:
+            if stream in streams:
+                try:
+                    q.put_nowait({"stream": stream, "data": payload})
+                except queue.Full:
+                    pass             # Slow client: drop rather than stall matching
+
+    # === Account views ===
+    def position_risk(self, account):
+        qty, entry = account.positions.get(self.symbol, (0.0, 0.0))
+        leverage = account.leverage.get(self.symbol, DEFAULT_LEVERAGE)
+        return {"symbol": self.symbol, "positionAmt": f"{qty:.3f}", "entryPrice": f"{entry:.2f}",
+                "breakEvenPrice": f"{entry:.2f}", "markPrice": f"{self.last_price:.2f}",
+                "unRealizedProfit": f"{qty * (self.last_price - entry):.8f}", "liquidationPrice": "0",
+                "leverage": str(leverage), "maxNotionalValue": "1000000", "marginType": "cross",
+                "isolatedMargin": "0", "isAutoAddMargin": "false", "positionSide": "BOTH",
+                "notional": f"{qty * self.last_price:.8f}", "isolatedWallet": "0", "updateTime": self.now,
+                "initialMargin": f"{abs(qty) * self.last_price / leverage:.8f}", "isolated": False}
+
+    def balances(self, account):
+        qty, entry = account.positions.get(self.symbol, (0.0, 0.0))
+        unrealized = qty * (self.last_price - entry)
+        available = self._available(account)
+        return {"asset": "USDT", "walletBalance": f"{account.balance:.8f}", "unrealizedProfit": f"{unrealized:.8f}",
+                "marginBalance": f"{account.balance + unrealized:.8f}", "availableBalance": f"{available:.8f}",
+                "maxWithdrawAmount": f"{available:.8f}", "crossWalletBalance": f"{account.balance:.8f}",
+                "crossUnPnl": f"{unrealized:.8f}", "initialMargin": "0", "maintMargin": "0",
+                "positionInitialMargin": "0", "openOrderInitialMargin": "0", "marginAvailable": True,
+                "updateTime": self.now}
+
+
+# === REST + websocket front end ===
+def _exchange_info(sim):
+    base, quote = sim.symbol[:-4], sim.symbol[-4:]
+    return {
+        "timezone": "UTC", "serverTime": sim.now, "rateLimits": [], "exchangeFilters": [],
+        "assets": [{"asset": quote, "marginAvailable": True, "autoAssetExchange": "0"}],
+        "symbols": [{
+            "symbol": sim.symbol, "pair": sim.symbol, "contractType": "PERPETUAL", "deliveryDate": 4133404800000,
+            "onboardDate": 1569398400000, "status": "TRADING", "maintMarginPercent": "2.5000",
+            "requiredMarginPercent": "5.0000", "baseAsset": base, "quoteAsset": quote, "marginAsset": quote,
+            "pricePrecision": 2, "quantityPrecision": 3, "baseAssetPrecision": 8, "quotePrecision": 8,
+            "underlyingType": "COIN", "underlyingSubType": [], "settlePlan": 0, "triggerProtect": "0.0500",
+            "liquidationFee": "0.012500", "marketTakeBound": "0.05",
+            "filters": [
+                {"filterType": "PRICE_FILTER", "minPrice": "0.10", "maxPrice": "10000000", "tickSize": f"{TICK_SIZE}"},
+                {"filterType": "LOT_SIZE", "minQty": f"{STEP_SIZE}", "maxQty": "1000", "stepSize": f"{STEP_SIZE}"},
+                {"filterType": "MARKET_LOT_SIZE", "minQty": f"{STEP_SIZE}", "maxQty": "1000", "stepSize": f"{STEP_SIZE}"},
+                {"filterType": "MAX_NUM_ORDERS", "limit": 200},
+                {"filterType": "MIN_NOTIONAL", "notional": f"{MIN_NOTIONAL}"},
+                {"filterType": "PERCENT_PRICE", "multiplierUp": "1.0500", "multiplierDown": "0.9500",
+                 "multiplierDecimal": "4"},
+            ],
+            "orderTypes": ["LIMIT", "MARKET"], "timeInForce": ["GTC", "IOC"],
+        }],
+    }
+
+
+def make_handler(sim):
+    class SimulatorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"        # Keep-alive: ccxt reuses one connection
+        disable_nagle_algorithm = True       # Headers and body are separate writes; don't wait for ACKs
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_DELETE(self):
+            self._dispatch("DELETE")
+
+        def _dispatch(self, method):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                params.update({k: v[-1] for k, v in parse_qs(self.rfile.read(length).decode()).items()})
+            if method == "GET" and self.headers.get("Upgrade", "").lower() == "websocket":
+                return self._websocket(url.path, params)
+            try:
+                route = ROUTES.get((method, url.path))
+                if route is None:
+                    raise SimError(-1000, f"Unknown endpoint {method} {url.path}", status=404)
+                self._reply(200, route(sim, params, self.headers.get("X-MBX-APIKEY")))
+            except SimError as e:
+                self._reply(e.status, {"code": e.code, "msg": e.msg})
+            except (KeyError, ValueError) as e:
+                self._reply(400, {"code": -1102, "msg": f"Mandatory parameter missing or malformed: {e}"})
+
+        def _reply(self, status, data):
+            raw = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _websocket(self, path, params):
+            # /ws/<stream>[/<stream>...] or /stream?streams=a/b (server → client text frames only)
+            streams = params.get("streams", "").split("/") if path == "/stream" else path[len("/ws/"):].split("/")
+            accept = base64.b64encode(hashlib.sha1((self.headers["Sec-WebSocket-Key"] + WS_GUID).encode()).digest())
+            self.send_response(101, "Switching Protocols")
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept.decode())
+            self.end_headers()
+            combined = path == "/stream"
+            q = sim.subscribe(streams)
+            try:
+                while True:
+                    try:
+                        event = q.get(timeout=15)
+                    except queue.Empty:
+                        self.wfile.write(b"\x89\x00")      # Ping keeps idle connections alive
+                        continue
+                    payload = json.dumps(event if combined else event["data"]).encode()
+                    header = bytes([0x81])
+                    if len(payload) < 126:
+                        header += bytes([len(payload)])
+                    elif len(payload) < 65536:
+                        header += bytes([126]) + len(payload).to_bytes(2, "big")
+                    else:
+                        header += bytes([127]) + len(payload).to_bytes(8, "big")
+                    self.wfile.write(header + payload)
+                    self.wfile.flush()
+            except OSError:
+                pass
+            finally:
+                sim.unsubscribe(q)
+                self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    return SimulatorHandler
+
+
+def _order_params(params):
+    return params.get("orderId"), params.get("origClientOrderId")
+
+def _account_view(sim, params, key):
+    with sim.lock:
+        account = sim.account(key)
+        bal = sim.balances(account)
+        return {"totalWalletBalance": bal["walletBalance"], "totalUnrealizedProfit": bal["unrealizedProfit"],
+                "totalMarginBalance": bal["marginBalance"], "availableBalance": bal["availableBalance"],
+                "maxWithdrawAmount": bal["maxWithdrawAmount"], "totalInitialMargin": "0", "totalMaintMargin": "0",
+                "canTrade": True, "assets": [bal], "positions": [sim.position_risk(account)]}
+
+def _balance_view(sim, params, key):
+    with sim.lock:
+        bal = sim.balances(sim.account(key))
+        return [{"accountAlias": "sim", "asset": "USDT", "balance": bal["walletBalance"], **bal}]
+
+def _trade_view(sim, trade):
+    trade_id, order_id, side, price, qty, fee, realized, is_maker, ts = trade
+    return {"id": trade_id, "orderId": order_id, "symbol": sim.symbol, "side": side, "price": f"{price:.2f}",
+            "qty": f"{qty:.3f}", "quoteQty": f"{qty * price:.5f}", "commission": f"{fee:.8f}",
+            "commissionAsset": "USDT", "realizedPnl": f"{realized:.8f}", "positionSide": "BOTH",
+            "buyer": side == "BUY", "maker": is_maker, "time": ts}
+
+def _batch_cancel(sim, params, key):
+    results = []
+    ids = json.loads(params.get("orderIdList", "[]"))
+    client_ids = json.loads(params.get("origClientOrderIdList", "[]"))
+    for order_id, client_id in [(i, None) for i in ids] + [(None, c) for c in client_ids]:
+        try:
+            results.append(sim.cancel(key, params["symbol"], order_id, client_id).to_binance())
+        except SimError as e:
+            results.append({"code": e.code, "msg": e.msg})
+    return results
+
+def _ticker(sim, params, key):
+    with sim.lock:
+        day = sim.candles[max(sim.cursor - 24 * 3600 * 1000 // sim.step_ms + 1, 0):sim.cursor + 1]
+        open_, last = day[0, 1], sim.last_price
+        return {"symbol": sim.symbol, "priceChange": f"{last - open_:.2f}",
+                "priceChangePercent": f"{(last / open_ - 1) * 100:.3f}", "weightedAvgPrice": f"{last:.2f}",
+                "lastPrice": f"{last:.2f}", "lastQty": "0", "openPrice": f"{open_:.2f}",
+                "highPrice": f"{day[:, 2].max():.2f}", "lowPrice": f"{day[:, 3].min():.2f}",
+                "volume": f"{day[:, 5].sum():.3f}", "quoteVolume": f"{(day[:, 5] * day[:, 4]).sum():.2f}",
+                "openTime": int(day[0, 0]), "closeTime": sim.now, "firstId": 0, "lastId": 0, "count": len(day)}
+
+def _depth(sim, params, key):
+    limit = int(params.get("limit", 100))
+    with sim.lock:
+        bids = sim.book.depth("BUY", limit) + [(sim.quote("SELL"), SYNTHETIC_DEPTH)]
+        asks = sim.book.depth("SELL", limit) + [(sim.quote("BUY"), SYNTHETIC_DEPTH)]
+        bids = sorted(bids, reverse=True)[:limit]
+        asks = sorted(asks)[:limit]
+        return {"lastUpdateId": sim.now, "E": sim.now, "T": sim.now,
+                "bids": [[f"{p:.2f}", f"{q:.3f}"] for p, q in bids], "asks": [[f"{p:.2f}", f"{q:.3f}"] for p, q in asks]}
+
+def _premium_index(sim, params, key):
+    return {"symbol": sim.symbol, "markPrice": f"{sim.last_price:.2f}", "indexPrice": f"{sim.last_price:.2f}",
+            "estimatedSettlePrice": f"{sim.last_price:.2f}", "lastFundingRate": f"{sim.funding_rate:.8f}",
+            "interestRate": "0.00010000", "nextFundingTime": sim.next_funding, "time": sim.now}
+
+def _klines(sim, params, key):
+    if params.get("interval", sim.timeframe) != sim.timeframe:
+        raise SimError(-1120, f"Invalid interval: the simulator replays {sim.timeframe} candles only.")
+    start, end = params.get("startTime"), params.get("endTime")
+    with sim.lock:
+        return sim.klines(int(start) if start else None, int(end) if end else None,
+                          min(int(params.get("limit", 500)), 1500))
+
+def _new_order(sim, params, key):
+    return sim.place_order(key, params["symbol"], params["side"], params["type"], params["quantity"],
+                           params.get("price"), params.get("newClientOrderId"), params.get("timeInForce", "GTC"),
+                           params.get("reduceOnly") == "true").to_binance()
+
+def _set_leverage(sim, params, key):
+    with sim.lock:
+        sim.account(key).leverage[params["symbol"]] = int(params["leverage"])
+    return {"leverage": int(params["leverage"]), "maxNotionalValue": "1000000", "symbol": params["symbol"]}
+
+def _advance(sim, params, key):
+    steps = sim.advance(int(params.get("steps", 1)))
+    return {"advanced": steps, "time": sim.now, "price": sim.last_price}
+
+def _sim_state(sim, params, key):
+    with sim.lock:
+        return {"time": sim.now, "price": sim.last_price, "cursor": sim.cursor, "candles": len(sim.candles),
+                "accounts": {k: {"balance": round(a.balance, 4), "position": a.positions.get(sim.symbol),
+                                 "orders": len(a.orders), "trades": len(a.trades)} for k, a in sim.accounts.items()}}
+
+ROUTES = {
+    ("GET", "/fapi/v1/ping"): lambda sim, p, k: {},
+    ("GET", "/fapi/v1/time"): lambda sim, p, k: {"serverTime": sim.now},
+    ("GET", "/fapi/v1/exchangeInfo"): lambda sim, p, k: _exchange_info(sim),
+    ("GET", "/fapi/v1/klines"): _klines,
+    ("GET", "/fapi/v1/depth"): _depth,
+    ("GET", "/fapi/v1/ticker/24hr"): _ticker,
+    ("GET", "/fapi/v1/ticker/price"): lambda sim, p, k: {"symbol": sim.symbol, "price": f"{sim.last_price:.2f}",
+                                                         "time": sim.now},
+    ("GET", "/fapi/v1/premiumIndex"): _premium_index,
+    ("POST", "/fapi/v1/order"): _new_order,
+    ("GET", "/fapi/v1/order"): lambda sim, p, k: sim.get_order(k, p["symbol"], *_order_params(p)).to_binance(),
+    ("DELETE", "/fapi/v1/order"): lambda sim, p, k: sim.cancel(k, p["symbol"], *_order_params(p)).to_binance(),
+    ("DELETE", "/fapi/v1/batchOrders"): _batch_cancel,
+    ("DELETE", "/fapi/v1/allOpenOrders"): lambda sim, p, k: (
+        sim.cancel_all(k, p["symbol"]) or {"code": 200, "msg": "The operation of cancel all open order is done."}),
+    ("GET", "/fapi/v1/openOrders"): lambda sim, p, k: [o.to_binance() for o in sim.open_orders(k, p.get("symbol"))],
+    ("GET", "/fapi/v1/allOrders"): lambda sim, p, k: [o.to_binance() for o in sim.account(k).orders.values()
+                                                      if o.symbol == p["symbol"]][-int(p.get("limit", 500)):],
+    ("GET", "/fapi/v1/userTrades"): lambda sim, p, k: [_trade_view(sim, t) for t in sim.account(k).trades[-int(p.get("limit", 500)):]],
+    ("GET", "/fapi/v1/income"): lambda sim, p, k: sim.account(k).income[-int(p.get("limit", 100)):],
+    ("POST", "/fapi/v1/leverage"): _set_leverage,
+    ("GET", "/fapi/v1/leverageBracket"): lambda sim, p, k: [{"symbol": sim.symbol, "brackets": [
+        {"bracket": 1, "initialLeverage": 125, "notionalCap": 10_000_000, "notionalFloor": 0,
+         "maintMarginRatio": 0.004, "cum": 0.0}]}],
+    ("GET", "/fapi/v2/account"): _account_view,
+    ("GET", "/fapi/v3/account"): _account_view,
+    ("GET", "/fapi/v2/balance"): _balance_view,
+    ("GET", "/fapi/v3/balance"): _balance_view,
+    ("GET", "/fapi/v2/positionRisk"): lambda sim, p, k: [sim.position_risk(sim.account(k))],
+    ("GET", "/fapi/v3/positionRisk"): lambda sim, p, k: [sim.position_risk(sim.account(k))],
+    # Simulator control (not Binance endpoints)
+    ("POST", "/sim/advance"): _advance,
+    ("GET", "/sim/state"): _sim_state,
+}
+
+
+def load_candles(source="synthetic", timeframe="5m"):
+    """Candles to replay: synthetic random walk, the feature store's stored series, or an OHLCV CSV."""
+    import pandas as pd
+
+    if source == "synthetic":
+        from src.synthetic_data import generate_ohlcv
+        return generate_ohlcv(n=20_000, timeframe=timeframe)
+    if source == "store":
+        from src.feature_store import get_feature_store
+        return get_feature_store(timeframe=timeframe).read(columns=["open", "high", "low", "close", "volume"])
+    df = pd.read_csv(source)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def serve(sim, host="127.0.0.1", port=DEFAULT_PORT, speed=0):
+    """Run the REST/websocket server in background threads. `speed` = simulated seconds per real second."""
+    server = ThreadingHTTPServer((host, port), make_handler(sim))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="exchange-sim", daemon=True).start()
+    if speed:
+        def clock():
+            while sim.advance(1):
+                time.sleep(sim.step_ms / 1000 / speed)
+        threading.Thread(target=clock, name="exchange-sim-clock", daemon=True).start()
+    return server
+
+
+# === Checks and load test ===
+def _sim_client(port):
+    import ccxt
+    from src.utils import binance_futures_urls
+    return ccxt.binance({"apiKey": "sim-key", "secret": "sim-secret", "enableRateLimit": False,
+                         "urls": {"api": binance_futures_urls(f"http://127.0.0.1:{port}")},
+                         "options": {"defaultType": "future", "fetchMarkets": {"types": ["linear"]},
+                                     "fetchCurrencies": False}})
+
+def run_checks():
+    import tempfile
+    from src.order_executor import OrderExecutor, new_order
+    from src.position_store import PositionStore
+
+    sim = ExchangeSimulator(load_candles("synthetic"), start_index=1000)
+    server = serve(sim, port=0)
+    client = _sim_client(server.server_port)
+    symbol = "BTC/USDT"
+
+    # 1️⃣ Market data through ccxt
+    candles = client.fetch_ohlcv(symbol, "5m", limit=500)
+    assert len(candles) == 500 and candles[-1][0] == int(sim.candles[sim.cursor, 0]) and candles[-1][4] == round(sim.last_price, 2)
+    ticker = client.fetch_ticker(symbol)
+    book = client.fetch_order_book(symbol)
+    assert book["asks"][0][0] > book["bids"][0][0]
+    print(f"✅ ccxt markets/klines/ticker/depth: last {ticker['last']}, spread {book['asks'][0][0] - book['bids'][0][0]:.1f}.")
+
+    # 2️⃣ Market order fills as taker with fees; duplicate client ids are rejected
+    order = client.create_order(symbol, "market", "buy", 0.01, params={"clientOrderId": "check-1"})
+    fetched = client.fetch_order(None, symbol, params={"origClientOrderId": "check-1"})
+    assert order["status"] == "closed" and fetched["filled"] == 0.01 and fetched["average"] == sim.quote("BUY")
+    try:
+        client.create_order(symbol, "market", "buy", 0.01, params={"clientOrderId": "check-1"})
+        raise AssertionError("expected duplicate rejection")
+    except Exception as e:
+        assert "duplicated" in str(e), e
+    wallet = float(client.fetch_balance()["info"]["assets"][0]["walletBalance"])
+    assert abs(wallet - (STARTING_BALANCE - 0.01 * fetched["average"] * TAKER_FEE)) < 1e-6, wallet
+    print(f"✅ Market order filled at {fetched['average']} (taker fee charged), duplicate id rejected.")
+
+    # 3️⃣ Resting limit fills as maker when a replayed candle trades through it
+    limit_price = round(sim.last_price * 0.995, 1)
+    resting = client.create_order(symbol, "limit", "buy", 0.01, limit_price)
+    assert resting["status"] == "open" and len(client.fetch_open_orders(symbol)) == 1
+    while sim.advance(1) and client.fetch_order(resting["id"], symbol)["status"] == "open":
+        pass
+    filled = client.fetch_order(resting["id"], symbol)
+    assert filled["status"] == "closed" and filled["average"] <= limit_price
+    position = client.fetch_positions([symbol])[0]
+    assert abs(position["contracts"] - 0.02) < 1e-9, position
+    print(f"✅ Limit buy @ {limit_price} filled as maker after replay; position {position['contracts']} BTC.")
+
+    # 4️⃣ Funding settles on 8h boundaries
+    before = sim.accounts["sim-key"].balance
+    sim.advance(8 * 3600 * 1000 // sim.step_ms)
+    income = sim.accounts["sim-key"].income
+    assert income and sim.accounts["sim-key"].balance < before
+    print(f"✅ Funding settled {len(income)}x, paid {before - sim.accounts['sim-key'].balance:.4f} USDT.")
+
+    # 5️⃣ Batch and cancel-all
+    ids = [client.create_order(symbol, "limit", "sell", 0.001, round(sim.last_price * 1.2, 1))["id"] for _ in range(12)]
+    client.cancel_orders(ids[:5], symbol)
+    client.cancel_all_orders(symbol)
+    assert not client.fetch_open_orders(symbol)
+    print("✅ Batch cancel + cancel-all cleared 12 resting orders.")
+
+    # 6️⃣ Order executor end to end over HTTP
+    executor = OrderExecutor(client_factory=lambda: _sim_client(server.server_port),
+                             store=PositionStore(tempfile.mkdtemp()), alert=print)
+    record = executor.submit(new_order("sell", 0.02, symbol, intent="sim-check")).result(timeout=10)
+    assert record["status"] == "filled" and abs(sim.accounts["sim-key"].positions[sim.symbol][0]) < 1e-9
+    print(f"✅ Order executor via ccxt → simulator closed the position in {record['latency_ms']} ms.")
+    server.shutdown()
+
+def run_bench(n=20_000, connections=4):
+    import http.client
+
+    sim = ExchangeSimulator(load_candles("synthetic"), start_index=1000)
+    start = time.perf_counter()
+    for i in range(n):
+        sim.place_order("bench", sim.symbol, "BUY" if i % 2 else "SELL", "MARKET", 0.001)
+    engine_rate = n / (time.perf_counter() - start)
+
+    server = serve(sim, port=0)
+
+    def send(count, key):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+        for i in range(count):
+            body = f"symbol={sim.symbol}&side={'BUY' if i % 2 else 'SELL'}&type=MARKET&quantity=0.001"
+            conn.request("POST", "/fapi/v1/order", body=body, headers={
+                "X-MBX-APIKEY": key, "Content-Type": "application/x-www-form-urlencoded"})
+            conn.getresponse().read()
+
+    http_n = n // 4
+    threads = [threading.Thread(target=send, args=(http_n // connections, f"bench-http-{i}")) for i in range(connections)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    http_rate = http_n / (time.perf_counter() - start)
+
+    client = _sim_client(server.server_port)
+    client.load_markets()
+    ccxt_n = n // 20
+    start = time.perf_counter()
+    for i in range(ccxt_n):
+        client.create_order("BTC/USDT", "market", "buy" if i % 2 else "sell", 0.001)
+    ccxt_rate = ccxt_n / (time.perf_counter() - start)
+    print(f"⚡ Engine: {engine_rate:,.0f} orders/s | HTTP ({connections} keep-alive connections): {http_rate:,.0f} orders/s "
+          f"| one ccxt client: {ccxt_rate:,.0f} orders/s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local Binance Futures simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--candles", default="synthetic", help="synthetic | store | path to an OHLCV CSV")
+    parser.add_argument("--timeframe", default="5m")
+    parser.add_argument("--start-index", type=int, default=1000, help="Candles visible before replay starts")
+    parser.add_argument("--speed", type=float, default=0, help="Simulated seconds per second (0 = advance via POST /sim/advance)")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--bench", action="store_true")
+    args = parser.parse_args()
+
+    if args.check:
+        run_checks()
+    elif args.bench:
+        run_bench()
+    else:
+        sim = ExchangeSimulator(load_candles(args.candles, args.timeframe), timeframe=args.timeframe,
+                                start_index=args.start_index)
+        serve(sim, args.host, args.port, args.speed)
+        print(f"🏦 Exchange simulator on http://{args.host}:{args.port} | {len(sim.candles)} candles | "
+              f"BINANCE_ENV=sim to trade against it")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("👋 Simulator stopped.")
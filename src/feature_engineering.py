@@ -1,5 +1,25 @@
 # Imports technical indicator library (pandas_ta)
 import pandas_ta as ta
+import numpy as np
+import pandas as pd
+
+from src.config import BINANCE_TIMEFRAME
+from src.sentiment_store import get_sentiment_store
+from src.utils import timeframe_to_seconds
+
+# 🏷️ Bump whenever a feature definition changes — the feature store re-derives its history
+FEATURE_VERSION = 2
+
+# Raw inputs kept alongside features so history can be re-derived without refetching
+BASE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume", "sentiment"]
+
+# Longest lookback any feature needs before its values settle (MACD slow EMA + margin)
+FEATURE_WARMUP = 300
+
+# ⏫ Higher-timeframe context resampled from the base series (no extra exchange requests)
+CONTEXT_TIMEFRAMES = ["15m", "1h", "4h"]
+CONTEXT_INDICATORS = ["rsi_14", "ema_21", "macd"]
+CONTEXT_BARS = 300           # Completed bars kept per timeframe as indicator warm-up
 
 # 📈 Adds RSI, EMA, and MACD indicators to your OHLCV DataFrame
 def add_technical_indicators(df):
@@ -18,16 +38,101 @@ def add_technical_indicators(df):
 
     return df  # Returns a DataFrame with new technical columns
 
-# 🧠 Merges sentiment score into the same DataFrame
-def merge_sentiment(df, sentiment_scores):
-    if not sentiment_scores:
-        df["sentiment"] = 0  # Default if no sentiment data
-        return df
-    
-    # Average the sentiment score from recent tweets
-    avg_score = sum(score["score"] for score in sentiment_scores) / len(sentiment_scores)
+# 🧠 Merges each candle's own sentiment (rolling mean known at its close) into the DataFrame
+def merge_sentiment(df, timeframe=BINANCE_TIMEFRAME, store=None):
+    store = store or get_sentiment_store()
+    step = pd.Timedelta(seconds=timeframe_to_seconds(timeframe))
+    df["sentiment"] = store.asof(df["timestamp"], step)
+    return df
+
+# ⏫ Completed higher-timeframe bars built incrementally from base candles
+class TimeframeBars:
+    """
+    Resamples a base candle series (e.g. 5m) into completed `timeframe` bars with indicators.
+
+    `update` folds in only candles newer than the last one seen and recomputes indicators
+    only when a bar completes. `join` attaches a bar to base rows opening at or after the
+    bar's end, so a row never sees a bar that was still forming when it opened.
+    """
 
-    # Add a single sentiment score across all rows (simple but effective)
-    df["sentiment"] = avg_score
+    def __init__(self, timeframe, base_timeframe=BINANCE_TIMEFRAME, max_bars=CONTEXT_BARS):
+        self.timeframe = timeframe
+        self.step = pd.Timedelta(seconds=timeframe_to_seconds(timeframe))
+        self.base_step = pd.Timedelta(seconds=timeframe_to_seconds(base_timeframe))
+        if self.step <= self.base_step or self.step % self.base_step:
+            raise ValueError(f"❌ {timeframe} is not a multiple of base timeframe {base_timeframe}")
+        self.max_bars = max_bars
+        self.bars = None             # Completed bars: end + OHLCV + indicators
+        self.pending = []            # Base candles of the bar still being filled
+        self.last_seen = None
 
+    def update(self, base):
+        if self.last_seen is not None:
+            base = base[base["timestamp"] > self.last_seen]
+        if base.empty:
+            return 0
+        first, last = base["timestamp"].iloc[0], base["timestamp"].iloc[-1]
+        self.last_seen = last
+        rows = base[["timestamp", "open", "high", "low", "close", "volume"]]
+
+        # A bar is complete once its last base candle arrived or a later bar has started
+        last_bucket = last.floor(self.step)
+        last_complete = last + self.base_step >= last_bucket + self.step
+        oldest = self.pending[0]["timestamp"].iloc[0] if self.pending else first
+        if not last_complete and oldest.floor(self.step) == last_bucket:
+            self.pending.append(rows)    # Usual live case: the candle lands inside the open bar
+            return 0
+
+        rows = pd.concat([*self.pending, rows], ignore_index=True)
+        bucket = rows["timestamp"].dt.floor(self.step)
+        done = (bucket < last_bucket) | last_complete
+        self.pending = [rows[~done]] if not done.all() else []
+
+        new_bars = rows[done].groupby(bucket[done]).agg(
+            open=("open", "first"), high=("high", "max"), low=("low", "min"),
+            close=("close", "last"), volume=("volume", "sum"),
+        )
+        new_bars["end"] = (new_bars.index + self.step).astype("datetime64[ns]")
+        new_bars = new_bars.reset_index(drop=True)
+
+        # Older bars are trimmed to max_bars, new ones are all kept so a batch can still join them
+        if self.bars is None:
+            bars = new_bars
+        else:
+            previous = self.bars[new_bars.columns]
+            if self.max_bars:
+                previous = previous.tail(self.max_bars)
+            bars = pd.concat([previous, new_bars], ignore_index=True)
+        self.bars = add_technical_indicators(bars)
+        return len(new_bars)
+
+    def join(self, df):
+        columns = [f"{name}_{self.timeframe}" for name in CONTEXT_INDICATORS]
+        values = np.full((len(df), len(columns)), np.nan)
+        if self.bars is not None:
+            # Latest bar whose end is at or before each row's open time
+            ends = self.bars["end"].to_numpy(dtype="datetime64[ns]")
+            idx = np.searchsorted(ends, df["timestamp"].to_numpy(dtype="datetime64[ns]"), side="right") - 1
+            found = idx >= 0
+            values[found] = self.bars[CONTEXT_INDICATORS].to_numpy(dtype=float)[idx[found]]
+        return df.assign(**dict(zip(columns, values.T)))
+
+# ⏫ One TimeframeBars per context timeframe above the base timeframe
+def timeframe_context(base_timeframe=BINANCE_TIMEFRAME, max_bars=CONTEXT_BARS):
+    base_seconds = timeframe_to_seconds(base_timeframe)
+    return [TimeframeBars(tf, base_timeframe, max_bars) for tf in CONTEXT_TIMEFRAMES
+            if timeframe_to_seconds(tf) > base_seconds]
+
+# ⏫ Adds higher-timeframe indicators (e.g. rsi_14_1h) aligned to the base rows without lookahead
+def add_timeframe_features(df, context=None, base_timeframe=BINANCE_TIMEFRAME, update=True):
+    context = timeframe_context(base_timeframe, max_bars=None) if context is None else context
+    for bars in context:
+        if update:
+            bars.update(df)
+        df = bars.join(df)
     return df
+
+# 🧱 Every derived feature for a frame of BASE_COLUMNS (the feature store's definition)
+def build_features(df, timeframe=BINANCE_TIMEFRAME):
+    df = add_technical_indicators(df)
+    return add_timeframe_features(df, base_timeframe=timeframe)
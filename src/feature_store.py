@@ -0,0 +1,282 @@
+# src/feature_store.py — Incrementally materialized features keyed by (symbol, timeframe, timestamp)
+
+import glob
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.config import BINANCE_SYMBOL, BINANCE_TIMEFRAME
+from src.feature_engineering import (
+    BASE_COLUMNS, CONTEXT_BARS, CONTEXT_TIMEFRAMES, FEATURE_VERSION, FEATURE_WARMUP,
+    add_technical_indicators, add_timeframe_features, build_features, merge_sentiment, timeframe_context
+)
+from src.utils import timeframe_to_seconds
+from src import metrics
+
+STORE_DIR = "data/feature_store"
+META_FILE = "_meta.json"
+MAX_PARTS = 64               # Small append parts are compacted into one file beyond this
+
+
+class FeatureStore:
+    """
+    Append-only Parquet store of closed candles and their features for one symbol/timeframe.
+
+    Every append writes a small part file under data/feature_store/<symbol>/<timeframe>/ and
+    only computes features for the new rows (with FEATURE_WARMUP stored rows as context).
+    `_meta.json` records the feature version; when FEATURE_VERSION changes, the whole history
+    is re-derived from the stored raw columns in one vectorized pass.
+    """
+
+    def __init__(self, symbol=BINANCE_SYMBOL, timeframe=BINANCE_TIMEFRAME, root=STORE_DIR):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.step = pd.Timedelta(seconds=timeframe_to_seconds(timeframe))
+        self.path = os.path.join(root, symbol.replace("/", "-"), timeframe)
+        self._lock = threading.RLock()
+        self._context = None         # Higher-timeframe bars, warmed from stored history on first use
+        self._recent = None          # Last FEATURE_WARMUP stored rows (all columns) kept in memory
+        self.meta = self._load_meta()
+
+        stored_version = self.meta.get("feature_version")
+        if stored_version is not None and stored_version != FEATURE_VERSION:
+            print(f"🔁 Feature definitions changed (v{stored_version} → v{FEATURE_VERSION}).")
+            self.rebuild()
+
+    # === Metadata ===
+    def _load_meta(self):
+        meta_path = os.path.join(self.path, META_FILE)
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read feature store metadata: {e}")
+        return {}
+
+    def _save_meta(self, df):
+        self.meta = {
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "feature_version": FEATURE_VERSION,
+            "columns": list(df.columns),
+            "last_timestamp": max(df["timestamp"].max(), self.last_timestamp or df["timestamp"].max()).isoformat(),
+            "updated": pd.Timestamp.now("UTC").tz_localize(None).isoformat(),
+        }
+        meta_path = os.path.join(self.path, META_FILE)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    @property
+    def last_timestamp(self):
+        last = self.meta.get("last_timestamp")
+        return pd.Timestamp(last) if last else None
+
+    # === Parts ===
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def _write_part(self, df, name=None):
+        os.makedirs(self.path, exist_ok=True)
+        # Nanosecond names sort in write order, and don't collide across processes
+        part_path = name or os.path.join(self.path, f"part-{time.time_ns()}.parquet")
+        tmp_path = part_path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, part_path)
+        return part_path
+
+    def _compact(self):
+        parts = self._parts()
+        if len(parts) <= MAX_PARTS:
+            return
+        with metrics.span("feature_store.compact"):
+            merged = self._read_parts(parts)
+            self._write_part(merged, name=parts[-1])
+            for part in parts[:-1]:
+                os.remove(part)
+
+    @staticmethod
+    def _read_parts(parts, columns=None, filters=None):
+        frames = [pd.read_parquet(p, columns=columns, filters=filters) for p in parts]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat(frames, ignore_index=True)
+        df["timestamp"] = df["timestamp"].astype("datetime64[ns]")
+        # A part re-written after a crash may repeat rows — the newest copy wins
+        return df.drop_duplicates(subset="timestamp", keep="last").sort_values("timestamp").reset_index(drop=True)
+
+    # === Reads ===
+    def _recent_rows(self):
+        # Re-read from disk only if another process appended since the cache was filled
+        cached_last = None if self._recent is None or self._recent.empty else self._recent["timestamp"].iloc[-1]
+        if self._recent is None or cached_last != self.last_timestamp:
+            self._recent = self._tail_from_disk(FEATURE_WARMUP)
+        return self._recent
+
+    def read(self, start=None, end=None, columns=None):
+        """Stored rows with start <= timestamp < end."""
+        with self._lock:
+            self.meta = self._load_meta()
+            recent = self._recent_rows()
+            if end is None and start is not None and not recent.empty and pd.Timestamp(start) >= recent["timestamp"].iloc[0]:
+                rows = recent[recent["timestamp"] >= pd.Timestamp(start)].reset_index(drop=True)
+                return rows if columns is None else rows[["timestamp"] + [c for c in columns if c != "timestamp"]]
+
+        filters = []
+        if start is not None:
+            filters.append(("timestamp", ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append(("timestamp", "<", pd.Timestamp(end)))
+        if columns is not None and "timestamp" not in columns:
+            columns = ["timestamp"] + list(columns)
+        with self._lock, metrics.span("feature_store.read"):
+            return self._read_parts(self._parts(), columns=columns, filters=filters or None)
+
+    def tail(self, n, columns=None):
+        """Last `n` stored rows, from memory when possible, else reading only the newest parts needed."""
+        with self._lock:
+            self.meta = self._load_meta()
+            if n <= FEATURE_WARMUP:
+                rows = self._recent_rows().tail(n).reset_index(drop=True)
+                return rows if columns is None or rows.empty else rows[["timestamp"] + [c for c in columns if c != "timestamp"]]
+            return self._tail_from_disk(n, columns)
+
+    def _tail_from_disk(self, n, columns=None):
+        if columns is not None and "timestamp" not in columns:
+            columns = ["timestamp"] + list(columns)
+        with self._lock:
+            needed, rows = [], 0
+            for part in reversed(self._parts()):
+                needed.insert(0, part)
+                rows += pq.ParquetFile(part).metadata.num_rows
+                if rows >= n:
+                    break
+            return self._read_parts(needed, columns=columns).tail(n).reset_index(drop=True)
+
+    # === Writes ===
+    def _timeframe_context(self):
+        # Rebuilt when rows were appended elsewhere (another process) since it was last fed
+        if self._context is None or any(bars.last_seen != self.last_timestamp for bars in self._context):
+            longest = max(pd.Timedelta(seconds=timeframe_to_seconds(tf)) for tf in CONTEXT_TIMEFRAMES)
+            history = self.tail(CONTEXT_BARS * int(longest / self.step), columns=BASE_COLUMNS)
+            self._context = timeframe_context(self.timeframe)
+            for bars in self._context:
+                bars.update(history)
+        return self._context
+
+    def _with_features(self, new, forming=False):
+        """
+        Features for `new` (BASE_COLUMNS) using stored history as indicator warm-up.
+        Closed candles also advance the higher-timeframe bars; a forming candle only reads them.
+        """
+        context = self._timeframe_context()
+        history = self.tail(FEATURE_WARMUP, columns=BASE_COLUMNS)
+        frame = pd.concat([history, new[BASE_COLUMNS]], ignore_index=True) if not history.empty else new[BASE_COLUMNS]
+        rows = add_technical_indicators(frame.reset_index(drop=True)).iloc[len(history):].reset_index(drop=True)
+        return add_timeframe_features(rows, context, update=not forming)
+
+    def _closed(self, ohlcv):
+        now = pd.Timestamp.now("UTC").tz_localize(None)
+        return ohlcv[ohlcv["timestamp"] + self.step <= now]
+
+    def append(self, ohlcv):
+        """
+        Materialize features for closed candles newer than the last stored one.
+        Sentiment is joined from the sentiment store unless `ohlcv` already carries it.
+        Returns the number of rows appended.
+        """
+        with self._lock:
+            self.meta = self._load_meta()
+            new = self._closed(ohlcv)
+            if self.last_timestamp is not None:
+                new = new[new["timestamp"] > self.last_timestamp]
+            if new.empty:
+                return 0
+
+            new = new.sort_values("timestamp").drop_duplicates(subset="timestamp", keep="last")
+            if "sentiment" not in new.columns:
+                new = merge_sentiment(new.copy(), self.timeframe)
+
+            with metrics.span("feature_store.append"):
+                rows = self._with_features(new)
+                self._write_part(rows)
+                recent = self._recent_rows()
+                self._recent = (rows if recent.empty else pd.concat([recent, rows], ignore_index=True)).tail(FEATURE_WARMUP)
+                self._save_meta(rows)
+                self._compact()
+            metrics.inc("feature_store_rows_total", len(rows), timeframe=self.timeframe)
+            return len(rows)
+
+    def features_for(self, ohlcv):
+        """
+        Feature rows for every candle in `ohlcv`: closed candles are appended (once) and read
+        back from the store, the still-forming candle is computed on the fly and not stored.
+        """
+        with self._lock:
+            self.append(ohlcv)
+            stored = self.read(start=ohlcv["timestamp"].min())
+            last = stored["timestamp"].iloc[-1] if not stored.empty else None
+            forming = ohlcv if last is None else ohlcv[ohlcv["timestamp"] > last]
+            if forming.empty:
+                return stored
+            if "sentiment" not in forming.columns:
+                forming = merge_sentiment(forming.copy(), self.timeframe)
+            return pd.concat([stored, self._with_features(forming, forming=True)], ignore_index=True)
+
+    def catch_up(self, limit=1000):
+        """Fetch only candles after the last stored one (or the latest `limit` on an empty store)."""
+        from src.market_data_collector import fetch_ohlcv, fetch_ohlcv_range
+
+        if self.last_timestamp is None:
+            ohlcv = fetch_ohlcv(self.symbol, timeframe=self.timeframe, limit=limit)
+        else:
+            ohlcv = fetch_ohlcv_range(self.symbol, timeframe=self.timeframe,
+                                      start=self.last_timestamp + self.step)
+        return self.append(ohlcv) if not ohlcv.empty else 0
+
+    def rebuild(self):
+        """Re-derive every feature from the stored raw columns (after a FEATURE_VERSION bump)."""
+        with self._lock, metrics.span("feature_store.rebuild"):
+            parts = self._parts()
+            if not parts:
+                return 0
+            raw = self._read_parts(parts, columns=BASE_COLUMNS)
+            rows = build_features(raw, self.timeframe)
+            self._context = self._recent = None
+            self._write_part(rows, name=parts[-1])
+            for part in parts[:-1]:
+                os.remove(part)
+            self._save_meta(rows)
+            print(f"✅ Re-derived {len(rows)} feature rows at v{FEATURE_VERSION}.")
+            return len(rows)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_feature_store(symbol=BINANCE_SYMBOL, timeframe=BINANCE_TIMEFRAME):
+    with _stores_lock:
+        key = (symbol, timeframe)
+        if key not in _stores:
+            _stores[key] = FeatureStore(symbol, timeframe)
+        return _stores[key]
+
+if __name__ == "__main__":
+    # Seed the store with history: python -m src.feature_store [days]
+    import sys
+    from src.market_data_collector import fetch_ohlcv_range
+
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    store = get_feature_store()
+    start = pd.Timestamp.now("UTC").tz_localize(None) - pd.Timedelta(days=days)
+    if store.last_timestamp is not None and store.last_timestamp >= start:
+        start = store.last_timestamp + store.step
+    added = store.append(fetch_ohlcv_range(store.symbol, timeframe=store.timeframe, start=start))
+    print(f"✅ Feature store {store.symbol} {store.timeframe}: {added} rows added.")
@@ -0,0 +1,323 @@
+# src/job_runtime.py — Worker-pool job runtime with catch-up, overlap control and job DAGs
+
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+STATE_PATH = "logs/scheduler_state.json"
+DURATION_HISTORY = 100       # Durations kept per job
+CATCH_UP_GRACE = timedelta(minutes=5)   # Slots older than this count as missed
+RETRY_DELAY = timedelta(minutes=5)      # A failed or timed-out slot is retried after this long
+KILL_GRACE = 5               # Seconds between terminate and kill for a job past its timeout
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _resolve(func):
+    if isinstance(func, str):
+        module_name, func_name = func.split(":")
+        return getattr(importlib.import_module(module_name), func_name)
+    return func
+
+def _child_main(func, conn):
+    # Runs in the job's own process; only whether the chain may continue is sent back
+    try:
+        conn.send((None, _resolve(func)() is not False))
+    except BaseException as e:
+        conn.send((f"{type(e).__name__}: {e}", None))
+    finally:
+        conn.close()
+
+def _run_with_timeout(name, func, timeout):
+    """
+    Run `func` in a fresh (spawned) process and kill it once `timeout` seconds pass, so a hung
+    job really ends and frees its slot. Returns False if the job returned False.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child_main, args=(func, child_conn), name=f"job-{name}")
+    process.start()
+    child_conn.close()
+    try:
+        if not parent_conn.poll(timeout):
+            process.terminate()
+            process.join(KILL_GRACE)
+            if process.is_alive():
+                process.kill()
+            raise JobTimeout(f"killed after exceeding its timeout of {timeout}s")
+        try:
+            error, proceed = parent_conn.recv()
+        except EOFError:                             # Died without reporting (crash, OOM kill)
+            process.join(KILL_GRACE)
+            error, proceed = f"process exited with code {process.exitcode}", None
+        if error:
+            raise RuntimeError(error)
+        return None if proceed else False
+    finally:
+        process.join(KILL_GRACE)
+        parent_conn.close()
+
+
+class Job:
+    """
+    A schedulable unit of work.
+
+    `func` is a callable or a lazy "module:function" target imported on first run.
+    Give it one trigger: a daily time (`at="20:00"`), a weekly slot (`weekday="monday", at="07:00"`),
+    an interval (`every_minutes=1`) or upstream jobs (`depends_on=[...]`).
+    A job runs after its upstreams succeed; an upstream returning False halts the chain.
+
+    With a `timeout` (seconds) the job runs in its own process and is killed when it overruns;
+    its `func` must then be importable there (a "module:function" target or module-level function).
+    """
+
+    def __init__(self, name, func, at=None, weekday=None, every_minutes=None,
+                 depends_on=(), max_concurrency=1, timeout=None, catch_up=True):
+        if weekday and weekday not in WEEKDAYS:
+            raise ValueError(f"❌ Unknown weekday for job {name}: {weekday}")
+        if (at or every_minutes) and depends_on:
+            raise ValueError(f"❌ Job {name} needs one trigger: a schedule or depends_on, not both")
+        self.name = name
+        self.func = func
+        self.at = datetime.strptime(at, "%H:%M").time() if at else None
+        self.weekday = WEEKDAYS.index(weekday) if weekday else None
+        self.every_minutes = every_minutes
+        self.depends_on = list(depends_on)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.catch_up = catch_up
+
+    def resolve(self):
+        self.func = _resolve(self.func)
+        return self.func
+
+    def run(self):
+        if self.timeout:
+            return _run_with_timeout(self.name, self.func, self.timeout)
+        return self.resolve()()
+
+    @property
+    def is_scheduled(self):
+        return self.at is not None or self.every_minutes is not None
+
+    def last_due(self, now):
+        """Most recent scheduled slot at or before `now` (None for DAG-only jobs)."""
+        if self.every_minutes:
+            step = self.every_minutes * 60
+            return datetime.fromtimestamp(int(now.timestamp() // step) * step)
+        if self.at is None:
+            return None
+
+        due = datetime.combine(now.date(), self.at)
+        if due > now:
+            due -= timedelta(days=1)
+        if self.weekday is not None:
+            due -= timedelta(days=(due.weekday() - self.weekday) % 7)
+        return due
+
+
+class JobRuntime:
+    def __init__(self, jobs, state_path=STATE_PATH, max_workers=4):
+        self.jobs = {job.name: job for job in jobs}
+        for job in jobs:
+            missing = [dep for dep in job.depends_on if dep not in self.jobs]
+            if missing:
+                raise ValueError(f"❌ Job {job.name} depends on unknown job(s): {missing}")
+        self._check_acyclic()
+
+        self.state_path = state_path
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._running = {}           # run_id -> (job name, started_at, chain or None)
+        self._chains = {}            # scheduled job name -> its slot's chain of runs still in flight
+        self._run_counter = 0
+        self._stop = threading.Event()
+        self.state = self._load_state()
+
+    # === DAG helpers ===
+    def _check_acyclic(self):
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"❌ Job dependency cycle through: {name}")
+            visiting.add(name)
+            for dep in self.jobs[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.jobs:
+            visit(name)
+
+    def dependents(self, name):
+        return [job for job in self.jobs.values() if name in job.depends_on]
+
+    # === State ===
+    def _load_state(self):
+        state = {}
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r") as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read scheduler state: {e}")
+
+        now = datetime.now()
+        for job in self.jobs.values():
+            entry = state.setdefault(job.name, {})
+            entry.setdefault("durations", [])
+            # First sighting of a job: start its schedule now rather than running a stale slot
+            if job.is_scheduled and "last_due" not in entry:
+                entry["last_due"] = job.last_due(now).isoformat()
+        return state
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def duration_stats(self, name):
+        durations = sorted(d["seconds"] for d in self.state.get(name, {}).get("durations", []))
+        if not durations:
+            return {}
+        return {
+            "runs": len(durations),
+            "p50": durations[len(durations) // 2],
+            "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            "max": durations[-1],
+        }
+
+    # === Execution ===
+    # A scheduled run starts a chain: its slot plus every dependent run it triggers. The slot
+    # counts as done only once the whole chain succeeded (or halted on a False); a failed,
+    # killed or interrupted run anywhere in it leaves the slot due, to be retried (or caught up
+    # after a restart).
+    def submit(self, name, reason="manual", slot=None, chain=None):
+        job = self.jobs[name]
+        with self._lock:
+            active = sum(1 for job_name, _, _ in self._running.values() if job_name == name)
+            if active >= job.max_concurrency:
+                print(f"⏭️ [{name}] Skipped ({reason}): {active} run(s) still in progress.")
+                return False
+            if slot is not None:
+                chain = self._chains[name] = {"job": name, "slot": slot, "open": 0, "failed": None}
+            if chain is not None:
+                chain["open"] += 1
+            self._run_counter += 1
+            run_id = self._run_counter
+            self._running[run_id] = (name, time.time(), chain)
+
+        print(f"▶️ [{name}] Started ({reason}).")
+        future = self._executor.submit(job.run)
+        future.add_done_callback(lambda fut: self._on_done(run_id, job, fut))
+        return True
+
+    def _on_done(self, run_id, job, future):
+        finished = time.time()
+        with self._lock:
+            _, started, chain = self._running.pop(run_id)
+        duration = finished - started
+
+        error = future.exception()
+        result = None if error else future.result()
+        if isinstance(error, JobTimeout):
+            status = "timeout"
+            print(f"⌛ [{job.name}] {error}; dependents not run.")
+        elif error:
+            status = "failed"
+            print(f"❌ [{job.name}] Failed after {duration:.1f}s: {error}")
+        else:
+            status = "success"
+            print(f"✅ [{job.name}] Finished in {duration:.1f}s.")
+
+        with self._lock:
+            entry = self.state.setdefault(job.name, {"durations": []})
+            entry["last_run"] = datetime.fromtimestamp(started).isoformat()
+            entry["last_status"] = status
+            history = deque(entry["durations"], maxlen=DURATION_HISTORY)
+            history.append({"started": entry["last_run"], "seconds": round(duration, 3), "status": status})
+            entry["durations"] = list(history)
+            self._save_state()
+
+        # Dependents join the chain before this run leaves it, so it can't complete early
+        ok = status == "success"
+        if ok and result is not False:
+            for dependent in self.dependents(job.name):
+                if not self.submit(dependent.name, reason=f"after {job.name}", chain=chain) and chain:
+                    chain["failed"] = chain["failed"] or dependent.name
+        if chain is not None:
+            with self._lock:
+                self._leave_chain(chain, None if ok else job.name, finished)
+
+    def _leave_chain(self, chain, failed, finished):
+        chain["open"] -= 1
+        chain["failed"] = chain["failed"] or failed
+        if chain["open"] > 0:
+            return
+        del self._chains[chain["job"]]
+        entry = self.state[chain["job"]]
+        if chain["failed"] is None:
+            entry["last_due"] = max(entry["last_due"], chain["slot"])
+            entry.pop("retry", None)
+        else:
+            retry_at = (datetime.fromtimestamp(finished) + RETRY_DELAY).isoformat()
+            entry["retry"] = {"slot": chain["slot"], "after": retry_at}
+            print(f"🔁 [{chain['job']}] Slot {chain['slot']} will be retried after {retry_at} "
+                  f"({chain['failed']} did not complete).")
+        self._save_state()
+
+    def tick(self, now=None):
+        """Submit every scheduled job whose latest slot has not completed yet, including missed slots."""
+        now = now or datetime.now()
+
+        for job in self.jobs.values():
+            if not job.is_scheduled:
+                continue
+            due = job.last_due(now)
+            entry = self.state[job.name]
+            if due <= datetime.fromisoformat(entry["last_due"]):
+                continue
+            with self._lock:
+                if job.name in self._chains:
+                    continue                     # Recorded when the chain in progress finishes
+                retry = entry.get("retry")
+                if retry and retry["slot"] == due.isoformat() and now < datetime.fromisoformat(retry["after"]):
+                    continue                     # Same slot failed recently: back off before retrying
+
+            # Only the latest slot is run, however many were missed while we were down
+            late = now - due > CATCH_UP_GRACE
+            if late and not job.catch_up:
+                print(f"⏭️ [{job.name}] Missed slot {due} not caught up.")
+                with self._lock:
+                    entry["last_due"] = due.isoformat()
+                    self._save_state()
+                continue
+            self.submit(job.name, reason="catch-up" if late else "schedule", slot=due.isoformat())
+
+    def run_forever(self, poll_seconds=30):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(poll_seconds)
+
+    def start(self, poll_seconds=30):
+        thread = threading.Thread(target=self.run_forever, args=(poll_seconds,), name="job-runtime", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self, wait=False):
+        self._stop.set()
+        self._executor.shutdown(wait=wait)
@@ -2,16 +2,21 @@
 
 import numpy as np
 import os
+import threading
 import joblib
-from keras.models import load_model
 from datetime import datetime
 
-from src.feature_engineering import add_technical_indicators, merge_sentiment
+from src.feature_store import get_feature_store
 from src.market_data_collector import fetch_ohlcv
-from src.sentiment_pipeline import fetch_twitter_sentiment
+from src.sentiment_pipeline import collect_sentiment
 from src.monitoring import log_trade
 from src.telegram_alerts import send_alert
 from src.utils import log_prediction
+from src.drift_monitor import get_drift_monitor
+from src.accuracy_tracker import get_accuracy_tracker
+from src.config import BINANCE_SYMBOL, BINANCE_TIMEFRAME
+from src.prediction_cache import cached_confidences
+from src import metrics
 
 SILENT_MODE = False
 
@@ -32,67 +37,147 @@ def get_latest_scaler_path():
     scalers.sort(reverse=True)
     return os.path.join(scaler_dir, scalers[0])
 
-# 🔮 Prediction Logic
-def predict_and_trade(return_result=False):
+# 🧠 Warm model/scaler cache — reloads only when the tracked file or its mtime changes
+_artifact_cache = {}
+_artifact_lock = threading.Lock()
+
+def _load_cached(kind, path, loader):
+    key = (path, os.path.getmtime(path))
+    with _artifact_lock:
+        cached = _artifact_cache.get(kind)
+        if cached and cached[0] == key:
+            metrics.inc("artifact_cache_total", kind=kind, result="hit")
+            return cached[1]
+        metrics.inc("artifact_cache_total", kind=kind, result="miss")
+        artifact = loader(path)
+        _artifact_cache[kind] = (key, artifact)
+        return artifact
+
+def _load_keras_model(path):
+    from keras.models import load_model  # TensorFlow loads only when a model is first needed
+    return load_model(path)
+
+def load_artifacts(model_path, scaler_path):
+    model = _load_cached("model", model_path, _load_keras_model)
+    scaler = _load_cached("scaler", scaler_path, joblib.load)
+    return model, scaler
+
+def load_latest_artifacts():
+    return load_artifacts(get_latest_model_path(), get_latest_scaler_path())
+
+# 🚦 Signal rule (shared with historical replay, so both paths trade the same candles)
+LONG_ABOVE = 0.6             # Confidence above → LONG
+SHORT_BELOW = 0.4            # Confidence below → SHORT
+MIN_TRADE_CONFIDENCE = 0.7   # Filter: confidence a trade needs
+RSI_LONG_BELOW = 30          # Filter: LONG only when oversold
+RSI_SHORT_ABOVE = 70         # Filter: SHORT only when overbought
+
+def map_signal(confidence, rsi):
+    """Returns (signal, allow_trade) for one prediction."""
+    if confidence > LONG_ABOVE:
+        signal = "LONG"
+    elif confidence < SHORT_BELOW:
+        signal = "SHORT"
+    else:
+        signal = "HOLD"
+
+    allow_trade = False
+    if signal == "LONG" and rsi < RSI_LONG_BELOW and confidence > MIN_TRADE_CONFIDENCE:
+        allow_trade = True
+    elif signal == "SHORT" and rsi > RSI_SHORT_ABOVE and confidence > MIN_TRADE_CONFIDENCE:
+        allow_trade = True
+    return signal, allow_trade
+
+def classify_signals(confidence, rsi):
+    """Vectorized map_signal over arrays: "LONG"/"SHORT" where the trade is allowed, else "FILTERED"."""
+    confidence, rsi = np.asarray(confidence, dtype=float), np.asarray(rsi, dtype=float)
+    strong = confidence > MIN_TRADE_CONFIDENCE
+    long_ = (confidence > LONG_ABOVE) & (rsi < RSI_LONG_BELOW) & strong
+    short = (confidence < SHORT_BELOW) & (rsi > RSI_SHORT_ABOVE) & strong
+    return np.where(long_, "LONG", np.where(short, "SHORT", "FILTERED"))
+
+# 🔮 Prediction Logic (pass `df` to reuse already-fetched closed candles)
+@metrics.timed("predict.total")
+def predict_and_trade(return_result=False, df=None):
     try:
+        # Passed-in candles are all closed, so the latest window's confidence is cacheable
+        closed_only = df is not None
+
         # Load model & scaler
-        model_path = get_latest_model_path()
-        scaler_path = get_latest_scaler_path()
-        model = load_model(model_path)
-        scaler = joblib.load(scaler_path)
+        with metrics.span("predict.load_artifacts"):
+            model, scaler = load_latest_artifacts()
 
         # Fetch + preprocess
-        df = fetch_ohlcv("BTC/USDT", limit=100)
-        df = add_technical_indicators(df)
-        sentiment = fetch_twitter_sentiment()
-        df = merge_sentiment(df, sentiment)
-        df = df.dropna().reset_index(drop=True)
-
+        if df is None:
+            with metrics.span("predict.fetch_ohlcv"):
+                df = fetch_ohlcv("BTC/USDT", limit=100)
+        with metrics.span("predict.sentiment"):
+            collect_sentiment()
+        # Closed candles are materialized once in the feature store; only the forming one is computed here
+        with metrics.span("predict.features"):
+            df = get_feature_store().features_for(df)
+        # Only the model's inputs must be present; higher-timeframe context columns stay NaN until warm
         features = ['rsi_14', 'ema_21', 'macd', 'sentiment']
-        X = df[features].values
-        X_scaled = scaler.transform(X)
+        df = df.dropna(subset=features).reset_index(drop=True)
+        with metrics.span("predict.scale"):
+            X = df[features].values
+            X_scaled = scaler.transform(X)
 
         window_size = 10
-        latest_window = X_scaled[-window_size:]
-        input_data = np.expand_dims(latest_window, axis=0)
-
-        prediction = model.predict(input_data, verbose=0)
-        confidence = float(prediction[0][0])
+        with metrics.span("predict.model"):
+            if closed_only:
+                confidence = float(cached_confidences(df, BINANCE_SYMBOL, BINANCE_TIMEFRAME, rows=[len(df) - 1],
+                                                      window=window_size)[0])
+            else:
+                latest_window = X_scaled[-window_size:]
+                input_data = np.expand_dims(latest_window, axis=0)
+                prediction = model.predict(input_data, verbose=0)
+                confidence = float(prediction[0][0])
 
         latest_rsi = df['rsi_14'].iloc[-1]
         current_price = df['close'].iloc[-1]
 
-        # Map prediction to signal
-        if confidence > 0.6:
-            signal = "LONG"
-        elif confidence < 0.4:
-            signal = "SHORT"
-        else:
-            signal = "HOLD"
-
-        # Filter weak signals
-        allow_trade = False
-        if signal == "LONG" and latest_rsi < 30 and confidence > 0.7:
-            allow_trade = True
-        elif signal == "SHORT" and latest_rsi > 70 and confidence > 0.7:
-            allow_trade = True
+        # Stream this candle's inputs + output into the drift monitor (once per candle)
+        try:
+            get_drift_monitor().update(
+                {**df[features].iloc[-1].to_dict(), "confidence": confidence},
+                candle_time=df['timestamp'].iloc[-1]
+            )
+        except Exception as e:
+            print(f"⚠️ Drift monitor update failed: {e}")
+
+        # Map prediction to signal + filter weak signals
+        signal, allow_trade = map_signal(confidence, latest_rsi)
+
+        # Resolve earlier predictions against closed candles, then queue this one
+        try:
+            tracker = get_accuracy_tracker()
+            recent = df.iloc[-10:-1]
+            tracker.observe_candles(recent['timestamp'], recent['close'])
+            tracker.record_prediction(df['timestamp'].iloc[-1], confidence, signal if allow_trade else "FILTERED")
+        except Exception as e:
+            print(f"⚠️ Accuracy tracker update failed: {e}")
 
         # Log decision
-        log_prediction(
-            signal if allow_trade else "FILTERED",
-            confidence,
-            latest_rsi,
-            current_price,
-            source="live"
-        )
+        with metrics.span("predict.log_prediction"):
+            log_prediction(
+                signal if allow_trade else "FILTERED",
+                confidence,
+                latest_rsi,
+                current_price,
+                source="live",
+                candle_time=df['timestamp'].iloc[-1]   # Same candle the accuracy tracker records
+            )
+        metrics.inc("predictions_total", signal=signal if allow_trade else "FILTERED")
 
         # Execute if passed filter
         if allow_trade:
             log_trade(signal, confidence)
             if not SILENT_MODE:
-                send_alert(
-                    f"🚨 Signal Triggered!\nSignal: {signal}\nConfidence: {confidence:.2%}\nRSI: {latest_rsi:.2f}"
-                )
+                with metrics.span("predict.send_alert"):
+                    send_alert(
+                        f"🚨 Signal Triggered!\nSignal: {signal}\nConfidence: {confidence:.2%}\nRSI: {latest_rsi:.2f}"
+                    )
             print(f"📢 FINAL Signal: {signal} | RSI: {latest_rsi:.2f} | Confidence: {confidence:.2%}")
             if return_result:
                 return signal, confidence
@@ -5,12 +5,14 @@ import pandas as pd              # Dataframe management
 import os
 import time
 import random
+import threading
 
 # Configurable constants from your config.py
-from src.config import BINANCE_SYMBOL, BINANCE_TIMEFRAME, OHLCV_LIMIT
+from src.config import BINANCE_SYMBOL, BINANCE_TIMEFRAME, OHLCV_LIMIT, BINANCE_ENV, BINANCE_API_URL
 
 # Retry decorator (auto-retries if ccxt fails due to rate limit/network)
-from src.utils import retry
+from src.utils import retry, timeframe_to_seconds, binance_futures_urls
+from src import metrics
 
 # Set to True if routing through VPS/ngrok proxy (to bypass Binance UK block)
 USE_PROXY = True
@@ -18,18 +20,30 @@ USE_PROXY = True
 # Proxy endpoint — should match your VPS tunnel (e.g., TinyProxy on port 8888)
 PROXY_URL = "http://localhost:8888"
 
-# 📈 Fetch OHLCV data from Binance using ccxt
-@retry(max_attempts=4, delay=1, backoff=2)
-def fetch_ohlcv(symbol=BINANCE_SYMBOL, timeframe=BINANCE_TIMEFRAME, limit=OHLCV_LIMIT):
-    # Light random delay to reduce API spam / prevent IP bans
-    time.sleep(random.uniform(0.5, 1.5))
+_exchange = None
+_exchange_lock = threading.Lock()
 
+# 🔌 One ccxt client per process (keeps its HTTP session and rate limiter warm)
+def get_exchange():
+    global _exchange
+    with _exchange_lock:
+        if _exchange is None:
+            _exchange = _build_exchange()
+        return _exchange
+
+def _build_exchange():
     # Basic exchange configuration
     exchange_config = {
         'enableRateLimit': True,                          # Prevents hitting Binance limits
         'options': {'defaultType': 'future'}              # Use Binance Futures market
     }
 
+    # Local exchange simulator: market data comes from its replayed candles, no proxy
+    if BINANCE_ENV == "sim":
+        exchange_config['urls'] = {'api': binance_futures_urls(BINANCE_API_URL)}
+        exchange_config['options']['fetchMarkets'] = {'types': ['linear']}
+        return ccxt.binance(exchange_config)
+
     # If proxy usage is enabled, route HTTP requests through the specified proxy
     if USE_PROXY:
         exchange_config['proxies'] = {
@@ -38,13 +52,95 @@ def fetch_ohlcv(symbol=BINANCE_SYMBOL, timeframe=BINANCE_TIMEFRAME, limit=OHLCV_
         }
 
     # Initialize the ccxt Binance instance with or without proxy
-    exchange = ccxt.binance(exchange_config)
+    return ccxt.binance(exchange_config)
 
-    # Fetch OHLCV candles (default = latest N candles)
-    ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+# 📈 Fetch OHLCV data from Binance using ccxt
+@retry(max_attempts=4, delay=1, backoff=2)
+def fetch_ohlcv(symbol=BINANCE_SYMBOL, timeframe=BINANCE_TIMEFRAME, limit=OHLCV_LIMIT, since=None):
+    # Light random delay to reduce API spam / prevent IP bans
+    time.sleep(random.uniform(0.5, 1.5))
+
+    # Fetch OHLCV candles (default = latest N candles, or N candles from `since` in ms)
+    metrics.inc("ohlcv_requests_total", timeframe=timeframe)
+    ohlcv = get_exchange().fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
 
     # Convert to Pandas DataFrame
     df = pd.DataFrame(ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"])
     df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
 
     return df  # Ready for feature_engineering
+
+
+# 📚 Page through history: all candles with start <= timestamp < end (datetimes, UTC)
+def fetch_ohlcv_range(symbol=BINANCE_SYMBOL, timeframe=BINANCE_TIMEFRAME, start=None, end=None, page_size=1000):
+    step_ms = timeframe_to_seconds(timeframe) * 1000
+    since = int(pd.Timestamp(start).timestamp() * 1000)
+    end_ms = int(pd.Timestamp(end).timestamp() * 1000) if end is not None else None
+
+    pages = []
+    while end_ms is None or since < end_ms:
+        page = fetch_ohlcv(symbol, timeframe=timeframe, limit=page_size, since=since)
+        if page.empty:
+            break
+        pages.append(page)
+        since = int(page["timestamp"].iloc[-1].timestamp() * 1000) + step_ms
+        if len(page) < page_size:
+            break
+
+    if not pages:
+        return pd.DataFrame(columns=["timestamp", "open", "high", "low", "close", "volume"])
+    df = pd.concat(pages, ignore_index=True).drop_duplicates(subset="timestamp")
+    if end is not None:
+        df = df[df["timestamp"] < pd.Timestamp(end)]
+    return df.reset_index(drop=True)
+
+
+# 🕯️ Rolling in-memory candle buffer shared by every consumer in one process
+class CandleBuffer:
+    def __init__(self, symbol=BINANCE_SYMBOL, timeframe=BINANCE_TIMEFRAME, maxlen=OHLCV_LIMIT):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.maxlen = maxlen
+        self._df = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_warm(self):
+        return self._df is not None and not self._df.empty
+
+    def refresh(self):
+        """Fetch only candles at or after the newest buffered one (the last may still be forming)."""
+        with self._lock:
+            current = self._df
+
+        if current is None or current.empty:
+            merged = fetch_ohlcv(self.symbol, timeframe=self.timeframe, limit=self.maxlen)
+        else:
+            since = int(current["timestamp"].iloc[-1].timestamp() * 1000)
+            new = fetch_ohlcv(self.symbol, timeframe=self.timeframe, limit=self.maxlen, since=since)
+            merged = pd.concat([current, new], ignore_index=True)
+            merged = merged.drop_duplicates(subset="timestamp", keep="last")
+
+        merged = merged.sort_values("timestamp").tail(self.maxlen).reset_index(drop=True)
+        with self._lock:
+            self._df = merged
+        return merged
+
+    def snapshot(self, closed_only=False):
+        with self._lock:
+            df = self._df.copy() if self._df is not None else None
+        if df is None:
+            return None
+        if closed_only:
+            close_times = df["timestamp"] + pd.Timedelta(seconds=timeframe_to_seconds(self.timeframe))
+            df = df[close_times <= pd.Timestamp.now("UTC").tz_localize(None)].reset_index(drop=True)
+        return df
+
+
+_candle_buffer = None
+
+def get_candle_buffer():
+    global _candle_buffer
+    if _candle_buffer is None:
+        _candle_buffer = CandleBuffer()
+    return _candle_buffer
@@ -0,0 +1,168 @@
+# src/metrics.py — Lightweight spans, counters and histograms (Prometheus text export)
+
+import atexit
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_PATH = "logs/metrics.prom"           # Latest snapshot in Prometheus text format
+SPAN_LOG_PATH = "logs/metrics_spans.csv"     # Rolling per-span timings
+SPAN_LOG_MAX_BYTES = 5 * 1024 * 1024         # Rotate to .1 beyond this size
+EXPORT_INTERVAL = 60                         # Seconds between file exports
+SPAN_FLUSH_SIZE = 200                        # Buffered spans before a file append
+
+# Seconds; covers sub-ms scaler calls up to multi-minute retrains
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}           # (name, labels) -> value
+        self.histograms = {}         # (name, labels) -> Histogram
+        self._spans = []
+        self._exporter_pid = None    # Process whose export thread is running
+
+    # === Periodic export ===
+    def _ensure_exporter(self):
+        # Started by the first recording in each process (a forked child gets its own)
+        if self._exporter_pid == os.getpid():
+            return
+        with self._lock:
+            if self._exporter_pid == os.getpid():
+                return
+            self._exporter_pid = os.getpid()
+        threading.Thread(target=self._export_loop, name="metrics-export", daemon=True).start()
+
+    def _export_loop(self):
+        # Every EXPORT_INTERVAL, whether or not any span completed meanwhile
+        while True:
+            time.sleep(EXPORT_INTERVAL)
+            self.export()
+
+    # === Recording ===
+    def inc(self, name, value=1, **labels):
+        self._ensure_exporter()
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        self._ensure_exporter()
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def span(self, stage):
+        """Time a pipeline stage into `stage_duration_seconds{stage=...}` (errors are counted too)."""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_duration_seconds", elapsed, stage=stage)
+            if status == "error":
+                self.inc("stage_errors_total", stage=stage)
+            with self._lock:
+                self._spans.append(f"{datetime.utcnow().isoformat()},{stage},{elapsed:.6f},{status}\n")
+                flush = len(self._spans) >= SPAN_FLUSH_SIZE
+            if flush:
+                self.export()
+
+    def timed(self, stage):
+        """Decorator form of `span`."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # === Export ===
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{_fmt_labels(labels)} {value}")
+
+            for (name, labels), hist in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {hist.total:.6f}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        with self._lock:
+            spans, self._spans = self._spans, []
+        try:
+            os.makedirs(os.path.dirname(METRICS_PATH) or ".", exist_ok=True)
+            if spans:
+                if os.path.exists(SPAN_LOG_PATH) and os.path.getsize(SPAN_LOG_PATH) > SPAN_LOG_MAX_BYTES:
+                    os.replace(SPAN_LOG_PATH, SPAN_LOG_PATH + ".1")
+                new_file = not os.path.exists(SPAN_LOG_PATH)
+                with open(SPAN_LOG_PATH, "a") as f:
+                    if new_file:
+                        f.write("timestamp,stage,seconds,status\n")
+                    f.writelines(spans)
+
+            tmp_path = METRICS_PATH + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp_path, METRICS_PATH)
+        except OSError as e:
+            print(f"⚠️ Metrics export failed: {e}")
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+registry = MetricsRegistry()
+
+# Module-level shortcuts used across the pipeline
+span = registry.span
+inc = registry.inc
+observe = registry.observe
+timed = registry.timed
+render_prometheus = registry.render_prometheus
+export = registry.export
+
+atexit.register(export)
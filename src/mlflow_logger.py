@@ -1,9 +1,25 @@
 # src/mlflow_logger.py
 
-import mlflow
+import atexit
+import hashlib
+import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
+import mlflow
+from keras.callbacks import Callback
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+
+from src import metrics
+
+ARTIFACT_INDEX = "mlruns/artifact_index.json"   # Content hash -> URI of the first uploaded copy
+EPOCH_FLUSH_EVERY = 10                          # Epochs buffered per log_batch call
+UPLOAD_EXIT_TIMEOUT = 60                        # Seconds to wait for queued uploads at exit
+
 def start_experiment_run(experiment_name="CryptoFuturesML", run_name=None):
     """
     Starts an MLflow run under the specified experiment.
@@ -12,20 +28,149 @@ def start_experiment_run(experiment_name="CryptoFuturesML", run_name=None):
     mlflow.set_experiment(experiment_name)
     return mlflow.start_run(run_name=run_name or f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
 
-def log_params_and_metrics(params: dict, metrics: dict):
+def log_params_and_metrics(params: dict = None, metrics: dict = None, step: int = 0, run_id: str = None):
+    """
+    Log training parameters and evaluation metrics to MLflow in a single batched request.
     """
-    Log training parameters and evaluation metrics to MLflow.
+    run_id = run_id or mlflow.active_run().info.run_id
+    now_ms = int(time.time() * 1000)
+    MlflowClient().log_batch(
+        run_id,
+        metrics=[Metric(key, float(val), now_ms, step) for key, val in (metrics or {}).items()],
+        params=[Param(key, str(val)) for key, val in (params or {}).items()],
+    )
+
+
+class MlflowEpochLogger(Callback):
     """
-    for key, val in params.items():
-        mlflow.log_param(key, val)
-    for key, val in metrics.items():
-        mlflow.log_metric(key, val)
+    Keras callback recording every epoch's logs (loss, accuracy, val_loss, ...) as MLflow
+    metrics with step=epoch, buffered and sent with log_batch every few epochs.
+    """
+
+    def __init__(self, run_id=None, flush_every=EPOCH_FLUSH_EVERY):
+        super().__init__()
+        self.run_id = run_id or mlflow.active_run().info.run_id
+        self.flush_every = flush_every
+        self._client = MlflowClient()
+        self._buffer = []
+
+    def on_epoch_end(self, epoch, logs=None):
+        now_ms = int(time.time() * 1000)
+        self._buffer.extend(Metric(key, float(val), now_ms, epoch) for key, val in (logs or {}).items())
+        if (epoch + 1) % self.flush_every == 0:
+            self._flush()
+
+    def on_train_end(self, logs=None):
+        self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        try:
+            self._client.log_batch(self.run_id, metrics=self._buffer)
+        except Exception as e:
+            print(f"⚠️ Could not log epoch metrics to MLflow: {e}")
+        self._buffer = []
+
+
+class ArtifactUploader:
+    """
+    Copies artifacts into MLflow on a background thread. Files whose content was uploaded
+    before (same SHA-256) are not copied again; the run gets a tag pointing at the existing copy.
+    """
+
+    def __init__(self, index_path=ARTIFACT_INDEX):
+        self.index_path = index_path
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, run_id, local_path, artifact_path=None):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mlflow-artifacts", daemon=True)
+                self._thread.start()
+        self._queue.put((run_id, local_path, artifact_path))
+
+    def flush(self, timeout=UPLOAD_EXIT_TIMEOUT):
+        """Wait (up to `timeout` seconds) for queued uploads to finish."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self._queue.unfinished_tasks == 0
+
+    def _run(self):
+        while True:
+            run_id, local_path, artifact_path = self._queue.get()
+            try:
+                self._upload(run_id, local_path, artifact_path)
+            except Exception as e:
+                print(f"❌ MLflow artifact upload failed for {local_path}: {e}")
+                metrics.inc("mlflow_artifacts_total", result="error")
+            finally:
+                self._queue.task_done()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read artifact index: {e}")
+        return {}
+
+    def _save_index(self, index):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _digest(path):
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def _upload(self, run_id, local_path, artifact_path):
+        if not os.path.exists(local_path):
+            return
+        client = MlflowClient()
+        digest = self._digest(local_path)
+        name = f"{artifact_path}/{os.path.basename(local_path)}" if artifact_path else os.path.basename(local_path)
+        index = self._load_index()
+
+        with metrics.span("mlflow.artifact_upload"):
+            if digest in index:
+                client.set_tag(run_id, f"artifact.{name}", index[digest])
+                metrics.inc("mlflow_artifacts_total", result="deduplicated")
+                return
+            client.log_artifact(run_id, local_path, artifact_path)
+            index[digest] = f"{client.get_run(run_id).info.artifact_uri}/{name}"
+            self._save_index(index)
+            client.set_tag(run_id, f"artifact.{name}", index[digest])
+        metrics.inc("mlflow_artifacts_total", result="uploaded")
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+def get_artifact_uploader():
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = ArtifactUploader()
+            atexit.register(_uploader.flush)
+        return _uploader
 
-def log_artifacts(model_path: str, scaler_path: str = None):
+def log_artifacts(model_path: str, scaler_path: str = None, run_id: str = None):
     """
-    Log saved model and scaler paths as artifacts.
+    Queue the saved model and scaler for upload; returns immediately.
     """
-    if os.path.exists(model_path):
-        mlflow.log_artifact(model_path, artifact_path="models")
-    if scaler_path and os.path.exists(scaler_path):
-        mlflow.log_artifact(scaler_path, artifact_path="scalers")
+    run_id = run_id or mlflow.active_run().info.run_id
+    uploader = get_artifact_uploader()
+    uploader.submit(run_id, model_path, artifact_path="models")
+    if scaler_path:
+        uploader.submit(run_id, scaler_path, artifact_path="scalers")
@@ -10,7 +10,7 @@ import os
 
 # 🧠 Convert time-series DataFrame into LSTM input format and return fitted scaler
 def prepare_data(df, feature_cols, target_col='close', window_size=10):
-    df = df.dropna().reset_index(drop=True)
+    df = df.dropna(subset=list(feature_cols) + [target_col]).reset_index(drop=True)
     df['target'] = (df[target_col].shift(-1) > df[target_col]).astype(int)
 
     features = df[feature_cols].values
@@ -26,8 +26,8 @@ def prepare_data(df, feature_cols, target_col='close', window_size=10):
 
     return np.array(X), np.array(y), scaler
 
-# ✅ Trains LSTM model with EarlyStopping and temporary checkpoint
-def train_lstm_model(X, y):
+# ✅ Trains LSTM model with EarlyStopping and temporary checkpoint (plus any extra callbacks, e.g. MLflow)
+def train_lstm_model(X, y, callbacks=None):
     model = Sequential()
     model.add(Input(shape=(X.shape[1], X.shape[2])))
     model.add(LSTM(64))
@@ -51,7 +51,7 @@ def train_lstm_model(X, y):
         epochs=50,
         batch_size=32,
         validation_split=0.2,
-        callbacks=[early_stop, model_checkpoint]
+        callbacks=[early_stop, model_checkpoint] + list(callbacks or [])
     )
 
     # 🧹 Cleanup temporary checkpoint file
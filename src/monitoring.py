@@ -3,7 +3,8 @@
 import os
 from datetime import datetime
 import pandas as pd
-from scipy.stats import wasserstein_distance
+from src.analytics import trade_stats
+from src.drift_monitor import DriftMonitor, REFERENCE_SIZE
 
 # ========= TRADE LOGGING =========
 def log_trade(signal, confidence):
@@ -53,9 +54,8 @@ def analyze_performance():
 
         # Optional — only show PnL if column exists and not empty
         if 'pnl_percent' in df.columns:
-            realized = df[df['pnl_percent'].notna()]
-            avg_pnl = realized['pnl_percent'].mean()
-            print(f"💰 Avg PnL: {avg_pnl:.2f}% (on {len(realized)} closed trades)")
+            realized = trade_stats(df['pnl_percent'])
+            print(f"💰 Avg PnL: {realized['avg_pnl']:.2f}% (on {realized['trades']} closed trades)")
 
     except Exception as e:
         print(f"❌ Performance analysis failed: {e}")
@@ -64,51 +64,53 @@ def analyze_performance():
 # ========= DRIFT DETECTION =========
 def drift_detected(threshold=0.15):
     """
-    Compare recent vs historical distributions for drift using Wasserstein Distance.
-    Features checked: sentiment_score, price_volatility, volume
+    Compare the recent sliding window against the reference window of the streaming
+    drift monitor (model inputs + output confidence) using Wasserstein distance and PSI.
+    Nothing is re-read from disk except the monitor's small state file.
     """
 
     try:
-        file_path = "data/datasets/combined_features.csv"
-        if not os.path.exists(file_path):
-            print("🚫 Feature dataset not found.")
-            return False
-
-        df = pd.read_csv(file_path)
-        if len(df) < 100:
+        monitor = DriftMonitor.load()
+        # Fresh install: take the input reference from the feature store instead of waiting a week
+        if not any(hist.is_frozen for hist in monitor.histograms.values()):
+            from src.feature_store import get_feature_store
+            reference = get_feature_store().tail(REFERENCE_SIZE)
+            if not reference.empty:
+                # Per column: context features still warming up must not empty the other references
+                monitor.reset_reference({c: reference[c].dropna().tolist() for c in reference.columns})
+
+        drift_metrics, drifted = monitor.evaluate(wd_threshold=threshold)
+        if not drift_metrics:
             print("⚠️ Not enough data to evaluate drift.")
             return False
 
-        # Split into historical and recent windows
-        historical = df.iloc[:-20]
-        recent = df.iloc[-20:]
-
-        drift_metrics = {}
-        drift_detected = False
-
-        for feature in ['sentiment_score', 'price_volatility', 'volume']:
-            if feature not in df.columns:
-                continue
-            hist_values = historical[feature].dropna()
-            recent_values = recent[feature].dropna()
-            if len(hist_values) < 10 or len(recent_values) < 10:
-                continue
-            wd = wasserstein_distance(hist_values, recent_values)
-            drift_metrics[feature] = wd
-            if wd > threshold:
-                drift_detected = True
-
-        # Save to drift log
+        drift_detected = bool(drifted)
+        if drift_detected:
+            print(f"🌊 Drift in: {', '.join(drifted)}")
+
+        # Save to drift log: one fixed column set over every monitored feature (NaN = not ready yet)
+        columns = ["timestamp"] + [f"{feature}_{kind}" for feature in monitor.histograms for kind in ("wd", "psi")] \
+            + ["drift_triggered"]
         drift_log = pd.DataFrame([{
             "timestamp": datetime.now(),
             **drift_metrics,
             "drift_triggered": drift_detected
-        }])
+        }]).reindex(columns=columns)
 
         os.makedirs("logs", exist_ok=True)
         drift_log_path = "logs/drift_log.csv"
-        if os.path.exists(drift_log_path):
-            drift_log.to_csv(drift_log_path, mode='a', header=False, index=False)
+        if os.path.exists(drift_log_path) and os.path.getsize(drift_log_path) > 0:
+            with open(drift_log_path, "r") as f:
+                header = f.readline().strip().split(",")
+            if header != columns:
+                # Older log with another column set: realign it to the fixed schema once
+                old = pd.read_csv(drift_log_path).reindex(columns=columns)
+                drift_log = pd.concat([old, drift_log], ignore_index=True)
+                tmp_path = drift_log_path + ".tmp"
+                drift_log.to_csv(tmp_path, index=False)
+                os.replace(tmp_path, drift_log_path)
+            else:
+                drift_log.to_csv(drift_log_path, mode='a', header=False, index=False)
         else:
             drift_log.to_csv(drift_log_path, index=False)
 
@@ -0,0 +1,444 @@
+# src/order_executor.py — Queued order execution on a persistent client with idempotent client order ids
+#
+#   python -m src.order_executor --mock   → exercise the executor against an in-memory mock exchange
+
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import ccxt
+
+from src.binance_executor import get_binance_client
+from src.config import BINANCE_SYMBOL
+from src.position_store import get_position_store
+from src.telegram_alerts import send_alert
+from src import metrics
+
+ORDER_PREFIX = "cfml"        # Marks our orders on the exchange
+MAX_ATTEMPTS = 4             # Tries per order on network errors (rejections are final)
+RETRY_BACKOFF = 0.5          # Seconds before the 2nd try, doubled for each later one
+CANCEL_BATCH = 10            # Binance Futures batchOrders accepts up to 10 ids per request
+SETTLE_DELAY = 30            # Seconds before an order with an unknown outcome is looked up again
+
+
+def client_order_id(symbol, side, amount, intent):
+    """Same intent → same id, so re-sending an order the exchange already took can't duplicate it."""
+    digest = hashlib.sha1(f"{symbol}|{side}|{amount}|{intent}".encode("utf-8")).hexdigest()[:24]
+    return f"{ORDER_PREFIX}-{digest}"        # 29 chars; Binance allows up to 36
+
+
+def new_order(side, amount, symbol=BINANCE_SYMBOL, intent=None):
+    """Order request as stored in position state and queued for execution."""
+    intent = intent if intent is not None else time.time_ns()
+    return {
+        "client_order_id": client_order_id(symbol, side, amount, intent),
+        "symbol": symbol,
+        "side": side,
+        "amount": amount,
+        "status": "pending",
+    }
+
+
+class OrderExecutor:
+    """
+    Sends market orders from a queue on one background worker and one persistent exchange client.
+
+    Every order carries a deterministic client order id. After a network error the worker first
+    looks the id up on the exchange and only re-sends if the order isn't there. Results (fill
+    price, order id, or failure) are reconciled into the position store: an opening order the
+    exchange rejected, or never received, rolls the position back instead of leaving it open.
+
+    An order that may have reached the exchange but could not be confirmed (retries exhausted,
+    unexpected error after sending) is "unknown": it stays pending in the position state and is
+    looked up again every SETTLE_DELAY seconds until the exchange shows it or reports it missing.
+    """
+
+    def __init__(self, client_factory=get_binance_client, store=None, alert=send_alert,
+                 max_attempts=MAX_ATTEMPTS, backoff=RETRY_BACKOFF):
+        self.client_factory = client_factory
+        self.store = store or get_position_store()
+        self.alert = alert
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    # === Public API ===
+    def submit(self, order):
+        """Queue an order from `new_order`; returns a Future resolving to its execution record."""
+        future = Future()
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="order-executor", daemon=True)
+                self._thread.start()
+        self._queue.put((dict(order), future, time.perf_counter()))
+        return future
+
+    def recover(self):
+        """
+        Re-queue the position's pending order (safe: the id is looked up first). One that may
+        already be on the exchange is only looked up, never re-sent.
+        """
+        order = self.store.state().get("order")
+        if order and order.get("status") == "pending":
+            if order.get("sent"):
+                print(f"🔎 Looking up order {order['client_order_id']} with an unknown outcome.")
+                return self.submit({**order, "settle": True})
+            print(f"🔁 Resuming pending order {order['client_order_id']}.")
+            return self.submit({**order, "resumed": True})
+        return None
+
+    def flush(self, timeout=30):
+        """Wait (up to `timeout` seconds) until every queued order was executed."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self._queue.unfinished_tasks == 0
+
+    def cancel_orders(self, ids, symbol=BINANCE_SYMBOL):
+        """Cancel specific orders, up to CANCEL_BATCH per request."""
+        ids = list(ids)
+        with self._client_lock:
+            client = self._get_client()
+            for i in range(0, len(ids), CANCEL_BATCH):
+                client.cancel_orders(ids[i:i + CANCEL_BATCH], symbol)
+        metrics.inc("orders_cancelled_total", len(ids))
+        return len(ids)
+
+    def cancel_all(self, symbol=BINANCE_SYMBOL):
+        """Cancel every open order for `symbol` in a single request."""
+        with self._client_lock:
+            self._get_client().cancel_all_orders(symbol)
+        metrics.inc("cancel_all_total")
+
+    # === Worker ===
+    def _get_client(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    def _run(self):
+        while True:
+            order, future, queued_at = self._queue.get()
+            try:
+                record = self._execute(order, queued_at)
+                self._reconcile(record)
+                future.set_result(record)
+            except Exception as e:
+                print(f"❌ Order worker error: {e}")
+                record = {"client_order_id": order["client_order_id"], "side": order["side"],
+                          "status": "unknown", "id": None, "fill_price": None, "filled": 0.0, "error": str(e)}
+                try:
+                    self._reconcile(record)      # Whether it reached the exchange is unknown: look it up later
+                except Exception as reconcile_error:
+                    print(f"❌ Could not reconcile order {order.get('client_order_id')}: {reconcile_error}")
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+            if record["status"] == "unknown":
+                self._schedule_settle()
+
+    def _schedule_settle(self):
+        timer = threading.Timer(SETTLE_DELAY, self.recover)
+        timer.daemon = True
+        timer.start()
+
+    def _execute(self, order, queued_at=None):
+        cid, symbol, side, amount = order["client_order_id"], order["symbol"], order["side"], order["amount"]
+        start = time.perf_counter()
+        result, error, attempt = None, None, 0
+        settle = order.get("settle")             # Lookup only: the order may already be on the exchange
+        sent = bool(settle or order.get("resumed"))   # Whether it may have reached the exchange
+        rejected = False                         # The exchange said no (rejected, or not found on lookup)
+
+        while attempt < self.max_attempts:
+            attempt += 1
+            creating = False
+            try:
+                with self._client_lock:
+                    client = self._get_client()
+                    # A previous try (or process) may have reached the exchange before failing
+                    if attempt > 1 or sent:
+                        result = self._lookup(client, cid, symbol)
+                        if result is None and settle:
+                            rejected, error = True, f"order {cid} not found on the exchange"
+                            break
+                    if result is None:
+                        sent = creating = True
+                        result = client.create_order(symbol, "market", side, amount,
+                                                     params={"clientOrderId": cid})
+                break
+            except ccxt.NetworkError as e:       # Timeouts, 5xx, rate limits: the order may or may not exist
+                error = e
+                if attempt < self.max_attempts:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+            except ccxt.ExchangeError as e:      # Rejected (margin, filters, ...): retrying won't help
+                error, rejected = e, creating    # (a lookup error is no answer about the order)
+                break
+            except Exception as e:               # Client factory, decoding, bugs: failed if nothing was
+                error = e                        # sent yet, otherwise unknown until looked up
+                break
+
+        latency = time.perf_counter() - start
+        if result is not None:
+            status = "filled" if result.get("status") == "closed" else "open"
+        else:
+            status = "failed" if rejected or not sent else "unknown"
+        record = {
+            "client_order_id": cid,
+            "symbol": symbol,
+            "side": side,
+            "amount": amount,
+            "status": status,
+            "id": result.get("id") if result else None,
+            "fill_price": result.get("average") if result else None,
+            "filled": result.get("filled") if result else 0.0,
+            "attempts": attempt,
+            "latency_ms": round(latency * 1000, 1),
+            "queued_ms": round((start - queued_at) * 1000, 1) if queued_at else 0.0,
+            "error": None if result else str(error),
+        }
+        metrics.observe("order_latency_seconds", latency, side=side, status=status)
+        if queued_at:
+            metrics.observe("order_queue_seconds", start - queued_at)
+        metrics.inc("orders_total", status=status)
+
+        if status == "unknown":
+            print(f"⚠️ Order outcome unknown after {attempt} attempt(s): {side.upper()} {amount} {symbol} "
+                  f"| {cid} | {error} — looking it up again in {SETTLE_DELAY}s")
+        elif result is None:
+            print(f"❌ Order failed after {attempt} attempt(s): {side.upper()} {amount} {symbol} | {error}")
+        else:
+            print(f"✅ Order {status}: {side.upper()} {amount} {symbol} @ {record['fill_price']} "
+                  f"| {cid} | {record['latency_ms']} ms")
+        return record
+
+    @staticmethod
+    def _lookup(client, cid, symbol):
+        try:
+            return client.fetch_order(None, symbol, params={"origClientOrderId": cid})
+        except ccxt.OrderNotFound:
+            return None
+
+    def _reconcile(self, record):
+        rolled_back = first_unknown = False
+        with self.store.transaction() as state:
+            order = state.get("order")
+            if not order or order.get("client_order_id") != record["client_order_id"]:
+                return                           # The position has moved on to another order
+            if record["status"] == "unknown":
+                # Still pending, marked as possibly on the exchange: from now on it is only looked up
+                first_unknown = not order.get("sent")
+                state["order"] = {**order, "status": "pending", "sent": True}
+            else:
+                state["order"] = {**order, **{k: record[k] for k in ("status", "id", "fill_price", "filled")}}
+            if record["status"] == "failed" and state["is_open"]:
+                state.update({"is_open": False, "type": None, "entry_price": 0.0, "entry_time": None})
+                rolled_back = True
+            elif record["fill_price"] and state["is_open"]:
+                state["entry_price"] = float(record["fill_price"])
+        if rolled_back:
+            self.alert(f"❌ Order {record['side'].upper()} failed — position rolled back\n{record['error']}")
+        elif first_unknown:
+            self.alert(f"⚠️ Order {record['side'].upper()} outcome unknown — position kept, checking the exchange\n"
+                       f"{record['error']}")
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_order_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = OrderExecutor()
+            _executor.recover()
+        return _executor
+
+
+# === In-memory mock exchange for local checks ===
+class MockExchange:
+    """
+    Just enough of a ccxt exchange: market orders fill at `price` after `latency` seconds,
+    client order ids are unique, and responses can be dropped or orders rejected on demand.
+    """
+
+    def __init__(self, price=50_000.0, latency=0.002):
+        self.price = price
+        self.latency = latency
+        self.orders = {}                 # client order id -> order
+        self.calls = []
+        self.drop_next_response = 0      # Accept the order, then time out
+        self.reject_next = 0
+        self.offline = False             # Every call times out without reaching the exchange
+        self.fail_after_accept = None    # Accept the order, then raise this (e.g. a decoding error)
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self.calls.append("create_order")
+        time.sleep(self.latency)
+        if self.offline:
+            raise ccxt.RequestTimeout("binance POST timed out")
+        cid = (params or {})["clientOrderId"]
+        if self.reject_next:
+            self.reject_next -= 1
+            raise ccxt.InsufficientFunds("binance Margin is insufficient.")
+        if cid in self.orders:
+            raise ccxt.InvalidOrder("binance Duplicate clientOrderId")
+        filled = type == "market"
+        order = {"id": str(len(self.orders) + 1), "clientOrderId": cid, "symbol": symbol, "side": side,
+                 "amount": amount, "filled": amount if filled else 0.0, "average": self.price if filled else None,
+                 "price": price, "status": "closed" if filled else "open"}
+        self.orders[cid] = order
+        if self.fail_after_accept:
+            error, self.fail_after_accept = self.fail_after_accept, None
+            raise error
+        if self.drop_next_response:
+            self.drop_next_response -= 1
+            raise ccxt.RequestTimeout("binance GET read timed out")
+        return dict(order)
+
+    def fetch_order(self, id, symbol=None, params=None):
+        self.calls.append("fetch_order")
+        if self.offline:
+            raise ccxt.RequestTimeout("binance GET timed out")
+        cid = (params or {}).get("origClientOrderId")
+        if cid not in self.orders:
+            raise ccxt.OrderNotFound(f"binance Order does not exist: {cid}")
+        return dict(self.orders[cid])
+
+    def fetch_open_orders(self, symbol=None):
+        return [dict(o) for o in self.orders.values() if o["status"] == "open"]
+
+    def cancel_orders(self, ids, symbol=None):
+        self.calls.append("cancel_orders")
+        for order in self.orders.values():
+            if order["id"] in ids:
+                order["status"] = "canceled"
+
+    def cancel_all_orders(self, symbol=None):
+        self.calls.append("cancel_all_orders")
+        for order in self.orders.values():
+            if order["status"] == "open":
+                order["status"] = "canceled"
+
+
+def run_mock_checks():
+    import tempfile
+    from src.position_store import PositionStore
+
+    exchange = MockExchange()
+    store = PositionStore(tempfile.mkdtemp())
+    alerts = []
+    executor = OrderExecutor(client_factory=lambda: exchange, store=store, alert=alerts.append, backoff=0.01)
+
+    def open_position(signal, intent):
+        with store.transaction() as state:
+            order = new_order("buy" if signal == "LONG" else "sell", 0.001, intent=intent)
+            state.update({"is_open": True, "type": signal, "entry_price": 49_990.0, "order": order})
+        return executor.submit(order)
+
+    def close_position():
+        with store.transaction() as state:
+            state.update({"is_open": False, "type": None, "entry_price": 0.0})
+
+    # 1️⃣ Fill is reconciled into position state
+    record = open_position("LONG", "2026-01-01T00:00").result(timeout=5)
+    state = store.state()
+    assert record["status"] == "filled" and state["order"]["status"] == "filled"
+    assert state["entry_price"] == exchange.price and state["order"]["id"] == record["id"]
+    print(f"✅ Fill reconciled: entry {state['entry_price']} from order {record['id']} ({record['latency_ms']} ms).")
+
+    # 2️⃣ Lost response → lookup by client order id, no duplicate order
+    close_position()
+    exchange.drop_next_response = 1
+    record = open_position("SHORT", "2026-01-01T01:00").result(timeout=5)
+    assert record["status"] == "filled" and record["attempts"] == 2
+    assert len(exchange.orders) == 2 and exchange.calls[-2:] == ["create_order", "fetch_order"], exchange.calls
+    print("✅ Timed-out order found by client order id on retry, not sent twice.")
+
+    # 3️⃣ Rejection is final and rolls the position back
+    close_position()
+    exchange.reject_next = 1
+    record = open_position("LONG", "2026-01-01T02:00").result(timeout=5)
+    state = store.state()
+    assert record["status"] == "failed" and record["attempts"] == 1
+    assert not state["is_open"] and state["order"]["status"] == "failed" and alerts
+    print("✅ Rejected order not retried; position rolled back and alerted.")
+
+    # 3️⃣b Retries exhausted on network errors → unknown: position kept, later lookup settles it
+    close_position()
+    exchange.offline = True
+    record = open_position("LONG", "2026-01-01T02:10").result(timeout=5)
+    state = store.state()
+    assert record["status"] == "unknown" and state["is_open"] and state["order"]["status"] == "pending"
+    exchange.offline = False
+    record = executor.recover().result(timeout=5)           # What the settle timer does
+    state = store.state()
+    assert record["status"] == "failed" and exchange.calls[-1] == "fetch_order"
+    assert not state["is_open"] and state["order"]["status"] == "failed"
+    print("✅ Unconfirmed order kept pending, then rolled back once the exchange reported it missing.")
+
+    # 3️⃣c Unexpected error after the exchange took the order → unknown, settled as filled
+    close_position()
+    exchange.fail_after_accept = TypeError("bad response")
+    record = open_position("LONG", "2026-01-01T02:20").result(timeout=5)
+    assert record["status"] == "unknown" and store.state()["is_open"]
+    record = executor.recover().result(timeout=5)
+    state = store.state()
+    assert record["status"] == "filled" and state["is_open"] and state["order"]["status"] == "filled"
+    print("✅ Order accepted before an unexpected error: not rolled back, settled as filled by lookup.")
+
+    # 3️⃣d Errors before anything was sent (client factory) → failed and rolled back
+    close_position()
+    broken = OrderExecutor(client_factory=lambda: (_ for _ in ()).throw(OSError("no keys")), store=store,
+                           alert=alerts.append, backoff=0.01)
+    with store.transaction() as state:
+        order = new_order("buy", 0.001, intent="2026-01-01T02:30")
+        state.update({"is_open": True, "type": "LONG", "entry_price": 49_990.0, "order": order})
+    record = broken.submit(order).result(timeout=5)
+    state = store.state()
+    assert record["status"] == "failed" and not state["is_open"] and state["order"]["status"] == "failed"
+    print("✅ Order that never left (client error) recorded as failed; position rolled back.")
+
+    # 4️⃣ Restart with a pending order resumes it idempotently
+    with store.transaction() as state:
+        order = new_order("sell", 0.001, intent="2026-01-01T03:00")
+        state.update({"is_open": True, "type": "SHORT", "order": order})
+    exchange.create_order(order["symbol"], "market", "sell", 0.001, params={"clientOrderId": order["client_order_id"]})
+    restarted = OrderExecutor(client_factory=lambda: exchange, store=PositionStore(store.path), backoff=0.01)
+    record = restarted.recover().result(timeout=5)
+    assert record["status"] == "filled" and record["attempts"] == 1 and len(exchange.orders) == 4
+    assert exchange.calls[-1] == "fetch_order" and restarted.store.state()["order"]["status"] == "filled"
+    print("✅ Pending order resumed after restart: found on the exchange, not re-sent.")
+
+    # 5️⃣ Batch cancels
+    for i in range(25):
+        exchange.create_order(BINANCE_SYMBOL, "limit", "buy", 0.001, price=40_000 + i,
+                              params={"clientOrderId": client_order_id(BINANCE_SYMBOL, "buy", 0.001, f"limit-{i}")})
+    open_ids = [o["id"] for o in exchange.fetch_open_orders()]
+    before = exchange.calls.count("cancel_orders")
+    executor.cancel_orders(open_ids[:15])
+    executor.cancel_all()
+    assert exchange.calls.count("cancel_orders") - before == 2 and not exchange.fetch_open_orders()
+    print("✅ 15 ids cancelled in 2 batch requests, remaining 10 with one cancel-all.")
+
+    # 6️⃣ Per-order latency over a burst
+    futures = [executor.submit(new_order("buy", 0.001, intent=f"burst-{i}")) for i in range(200)]
+    records = [f.result(timeout=30) for f in futures]
+    latencies = sorted(r["latency_ms"] for r in records)
+    print(f"✅ 200 queued orders: execution p50 {latencies[100]} ms, p95 {latencies[190]} ms, max {latencies[-1]} ms "
+          f"(mock latency {exchange.latency * 1000:.0f} ms); last one waited {records[-1]['queued_ms']} ms in queue.")
+
+
+if __name__ == "__main__":
+    import sys
+    if "--mock" in sys.argv:
+        run_mock_checks()
+    else:
+        print(get_order_executor().recover() or "✅ No pending order to resume.")
@@ -1,7 +1,6 @@
 # src/paper_trader.py
 
 import time
-import ccxt
 import pandas as pd
 from datetime import datetime
 import os
@@ -16,18 +15,7 @@ POLL_INTERVAL = 900        # 15 minutes
 MIN_CONFIDENCE = 0.6       # Threshold for action
 
 # ====== SETUP ======
-exchange = ccxt.binance()
-balance = VIRTUAL_BALANCE
-position = None
-entry_price = 0.0
-os.makedirs("logs", exist_ok=True)
-
-# Logging config
-logging.basicConfig(
-    filename="logs/paper_trader.log",
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
+exchange = None   # Created on first use so importing this module stays cheap
 
 # ====== IMPORT YOUR MODEL PREDICTION FUNCTION HERE ======
 # from model.predictor import predict_and_trade
@@ -38,37 +26,57 @@ def predict_and_trade():
     return random.choice(["buy", "sell", "hold"]), random.uniform(0.5, 0.9)
 
 # ====== GET PRICE ======
+def get_exchange():
+    global exchange
+    if exchange is None:
+        import ccxt
+        exchange = ccxt.binance()
+    return exchange
+
 def get_current_price(symbol):
-    return exchange.fetch_ticker(symbol)['last']
+    return get_exchange().fetch_ticker(symbol)['last']
 
 # ====== SIMULATION LOGIC ======
-def simulate_trade():
-    global balance, position, entry_price
-
-    try:
-        current_price = get_current_price(TRADE_SYMBOL)
-        signal, confidence = predict_and_trade()
-        timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-
+class PaperTrader:
+    """
+    Long-only paper account. `step` applies one (signal, confidence) at a price and logs the
+    tick; live polling uses the default instance, historical replay (src/replay_driver.py)
+    its own with a buffered `log_sink` and candle-close timestamps.
+    """
+
+    def __init__(self, balance=VIRTUAL_BALANCE, log_sink=None):
+        self.balance = balance
+        self.position = None
+        self.entry_price = 0.0
+        self.log_sink = log_sink or log_trade
+
+    def step(self, price, signal, confidence, timestamp=None):
+        timestamp = (timestamp or datetime.utcnow()).strftime('%Y-%m-%d %H:%M:%S')
         action = "No Action"
         pnl = 0.0
 
         if confidence < MIN_CONFIDENCE:
             signal = "hold"
 
-        if signal == "buy" and position is None:
-            entry_price = current_price
-            position = "long"
-            action = f"Enter Long @ {entry_price:.2f}"
+        if signal == "buy" and self.position is None:
+            self.entry_price = price
+            self.position = "long"
+            action = f"Enter Long @ {self.entry_price:.2f}"
 
-        elif signal == "sell" and position == "long":
-            pnl = (current_price - entry_price) * (balance / entry_price)
-            balance += pnl
-            action = f"Exit Long @ {current_price:.2f} | PnL: {pnl:.2f}"
-            position = None
-            entry_price = 0.0
+        elif signal == "sell" and self.position == "long":
+            pnl = (price - self.entry_price) * (self.balance / self.entry_price)
+            self.balance += pnl
+            action = f"Exit Long @ {price:.2f} | PnL: {pnl:.2f}"
+            self.position = None
+            self.entry_price = 0.0
 
-        log_trade(timestamp, signal, current_price, action, pnl, balance) # ✅ Only triggered when a trade is exited
+        self.log_sink(timestamp, signal, price, action, pnl, self.balance)
+
+def simulate_trade():
+    try:
+        current_price = get_current_price(TRADE_SYMBOL)
+        signal, confidence = predict_and_trade()
+        _trader.step(current_price, signal, confidence)
 
     except Exception as e:
         logging.error(f"❌ simulate_trade error: {str(e)}")
@@ -84,6 +92,7 @@ def log_trade(timestamp, signal, price, action, pnl, balance):
         "Balance": balance
     }
 
+    os.makedirs("logs", exist_ok=True)
     if not os.path.exists(LOG_PATH):
         pd.DataFrame([log_entry]).to_csv(LOG_PATH, index=False)
     else:
@@ -91,8 +100,17 @@ def log_trade(timestamp, signal, price, action, pnl, balance):
 
     logging.info(f"{action} | Balance: {balance:.2f} | PnL: {pnl:.2f}")
 
+_trader = PaperTrader()   # Live account state (in memory, as before)
+
 # ====== LOOPING EXECUTION ======
 if __name__ == "__main__":
+    # Configured here so importing the module (e.g. for replay) doesn't redirect root logging
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(
+        filename="logs/paper_trader.log",
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(message)s"
+    )
     while True:
         simulate_trade()
         print(f"Trade checked at {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}")
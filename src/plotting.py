@@ -0,0 +1,125 @@
+# src/plotting.py — Headless chart helpers: time-range log reads, LTTB downsampling, parallel rendering
+
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+PLOT_DIR = "logs/plots"
+MAX_POINTS = 2000            # Points per line after downsampling (~2 per horizontal pixel at 10in/100dpi)
+PLOT_DPI = 100
+
+
+# === Time-range reads ===
+def _line_at(f, pos, data_start):
+    # First complete line starting at or after byte `pos` → (offset, line); (None, b"") at EOF
+    if pos > data_start:
+        f.seek(pos - 1)
+        f.readline()              # Finish the line `pos - 1` belongs to (no-op if pos starts a line)
+    else:
+        f.seek(data_start)
+    offset = f.tell()
+    line = f.readline()
+    return (offset, line) if line.endswith(b"\n") else (None, b"")
+
+def _offset_of(f, t, data_start, size, time_index):
+    # Byte offset of the first row with time >= t, by bisection over file positions
+    lo, hi = data_start, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        offset, line = _line_at(f, mid, data_start)
+        if offset is None or pd.Timestamp(next(csv.reader([line.decode("utf-8")]))[time_index]) >= t:
+            hi = mid
+        else:
+            lo = mid + 1
+    offset, _ = _line_at(f, lo, data_start)
+    return size if offset is None else offset
+
+def read_time_range(path, start=None, end=None, usecols=None, time_column="timestamp"):
+    """
+    Rows of an append-only, time-ordered CSV log with start <= time < end. The boundaries are
+    found by bisecting byte offsets (a few dozen line reads), so only the requested range is
+    parsed however long the log has grown.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start, size = len(header), os.fstat(f.fileno()).st_size
+        time_index = next(csv.reader([header.decode("utf-8").strip()])).index(time_column)
+        lo = _offset_of(f, pd.Timestamp(start), data_start, size, time_index) if start is not None else data_start
+        hi = _offset_of(f, pd.Timestamp(end), data_start, size, time_index) if end is not None else size
+        f.seek(lo)
+        chunk = f.read(max(0, hi - lo))
+    chunk = chunk[:chunk.rfind(b"\n") + 1]   # A half-written last row is left out
+    df = pd.read_csv(io.BytesIO(header + chunk), usecols=usecols)
+    df[time_column] = pd.to_datetime(df[time_column])
+    return df
+
+
+# === Downsampling ===
+def lttb(x, y, n_out=MAX_POINTS):
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the visual shape of
+    (x, y) — peaks and dips survive, unlike plain striding. First and last points are kept.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = x - x[0]                                     # Keeps the triangle areas well-conditioned
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)   # n_out - 2 buckets between the end points
+    cum_x = np.concatenate([[0.0], np.cumsum(x)])
+    cum_y = np.concatenate([[0.0], np.cumsum(y)])
+    width = np.diff(edges)
+    avg_x = np.append((cum_x[edges[1:]] - cum_x[edges[:-1]]) / width, x[-1])
+    avg_y = np.append((cum_y[edges[1:]] - cum_y[edges[:-1]]) / width, y[-1])
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+def downsample(df, x_column, y_column, n_out=MAX_POINTS):
+    """Rows of df chosen by LTTB on (x_column, y_column); datetimes are handled as seconds."""
+    x = df[x_column]
+    x = x.values.astype("datetime64[ns]").astype(np.int64) / 1e9 if np.issubdtype(x.dtype, np.datetime64) else x
+    return df.iloc[lttb(x, df[y_column].to_numpy(dtype=float), n_out)]
+
+
+# === Rendering ===
+def new_figure(figsize=(10, 5), **subplots):
+    """Figure + axes bound to the Agg canvas: no pyplot state, no display needed."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, dpi=PLOT_DPI)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(**subplots)
+
+def save_figure(fig, name):
+    os.makedirs(PLOT_DIR, exist_ok=True)
+    path = os.path.join(PLOT_DIR, name)
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+def render_parallel(tasks, workers=None):
+    """
+    Run chart functions [(func, kwargs), ...] in worker processes (one figure per process,
+    no shared matplotlib state); results come back in task order. One CPU or one task → inline.
+    """
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1:
+        return [func(**kwargs) for func, kwargs in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, **kwargs) for func, kwargs in tasks]
+        return [future.result() for future in futures]
@@ -2,24 +2,23 @@
 
 from datetime import datetime, timedelta
 import os
+import threading
 import pandas as pd
-from src.binance_executor import place_order
+from src.config import BINANCE_SYMBOL
+from src.order_executor import get_order_executor, new_order
 from src.telegram_alerts import send_alert
-from src.utils import write_daily_log
+from src.utils import generate_daily_summary_log
+from src.position_store import get_position_store
+from src.aggregate_cache import get_aggregate_cache
 
 POSITION_LOG = "logs/virtual_positions.csv"
 COOLDOWN_MINUTES = 10
 TRADE_LIVE = True
 TRADE_AMOUNT = 0.001
 
-position_state = {
-    "is_open": False,
-    "type": None,
-    "entry_price": 0.0,
-    "entry_time": None,
-    "cooldown_until": None,
-    "balance": 10000.0
-}
+def get_position_state():
+    """Current position state (recovered from the journal, including other processes' updates)."""
+    return get_position_store().state()
 
 def log_position(entry):
     os.makedirs("logs", exist_ok=True)
@@ -28,69 +27,127 @@ def log_position(entry):
         df.to_csv(POSITION_LOG, mode='a', header=False, index=False)
     else:
         df.to_csv(POSITION_LOG, index=False)
+    try:
+        get_aggregate_cache()   # Folds the new row into the daily aggregates and persists them
+    except Exception as e:
+        print(f"⚠️ Aggregate cache update failed: {e}")
+
+
+class PositionManager:
+    """
+    The position state machine (open, reverse-close, cooldown, balance compounding) bound to
+    a state store and its side effects. The live path uses the default instance; historical
+    replay (src/replay_driver.py) builds one over its own store, with closed trades sent to
+    `log_sink` and no orders, alerts or daily summary.
+    """
+
+    def __init__(self, store=None, log_sink=log_position, trade_live=None, alerts=True,
+                 daily_summary=True, cooldown_minutes=None, verbose=True):
+        self.store = store or get_position_store()
+        self.log_sink = log_sink
+        self.trade_live = trade_live
+        self.alerts = alerts
+        self.daily_summary = daily_summary
+        self.cooldown_minutes = cooldown_minutes
+        self.verbose = verbose
+
+    def _say(self, message):
+        if self.verbose:
+            print(message)
+
+    def handle_signal(self, signal, price, timestamp=None, candle_time=None):
+        # `timestamp` is the clock: wall time live, the candle close during replay.
+        # `candle_time` (open time of the scored candle) keys the order; defaults to the clock.
+        timestamp = timestamp or datetime.utcnow()
+        candle_time = pd.Timestamp(candle_time if candle_time is not None else timestamp)
+        trade_live = TRADE_LIVE if self.trade_live is None else self.trade_live
+        cooldown = COOLDOWN_MINUTES if self.cooldown_minutes is None else self.cooldown_minutes
+        closed = order = None
+
+        # The transition is journaled (and the lock released) before any order or alert goes out
+        with self.store.transaction() as position_state:
+            if position_state["cooldown_until"] and timestamp < position_state["cooldown_until"]:
+                self._say("⏳ In cooldown. Skipping trade.")
+                return position_state
+
+            if not position_state["is_open"]:
+                if signal not in ["LONG", "SHORT"]:
+                    self._say("⚠️ HOLD signal. No open position.")
+                    return position_state
+                position_state.update({
+                    "is_open": True,
+                    "type": signal,
+                    "entry_price": price,
+                    "entry_time": timestamp,
+                    "cooldown_until": None
+                })
+                if trade_live:
+                    # Keyed on the candle, so re-handling the same signal can't place a second order
+                    order = new_order("buy" if signal == "LONG" else "sell", TRADE_AMOUNT, BINANCE_SYMBOL,
+                                      intent=f"{signal}|{candle_time.isoformat()}")
+                    position_state["order"] = order
+
+            elif (position_state["type"] == "LONG" and signal == "SHORT") or \
+                 (position_state["type"] == "SHORT" and signal == "LONG"):
+
+                entry_price = position_state["entry_price"]
+                position_type = position_state["type"]
+
+                pnl = ((price - entry_price) / entry_price) if position_type == "LONG" \
+                      else ((entry_price - price) / entry_price)
+                new_balance = position_state["balance"] * (1 + pnl)
+                closed = {
+                    "timestamp": timestamp,
+                    "entry_time": position_state["entry_time"],
+                    "signal": position_type,
+                    "entry_price": round(entry_price, 2),
+                    "exit_price": round(price, 2),
+                    "pnl_percent": round(pnl * 100, 2),
+                    "balance_after": round(new_balance, 2)
+                }
+
+                position_state.update({
+                    "is_open": False,
+                    "type": None,
+                    "entry_price": 0.0,
+                    "entry_time": None,
+                    "balance": new_balance,
+                    "cooldown_until": timestamp + timedelta(minutes=cooldown)
+                })
+
+            else:
+                self._say(f"🔁 Ignoring signal: {signal} | Position: {position_state['type']}")
+                return position_state
+
+        if closed is None:
+            if order:
+                get_order_executor().submit(order)   # Fill or failure is reconciled into position state
+
+            self._say(f"📥 Position OPENED: {signal} @ {price:.2f}")
+            if self.alerts:
+                send_alert(f"📥 Position OPENED: {signal}\n@ ${price:.2f}")
+        else:
+            self.log_sink(closed)
 
-def handle_signal(signal, price, timestamp=None):
-    global position_state
-    timestamp = timestamp or datetime.utcnow()
+            self._say(f"📤 Position CLOSED: {closed['signal']} | PnL: {closed['pnl_percent']:.2f}%")
+            if self.alerts:
+                send_alert(f"📤 CLOSED {closed['signal']} @ ${price:.2f}\nPnL: {closed['pnl_percent']:.2f}%")
 
-    if position_state["cooldown_until"] and timestamp < position_state["cooldown_until"]:
-        print("⏳ In cooldown. Skipping trade.")
-        return position_state
+            if self.daily_summary:
+                generate_daily_summary_log()  # Optional: updates daily log after each closed trade
 
-    if not position_state["is_open"]:
-        if signal in ["LONG", "SHORT"]:
-            position_state.update({
-                "is_open": True,
-                "type": signal,
-                "entry_price": price,
-                "entry_time": timestamp,
-                "cooldown_until": None
-            })
-            if TRADE_LIVE:
-                place_order("buy" if signal == "LONG" else "sell", amount=TRADE_AMOUNT)
-
-            print(f"📥 Position OPENED: {signal} @ {price:.2f}")
-            send_alert(f"📥 Position OPENED: {signal}\n@ ${price:.2f}")
-        else:
-            print("⚠️ HOLD signal. No open position.")
         return position_state
 
-    if (position_state["type"] == "LONG" and signal == "SHORT") or \
-       (position_state["type"] == "SHORT" and signal == "LONG"):
-
-        entry_price = position_state["entry_price"]
-        position_type = position_state["type"]
-
-        pnl = ((price - entry_price) / entry_price) if position_type == "LONG" \
-              else ((entry_price - price) / entry_price)
-        pnl_percent = round(pnl * 100, 2)
-        new_balance = position_state["balance"] * (1 + pnl)
-
-        log_position({
-            "timestamp": timestamp,
-            "entry_time": position_state["entry_time"],
-            "signal": position_type,
-            "entry_price": round(entry_price, 2),
-            "exit_price": round(price, 2),
-            "pnl_percent": pnl_percent,
-            "balance_after": round(new_balance, 2)
-        })
-
-        print(f"📤 Position CLOSED: {position_type} | PnL: {pnl_percent:.2f}%")
-        send_alert(f"📤 CLOSED {position_type} @ ${price:.2f}\nPnL: {pnl_percent:.2f}%")
-
-        position_state.update({
-            "is_open": False,
-            "type": None,
-            "entry_price": 0.0,
-            "entry_time": None,
-            "balance": new_balance,
-            "cooldown_until": timestamp + timedelta(minutes=COOLDOWN_MINUTES)
-        })
-
-        write_daily_log()  # Optional: updates daily log after each closed trade
 
-    else:
-        print(f"🔁 Ignoring signal: {signal} | Position: {position_state['type']}")
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_position_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = PositionManager()
+        return _manager
 
-    return position_state
+def handle_signal(signal, price, timestamp=None, candle_time=None):
+    return get_position_manager().handle_signal(signal, price, timestamp, candle_time)
@@ -0,0 +1,216 @@
+# src/position_store.py — Restart-safe position state: append-only journal + periodic snapshots
+
+import contextlib
+import copy
+import json
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:          # Windows: no cross-process locking, in-process lock only
+    fcntl = None
+
+from src import metrics
+
+STATE_DIR = "logs/position_state"
+SNAPSHOT_EVERY = 100         # Journal entries replayed at most on recovery
+DATETIME_FIELDS = ("entry_time", "cooldown_until")
+
+INITIAL_STATE = {
+    "is_open": False,
+    "type": None,
+    "entry_price": 0.0,
+    "entry_time": None,
+    "cooldown_until": None,
+    "balance": 10000.0,
+    "order": None            # Last order request + execution result (see src/order_executor.py)
+}
+
+
+def _encode(changes):
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in changes.items()}
+
+def _decode(changes):
+    return {k: datetime.fromisoformat(v) if k in DATETIME_FIELDS and v else v for k, v in changes.items()}
+
+
+class PositionStore:
+    """
+    Position state that survives restarts. Every transition appends one line with the changed
+    fields to journal.jsonl; every SNAPSHOT_EVERY entries the full state goes to snapshot.json
+    and the journal starts over, so recovery (snapshot + short tail) takes constant time.
+    Processes sharing the directory serialize transitions with an exclusive file lock.
+    `durable=False` skips the fsyncs (historical replay, where the state is throwaway).
+    """
+
+    def __init__(self, path=STATE_DIR, initial=INITIAL_STATE, durable=True):
+        self.path = path
+        self.durable = durable
+        self.journal_path = os.path.join(path, "journal.jsonl")
+        self.snapshot_path = os.path.join(path, "snapshot.json")
+        self.lock_path = os.path.join(path, ".lock")
+        self.initial = dict(initial)
+        self._lock = threading.RLock()
+        self._state = dict(initial)
+        self._seq = 0                # Last applied journal sequence number
+        self._snapshot_seq = 0
+        self._offset = 0             # Bytes of the journal already applied
+        self._journal_id = None      # Identity of the journal generation read so far
+        os.makedirs(path, exist_ok=True)
+        with self._lock, self._file_lock():
+            self.recover()
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # === Recovery ===
+    def recover(self):
+        """Load the latest snapshot and replay the journal entries written after it."""
+        with metrics.span("position_store.recover"):
+            self._state, self._seq = dict(self.initial), 0
+            if os.path.exists(self.snapshot_path):
+                try:
+                    with open(self.snapshot_path, "r") as f:
+                        snapshot = json.load(f)
+                    self._state.update(_decode(snapshot["state"]))
+                    self._seq = snapshot["seq"]
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️ Could not read position snapshot: {e}")
+            self._snapshot_seq = self._seq
+            self._offset, self._journal_id = 0, None
+            self._replay()
+
+    def _generation(self):
+        # Inodes can be reused after rotation, so the snapshot's mtime is part of the identity
+        try:
+            journal_ino = os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            return None
+        try:
+            return journal_ino, os.stat(self.snapshot_path).st_mtime_ns
+        except FileNotFoundError:
+            return journal_ino, None
+
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return
+        self._journal_id = self._generation()
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break                        # Torn write from a crash: not committed
+                self._offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry["seq"] > self._seq:     # Entries already in the snapshot are skipped
+                    self._state.update(_decode(entry["set"]))
+                    self._seq = entry["seq"]
+
+    def _refresh(self):
+        # Pick up transitions made by other processes since our last read
+        if self._generation() != self._journal_id:
+            self.recover()                       # Journal was rotated after a snapshot
+        else:
+            self._replay()
+
+    # === Reads ===
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._state)
+
+    # === Writes ===
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Yield a copy of the current state to modify; on exit the changed fields are journaled
+        (fsynced when durable) before the lock is released. Nothing is written if the block raises.
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            state = copy.deepcopy(self._state)
+            yield state
+            changes = {k: v for k, v in state.items() if self._state.get(k) != v}
+            if changes:
+                self._append(changes)
+
+    def _append(self, changes):
+        entry = {"seq": self._seq + 1, "ts": datetime.utcnow().isoformat(timespec="seconds"),
+                 "set": _encode(changes)}
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(line)
+            if self.durable:
+                f.flush()
+                os.fsync(f.fileno())
+        self._journal_id = self._generation()
+        self._offset += len(line)
+        self._state.update(changes)
+        self._seq += 1
+        metrics.inc("position_journal_entries_total")
+        if self._seq - self._snapshot_seq >= SNAPSHOT_EVERY:
+            self.snapshot()
+
+    def snapshot(self):
+        """Write the full state atomically, then start an empty journal."""
+        with self._lock, metrics.span("position_store.snapshot"):
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"seq": self._seq, "state": _encode(self._state)}, f, indent=2)
+                if self.durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+
+            # A crash between the two replaces is harmless: replay skips seq <= snapshot seq
+            tmp_path = self.journal_path + ".tmp"
+            open(tmp_path, "wb").close()
+            os.replace(tmp_path, self.journal_path)
+            self._journal_id = self._generation()
+            self._offset = 0
+            self._snapshot_seq = self._seq
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_position_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PositionStore()
+        return _store
+
+if __name__ == "__main__":
+    # Recovery timing check: python -m src.position_store [transitions]
+    import sys
+    import tempfile
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PositionStore(tmp)
+        start = time.perf_counter()
+        for i in range(n):
+            with store.transaction() as state:
+                state["balance"] += 1.0
+                state["is_open"] = not state["is_open"]
+        write_ms = (time.perf_counter() - start) * 1000 / n
+        start = time.perf_counter()
+        recovered = PositionStore(tmp).state()
+        print(f"✅ {n} transitions ({write_ms:.2f} ms each) | recovery {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"| balance {recovered['balance']:.0f} (expected {10000 + n})")
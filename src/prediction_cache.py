@@ -0,0 +1,244 @@
+# src/prediction_cache.py — Persistent model confidences per candle, keyed by model/scaler/feature/window fingerprint
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:          # Windows: no cross-process locking, in-process lock only
+    fcntl = None
+
+from src import metrics
+from src.config import BINANCE_TIMEFRAME
+from src.utils import timeframe_to_seconds
+
+CACHE_DIR = "data/prediction_cache"
+KEEP_FINGERPRINTS = 3        # Model generations (or window lengths) kept on disk; older ones are deleted
+FEATURES = ['rsi_14', 'ema_21', 'macd', 'sentiment']
+WINDOW_SIZE = 10             # Same window as live prediction
+PREDICT_BATCH = 4096         # Windows per model.predict call
+
+
+# === Fingerprint ===
+_digests = {}
+_digest_lock = threading.Lock()
+
+def _file_digest(path):
+    # Hashed once per (path, size, mtime): a model overwritten in place gets a new digest
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        if key not in _digests:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(chunk)
+            _digests[key] = sha.hexdigest()
+        return _digests[key]
+
+def fingerprint(model_path, scaler_path, window=WINDOW_SIZE):
+    """Model content + scaler content + feature definition version + window length → 16-hex-char id."""
+    from src.feature_engineering import FEATURE_VERSION
+    parts = f"{_file_digest(model_path)}|{_file_digest(scaler_path)}|v{FEATURE_VERSION}|w{int(window)}"
+    return hashlib.sha256(parts.encode()).hexdigest()[:16]
+
+
+# === Store ===
+class PredictionCache:
+    """
+    Confidences for one (fingerprint, symbol, timeframe) as a float32 memory-mapped array
+    indexed by candle: value i belongs to the window ending at origin + i * step (NaN = not
+    computed yet). A time range is one slice of the map. The array only grows; a new model,
+    scaler, FEATURE_VERSION or window length has a different fingerprint and so a separate directory.
+    """
+
+    def __init__(self, fingerprint, symbol, timeframe=BINANCE_TIMEFRAME, root=CACHE_DIR):
+        self.dir = os.path.join(root, fingerprint)
+        name = f"{symbol.replace('/', '')}_{timeframe}"
+        self.data_path = os.path.join(self.dir, name + ".f32")
+        self.meta_path = os.path.join(self.dir, name + ".json")
+        self.lock_path = os.path.join(self.dir, name + ".lock")
+        self.step = timeframe_to_seconds(timeframe) * 10**9
+        self._lock = threading.RLock()
+        self._meta = None
+        self._map = None
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        # Re-map only when the array grew (here or in another process) since the last read
+        try:
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta != self._meta:
+            self._meta = meta
+            self._map = np.memmap(self.data_path, dtype=np.float32, mode="r", shape=(meta["length"],)) \
+                if meta["length"] else None
+        return self._meta
+
+    def _save_meta(self, origin, length):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"origin": int(origin), "step": self.step, "length": int(length)}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    @staticmethod
+    def _ns(timestamps):
+        # Explicit ns: pandas 2 may hand back datetime64[us] columns
+        return pd.DatetimeIndex(pd.to_datetime(timestamps)).values.astype("datetime64[ns]").astype(np.int64)
+
+    # === Reads ===
+    def lookup(self, timestamps):
+        """float32 confidence per timestamp (NaN where not cached); a contiguous run is one slice."""
+        ts = self._ns(timestamps)
+        out = np.full(len(ts), np.nan, dtype=np.float32)
+        with self._lock:
+            meta = self._load()
+            if meta is None or self._map is None or not len(ts):
+                return out
+            offset, aligned = np.divmod(ts - meta["origin"], self.step)
+            valid = (aligned == 0) & (offset >= 0) & (offset < meta["length"])
+            if valid.all() and offset[-1] - offset[0] == len(ts) - 1:
+                out[:] = self._map[offset[0]:offset[-1] + 1]
+            else:
+                out[valid] = self._map[offset[valid]]
+        hits = int(np.count_nonzero(~np.isnan(out)))
+        metrics.inc("prediction_cache_total", hits, result="hit")
+        metrics.inc("prediction_cache_total", len(ts) - hits, result="miss")
+        return out
+
+    def range(self, start, end):
+        """(timestamps, confidences) for candles with start <= timestamp < end, read as one slice."""
+        with self._lock:
+            meta = self._load()
+            if meta is None or self._map is None:
+                return pd.DatetimeIndex([]), np.empty(0, dtype=np.float32)
+            lo = max(0, -(-(self._ns([start])[0] - meta["origin"]) // self.step))
+            hi = min(meta["length"], -(-(self._ns([end])[0] - meta["origin"]) // self.step))
+            values = np.array(self._map[lo:max(lo, hi)])
+        return pd.to_datetime(meta["origin"] + np.arange(lo, lo + len(values)) * self.step), values
+
+    # === Writes ===
+    def store(self, timestamps, confidences):
+        ts = self._ns(timestamps)
+        values = np.asarray(confidences, dtype=np.float32)
+        if not len(ts):
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        with self._lock, self._file_lock(), metrics.span("prediction_cache.store"):
+            meta = self._load()
+            origin, length = (meta["origin"], meta["length"]) if meta else (int(ts.min()), 0)
+
+            if ts.min() < origin:
+                # Backfill before the first cached candle: rewrite with an earlier origin
+                shift = -(-(origin - int(ts.min())) // self.step)
+                origin -= shift * self.step
+                tmp_path = self.data_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(np.full(shift, np.nan, dtype=np.float32).tobytes())
+                    if length:
+                        with open(self.data_path, "rb") as src:
+                            shutil.copyfileobj(src, f)
+                os.replace(tmp_path, self.data_path)
+                length += shift
+
+            offset, aligned = np.divmod(ts - origin, self.step)
+            offset, values = offset[aligned == 0], values[aligned == 0]   # Off-grid timestamps are not cached
+            needed = int(offset.max()) + 1 if len(offset) else length
+            if needed > length:
+                with open(self.data_path, "ab") as f:
+                    f.write(np.full(needed - length, np.nan, dtype=np.float32).tobytes())
+                length = needed
+            if len(offset):
+                data = np.memmap(self.data_path, dtype=np.float32, mode="r+", shape=(length,))
+                data[offset] = values
+                data.flush()
+                del data
+            self._save_meta(origin, length)
+
+
+# === Shared instances ===
+_caches = {}
+_caches_lock = threading.Lock()
+
+def _prune(root, keep):
+    # Drop the oldest fingerprints (by last use) beyond `keep`: superseded models
+    dirs = sorted((os.path.join(root, d) for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))),
+                  key=os.path.getmtime, reverse=True)
+    for stale in dirs[keep:]:
+        shutil.rmtree(stale, ignore_errors=True)
+        print(f"🧹 Removed prediction cache for superseded model: {os.path.basename(stale)}")
+
+def get_prediction_cache(symbol, timeframe=BINANCE_TIMEFRAME, model_path=None, scaler_path=None, root=CACHE_DIR,
+                         window=WINDOW_SIZE):
+    """Cache for the given artifacts (default: the promoted model + latest scaler) and window length."""
+    from src.live_trading_engine import get_latest_model_path, get_latest_scaler_path
+
+    fp = fingerprint(model_path or get_latest_model_path(), scaler_path or get_latest_scaler_path(), window)
+    key = (fp, symbol, timeframe, root)
+    with _caches_lock:
+        if key not in _caches:
+            fp_dir = os.path.join(root, fp)
+            is_new = not os.path.isdir(fp_dir)
+            os.makedirs(fp_dir, exist_ok=True)
+            os.utime(fp_dir)
+            if is_new:
+                _prune(root, KEEP_FINGERPRINTS)
+            _caches[key] = PredictionCache(fp, symbol, timeframe, root)
+        return _caches[key]
+
+
+# === Predictions ===
+def predict_windows(df, model, scaler, rows, window=WINDOW_SIZE, batch_size=PREDICT_BATCH):
+    """Confidence for the windows ending at each of `rows` (positions in df), in batched predict calls."""
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    rows = np.asarray(rows, dtype=int)
+    if not len(rows):
+        return np.empty(0, dtype=np.float32)
+    X_scaled = scaler.transform(df[FEATURES].values)
+    windows = sliding_window_view(X_scaled, window, axis=0).transpose(0, 2, 1)   # (rows, window, features)
+    with metrics.span("prediction_cache.predict"):
+        return model.predict(windows[rows - (window - 1)], batch_size=batch_size, verbose=0)[:, 0].astype(np.float32)
+
+def cached_confidences(df, symbol, timeframe=BINANCE_TIMEFRAME, rows=None, model_path=None, scaler_path=None,
+                       window=WINDOW_SIZE):
+    """
+    Confidence for `rows` of df (default: every row with a full window behind it), where df
+    holds consecutive closed candles with stored features. Cached values are read in one
+    slice; only the missing windows go through the model (one batch) and are cached.
+    """
+    from src.live_trading_engine import get_latest_model_path, get_latest_scaler_path, load_artifacts
+
+    model_path = model_path or get_latest_model_path()
+    scaler_path = scaler_path or get_latest_scaler_path()
+    rows = np.arange(window - 1, len(df)) if rows is None else np.asarray(rows, dtype=int)
+    cache = get_prediction_cache(symbol, timeframe, model_path, scaler_path, window=window)
+
+    timestamps = df["timestamp"].values[rows]
+    confidence = cache.lookup(timestamps)
+    missing = np.flatnonzero(np.isnan(confidence))
+    if len(missing):
+        model, scaler = load_artifacts(model_path, scaler_path)
+        confidence[missing] = predict_windows(df, model, scaler, rows[missing], window)
+        cache.store(timestamps[missing], confidence[missing])
+    return confidence
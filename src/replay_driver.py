@@ -0,0 +1,211 @@
+# src/replay_driver.py — Replays stored candles + model signals through the live position logic at full speed
+
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+from src.analytics import trade_stats
+from src.config import BINANCE_SYMBOL, BINANCE_TIMEFRAME
+from src.prediction_cache import FEATURES, WINDOW_SIZE, cached_confidences, predict_windows
+from src.utils import timeframe_to_seconds
+
+REPLAY_DIR = "logs/replay"      # Each run writes to logs/replay/<name>/, never to the live logs
+
+
+# === History ===
+def load_history(source="store", days=365, symbol=BINANCE_SYMBOL, timeframe=BINANCE_TIMEFRAME):
+    """
+    Last `days` of candles with features: the feature store's stored series, synthetic candles
+    (offline checks, sentiment 0), or a CSV with timestamp, close and the feature columns.
+    """
+    bars = days * 86400 // timeframe_to_seconds(timeframe)
+    if source == "store":
+        from src.feature_store import get_feature_store
+        df = get_feature_store(symbol, timeframe).tail(bars + WINDOW_SIZE)
+    elif source == "synthetic":
+        from src.feature_engineering import FEATURE_WARMUP, add_technical_indicators
+        from src.synthetic_data import generate_ohlcv
+        df = generate_ohlcv(n=bars + FEATURE_WARMUP, timeframe=timeframe)
+        df["sentiment"] = 0.0
+        df = add_technical_indicators(df)
+    else:
+        df = pd.read_csv(source)
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df.dropna(subset=FEATURES).tail(bars).reset_index(drop=True)
+
+
+# === Signals ===
+def model_confidences(df, symbol=None, timeframe=BINANCE_TIMEFRAME, window=WINDOW_SIZE):
+    """
+    Model confidence for every row, from the same scaler + window as live prediction but
+    batched. Rows without a full window behind them get NaN. With `symbol` (candles read
+    from the feature store) values come from / go to the prediction cache.
+    """
+    from src.live_trading_engine import load_latest_artifacts
+
+    confidence = np.full(len(df), np.nan)
+    rows = np.arange(window - 1, len(df))
+    with metrics.span("replay.predict"):
+        if symbol:
+            confidence[rows] = cached_confidences(df, symbol, timeframe, rows=rows, window=window)
+        else:
+            model, scaler = load_latest_artifacts()
+            confidence[rows] = predict_windows(df, model, scaler, rows, window)
+    return confidence
+
+def random_confidences(n, seed=0):
+    """Seeded uniform confidences (offline runs without a model, like paper_trader's mock)."""
+    return np.random.default_rng(seed).uniform(0, 1, n)
+
+
+# === Replay ===
+def _namespace(name):
+    out_dir = os.path.join(REPLAY_DIR, name or datetime.utcnow().strftime("%Y%m%d_%H%M%S"))
+    shutil.rmtree(out_dir, ignore_errors=True)   # A rerun starts from a fresh position state
+    os.makedirs(out_dir, exist_ok=True)
+    return out_dir
+
+def _clock(df, timeframe):
+    # Decisions are made once a candle has closed, so the simulated clock is open time + one bar
+    step = pd.Timedelta(seconds=timeframe_to_seconds(timeframe))
+    return pd.DatetimeIndex(pd.to_datetime(df["timestamp"]) + step).to_pydatetime()
+
+def _save_summary(out_dir, summary):
+    tmp_path = os.path.join(out_dir, "summary.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+    os.replace(tmp_path, os.path.join(out_dir, "summary.json"))
+
+def replay_positions(df, confidence, name=None, timeframe=BINANCE_TIMEFRAME, cooldown_minutes=None,
+                     balance=10000.0, signals=None):
+    """
+    Feed every allowed signal through position_manager's state machine (reversal closes,
+    cooldown, compounding) with candle-close timestamps as the clock. No orders or alerts;
+    closed trades go to <namespace>/virtual_positions.csv (same schema as the live log).
+    `signals` (LONG/SHORT/FILTERED per row) overrides the live rule applied to `confidence`.
+    """
+    from src.live_trading_engine import classify_signals
+    from src.position_manager import PositionManager
+    from src.position_store import INITIAL_STATE, PositionStore
+
+    out_dir = _namespace(name)
+    store = PositionStore(os.path.join(out_dir, "position_state"), initial={**INITIAL_STATE, "balance": balance},
+                          durable=False)
+    closed = []
+    manager = PositionManager(store=store, log_sink=closed.append, trade_live=False, alerts=False,
+                              daily_summary=False, cooldown_minutes=cooldown_minutes, verbose=False)
+
+    signals = np.asarray(signals) if signals is not None else classify_signals(confidence, df["rsi_14"].values)
+    clock = _clock(df, timeframe)
+    close = df["close"].to_numpy(dtype=float)
+    actionable = np.flatnonzero(signals != "FILTERED")
+
+    start = time.perf_counter()
+    with metrics.span("replay.positions"):
+        for i in actionable:
+            manager.handle_signal(signals[i], close[i], timestamp=clock[i])
+    elapsed = time.perf_counter() - start
+
+    trades = pd.DataFrame(closed, columns=["timestamp", "entry_time", "signal", "entry_price", "exit_price",
+                                           "pnl_percent", "balance_after"])
+    trades.to_csv(os.path.join(out_dir, "virtual_positions.csv"), index=False)
+
+    state = store.state()
+    summary = {
+        "mode": "positions",
+        "bars": len(df),
+        "start": df["timestamp"].iloc[0] if len(df) else None,
+        "end": df["timestamp"].iloc[-1] if len(df) else None,
+        "signals": {s: int((signals == s).sum()) for s in ("LONG", "SHORT")},
+        "trades": len(trades),
+        "win_rate": round(trade_stats(trades["pnl_percent"])["win_rate"], 2),
+        "final_balance": round(state["balance"], 2),
+        "return_pct": round((state["balance"] / balance - 1) * 100, 2),
+        "open_position": state["type"],
+        "seconds": round(elapsed, 3),
+        "bars_per_second": round(len(df) / elapsed) if elapsed else None,
+    }
+    _save_summary(out_dir, summary)
+    return trades, summary
+
+def replay_paper(df, confidence, name=None, timeframe=BINANCE_TIMEFRAME, balance=10000.0):
+    """
+    Step paper_trader's long-only account over every candle: confidence >= 0.5 is "buy" with
+    that confidence, otherwise "sell" with 1 - confidence. Ticks go to <namespace>/trade_log.csv.
+    """
+    from src.paper_trader import PaperTrader
+
+    out_dir = _namespace(name)
+    ticks = []
+    trader = PaperTrader(balance=balance, log_sink=lambda *row: ticks.append(row))
+
+    buy = confidence >= 0.5
+    signals = np.where(buy, "buy", "sell")
+    strength = np.where(buy, confidence, 1 - confidence)
+    clock = _clock(df, timeframe)
+    close = df["close"].to_numpy(dtype=float)
+
+    start = time.perf_counter()
+    with metrics.span("replay.paper"):
+        for i in np.flatnonzero(~np.isnan(confidence)):
+            trader.step(close[i], signals[i], strength[i], timestamp=clock[i])
+    elapsed = time.perf_counter() - start
+
+    log = pd.DataFrame(ticks, columns=["Time", "Signal", "Price", "Action", "PnL", "Balance"])
+    log.to_csv(os.path.join(out_dir, "trade_log.csv"), index=False)
+
+    exits = log[log["Action"].str.startswith("Exit")]
+    summary = {
+        "mode": "paper",
+        "bars": len(df),
+        "trades": len(exits),
+        "win_rate": round(trade_stats(exits["PnL"])["win_rate"], 2),
+        "final_balance": round(trader.balance, 2),
+        "return_pct": round((trader.balance / balance - 1) * 100, 2),
+        "open_position": trader.position,
+        "seconds": round(elapsed, 3),
+        "bars_per_second": round(len(df) / elapsed) if elapsed else None,
+    }
+    _save_summary(out_dir, summary)
+    return log, summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay history through the live position logic")
+    parser.add_argument("--source", default="store", help="store | synthetic | path to a features CSV")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--timeframe", default=BINANCE_TIMEFRAME)
+    parser.add_argument("--signals", default="model", choices=["model", "random"])
+    parser.add_argument("--mode", default="positions", choices=["positions", "paper", "both"])
+    parser.add_argument("--cooldown", type=float, default=None, help="Minutes (default: COOLDOWN_MINUTES)")
+    parser.add_argument("--name", default=None, help=f"Run directory under {REPLAY_DIR}/")
+    args = parser.parse_args()
+
+    try:
+        start = time.perf_counter()
+        df = load_history(args.source, args.days, timeframe=args.timeframe)
+        symbol = BINANCE_SYMBOL if args.source == "store" else None   # Only stored candles are cached
+        confidence = model_confidences(df, symbol, args.timeframe) if args.signals == "model" \
+            else random_confidences(len(df))
+        print(f"📦 {len(df)} bars loaded + scored in {time.perf_counter() - start:.1f}s")
+
+        name = args.name or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        if args.mode in ("positions", "both"):
+            _, summary = replay_positions(df, confidence, name=f"{name}/positions" if args.mode == "both" else name,
+                                          timeframe=args.timeframe, cooldown_minutes=args.cooldown)
+            print(f"✅ Positions: {json.dumps(summary, default=str)}")
+        if args.mode in ("paper", "both"):
+            _, summary = replay_paper(df, confidence, name=f"{name}/paper" if args.mode == "both" else name,
+                                      timeframe=args.timeframe)
+            print(f"✅ Paper: {json.dumps(summary, default=str)}")
+        print(f"📁 Logs in {os.path.join(REPLAY_DIR, name)}/")
+    except Exception as e:
+        print(f"❌ Replay failed: {e}")
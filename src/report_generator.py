@@ -1,82 +1,267 @@
-# src/report_generator.py
+# src/report_generator.py — Daily / weekly / monthly HTML reports from the per-day trade rollups
 
-from pathlib import Path
-import pandas as pd
-from datetime import datetime, timedelta
+import hashlib
+import html
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from src.aggregate_cache import get_aggregate_cache, summarize_buckets
+from src.utils import read_last_line
+
+REPORTS_DIR = "reports"
+RETRAIN_LOG = "logs/retrain_log.txt"
+MANIFEST_FILE = "manifest.json"     # Report path → digest of the data it was rendered from
+ASSET_FILE = "assets/report.css"    # Shared by every page instead of inlined into each
+PERIODS = ("daily", "weekly", "monthly")
+CHART_DAYS = {"daily": 30, "weekly": 91, "monthly": 365}   # Trailing days in each report's charts
+TEMPLATE_VERSION = 1                # Bump when the layout changes: every report is rewritten once
+DEFAULT_BALANCE = 10000
+
+CSS = """
+body { font-family: Arial; background: #111; color: #eee; padding: 20px; }
+h1 { color: #1db954; }
+a { color: #1db954; }
+table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+th, td { padding: 10px; border: 1px solid #444; text-align: center; }
+th { background-color: #222; }
+.highlight { color: #1ed760; font-weight: bold; }
+.muted { color: #777; }
+svg { width: 100%; height: 160px; background: #181818; border: 1px solid #333; }
+"""
+
+
+# === Periods ===
+def period_key(day, period):
+    """Daily "2024-05-03", weekly (ISO) "2024-W18", monthly "2024-05"."""
+    if period == "daily":
+        return day.isoformat()
+    if period == "weekly":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    return f"{day:%Y-%m}"
+
+def period_bounds(key, period):
+    """(first day, last day) of a period key."""
+    if period == "daily":
+        day = date.fromisoformat(key)
+        return day, day
+    if period == "weekly":
+        year, week = key.split("-W")
+        first = date.fromisocalendar(int(year), int(week), 1)
+        return first, first + timedelta(days=6)
+    first = date(int(key[:4]), int(key[5:7]), 1)
+    following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return first, following - timedelta(days=1)
 
-def generate_daily_report():
-    logs_path = Path("logs")
-    reports_path = Path("reports")
-    reports_path.mkdir(parents=True, exist_ok=True)
-
-    trades_file = logs_path / "virtual_positions.csv"
-    retrain_file = logs_path / "retrain_log.txt"
-
-    df_trades = pd.read_csv(trades_file) if trades_file.exists() else pd.DataFrame()
-    model_version = "N/A"
-
-    if retrain_file.exists():
-        with open(retrain_file, "r") as f:
-            lines = f.readlines()
-            for line in reversed(lines):
-                if "Saved:" in line:
-                    model_version = line.split("Saved:")[-1].strip()
-                    break
-
-    df_trades["timestamp"] = pd.to_datetime(df_trades["timestamp"])
-    today = datetime.utcnow().date()
-    this_week = today - timedelta(days=7)
-    today_trades = df_trades[df_trades["timestamp"].dt.date == today]
-    week_trades = df_trades[df_trades["timestamp"].dt.date >= this_week]
-
-    def summarize(df):
-        return {
-            "count": len(df),
-            "avg_pnl": round(df["pnl_percent"].mean(), 2) if not df.empty else 0,
-            "win_rate": round((df["pnl_percent"] > 0).mean() * 100, 2) if not df.empty else 0,
-        }
-
-    today_stats = summarize(today_trades)
-    week_stats = summarize(week_trades)
-    last_balance = df_trades["balance_after"].iloc[-1] if not df_trades.empty else 10000
-
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Daily Report - CryptoFuturesML</title>
-        <style>
-            body {{ font-family: Arial; background: #111; color: #eee; padding: 20px; }}
-            h1 {{ color: #1db954; }}
-            table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
-            th, td {{ padding: 10px; border: 1px solid #444; text-align: center; }}
-            th {{ background-color: #222; }}
-            .highlight {{ color: #1ed760; font-weight: bold; }}
-        </style>
-    </head>
-    <body>
-        <h1>📊 CryptoFuturesML — Daily Summary ({today})</h1>
-        <p>🧠 Model Version: <span class="highlight">{model_version}</span></p>
-        <p>💰 Portfolio Balance: <span class="highlight">${last_balance:.2f}</span></p>
-
-        <h2>📅 Today</h2>
-        <table>
-            <tr><th>Trades</th><th>Avg PnL (%)</th><th>Win Rate (%)</th></tr>
-            <tr><td>{today_stats['count']}</td><td>{today_stats['avg_pnl']}</td><td>{today_stats['win_rate']}</td></tr>
-        </table>
 
-        <h2>📆 Last 7 Days</h2>
+# === Equity from the rollups ===
+def _equity_series(daily, first, last):
+    # End-of-day balance for every calendar day first..last (carried over days without trades)
+    # and the drawdown from the running peak
+    balances = {day: bucket["last_balance"] for day, bucket in daily if bucket["last_balance"] is not None}
+    equity, drawdown = [], []
+    value, peak = None, None
+    for offset in range((last - first).days + 1):
+        value = balances.get((first + timedelta(days=offset)).isoformat(), value)
+        current = value if value is not None else DEFAULT_BALANCE
+        peak = current if peak is None else max(peak, current)
+        equity.append(current)
+        drawdown.append((current / peak - 1) * 100)
+    return equity, drawdown
+
+def _svg_chart(values, color, fill=False):
+    # Inline polyline: no image files or plotting library per report
+    if len(values) < 2:
+        return '<p class="muted">Not enough data for a chart yet.</p>'
+    width, height, pad = 600, 160, 4
+    lo, hi = min(values), max(values)
+    span = (hi - lo) or 1.0
+    step = width / (len(values) - 1)
+    points = " ".join(f"{i * step:.1f},{pad + (hi - v) / span * (height - 2 * pad):.1f}" for i, v in enumerate(values))
+    if fill:
+        shape = f'<polygon points="{points} {width},{pad} 0,{pad}" fill="{color}" fill-opacity="0.35" stroke="{color}"/>'
+    else:
+        shape = f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2"/>'
+    return (f'<svg viewBox="0 0 {width} {height}" preserveAspectRatio="none">{shape}</svg>'
+            f'<p class="muted">min {lo:,.2f} · max {hi:,.2f}</p>')
+
+
+# === Pages ===
+def _stats_table(stats):
+    return f"""
         <table>
-            <tr><th>Trades</th><th>Avg PnL (%)</th><th>Win Rate (%)</th></tr>
-            <tr><td>{week_stats['count']}</td><td>{week_stats['avg_pnl']}</td><td>{week_stats['win_rate']}</td></tr>
-        </table>
+            <tr><th>Trades</th><th>Win Rate (%)</th><th>Avg PnL (%)</th><th>Total PnL (%)</th><th>PnL σ (%)</th><th>Avg Win / Loss (%)</th></tr>
+            <tr><td>{stats['trades']}</td><td>{stats['win_rate']:.2f}</td><td>{stats['avg_pnl']:.2f}</td><td>{stats['total_pnl']:.2f}</td><td>{stats['std_pnl']:.2f}</td><td>{stats['avg_win']:.2f} / {stats['avg_loss']:.2f}</td></tr>
+        </table>"""
+
+def _page(title, body, css_path):
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{title} - CryptoFuturesML</title>
+    <link rel="stylesheet" href="{css_path}">
+</head>
+<body>
+{body}
+    <p style="margin-top:40px;" class="muted">Generated on {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")}</p>
+</body>
+</html>
+"""
+
+def _render_report(period, key, data):
+    start, end = data["bounds"]
+    span = key if start == end else f"{key} ({start} → {end})"
+    body = f"""
+    <p><a href="../index.html">← All reports</a></p>
+    <h1>📊 CryptoFuturesML — {period.capitalize()} Report {span}</h1>
+    <p>🧠 Model Version: <span class="highlight">{html.escape(data['model_version'])}</span></p>
+    <p>💰 Balance at period end: <span class="highlight">${data['balance']:,.2f}</span>
+       · 🔻 Max drawdown in period (daily closes): <span class="highlight">{data['max_drawdown']:.2f}%</span></p>
+    {_stats_table(data['stats'])}
+    <h2>📈 Equity (last {len(data['equity'])} days)</h2>
+    {_svg_chart(data['equity'], "#1db954")}
+    <h2>🔻 Drawdown (%)</h2>
+    {_svg_chart(data['drawdown'], "#e0464e", fill=True)}"""
+    return _page(f"{period.capitalize()} Report {key}", body, "../" + ASSET_FILE)
+
+def _render_index(entries, equity, drawdown, model_version, balance):
+    sections = []
+    for period in ("monthly", "weekly", "daily"):
+        if period not in entries:
+            continue
+        rows = "".join(
+            f'<tr><td><a href="{path}">{key}</a></td><td>{s["trades"]}</td><td>{s["win_rate"]:.2f}</td>'
+            f'<td>{s["avg_pnl"]:.2f}</td><td>{s["total_pnl"]:.2f}</td></tr>'
+            for key, path, s in reversed(entries[period]))
+        sections.append(f"""
+    <h2>{period.capitalize()}</h2>
+    <table>
+        <tr><th>Period</th><th>Trades</th><th>Win Rate (%)</th><th>Avg PnL (%)</th><th>Total PnL (%)</th></tr>{rows}
+    </table>""")
+    body = f"""
+    <h1>📊 CryptoFuturesML — Reports</h1>
+    <p>🧠 Model Version: <span class="highlight">{html.escape(model_version)}</span></p>
+    <p>💰 Portfolio Balance: <span class="highlight">${balance:,.2f}</span></p>
+    <h2>📈 Equity (all time)</h2>
+    {_svg_chart(equity, "#1db954")}
+    <h2>🔻 Drawdown (%)</h2>
+    {_svg_chart(drawdown, "#e0464e", fill=True)}
+    {"".join(sections)}"""
+    return _page("Reports", body, ASSET_FILE)
+
+
+# === Files ===
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
 
-        <p style="margin-top:40px; color:#777;">Generated on {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")}</p>
-    </body>
-    </html>
+def _load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _model_version():
+    # Only the tail of the retrain log is read, however long it grows
+    line = read_last_line(RETRAIN_LOG, contains="Saved:")
+    return line.split("Saved:")[-1].strip() if line else "N/A"
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps([TEMPLATE_VERSION, *parts], default=str).encode()).hexdigest()
+
+
+# === Generation ===
+def generate_reports(periods=PERIODS, force=False, today=None, root=REPORTS_DIR):
     """
+    Every daily / weekly / monthly report plus reports/index.html, in one pass over the
+    aggregate cache's per-day buckets. A report is rewritten only when the data it shows
+    changed (or `force`); past periods keep the model version they were generated with.
+    """
+    start_time = time.perf_counter()
+    daily = get_aggregate_cache().daily_trades()
+    today = today or datetime.utcnow().date()
+    model_version = _model_version()
+
+    # Single pass: each day's bucket lands in its day, ISO week and month
+    groups = {period: {} for period in periods}
+    for day, bucket in daily:
+        d = date.fromisoformat(day)
+        for period in periods:
+            groups[period].setdefault(period_key(d, period), []).append(bucket)
+    for period in periods:
+        groups[period].setdefault(period_key(today, period), [])   # The current period always has a page
+
+    first = min(date.fromisoformat(daily[0][0]), today) if daily else today
+    equity, drawdown = _equity_series(daily, first, today)
+    manifest = _load_manifest(root)
+    entries = {period: [] for period in periods}
+    written = skipped = 0
+
+    for period in periods:
+        for key, buckets in sorted(groups[period].items()):
+            start, end = period_bounds(key, period)
+            last = (min(end, today) - first).days + 1           # Series index just past the period's last day
+            window = slice(max(0, last - CHART_DAYS[period]), last)
+            in_period = drawdown[max(0, (start - first).days):last]
+            current = start <= today <= end
+            data = {
+                "bounds": (start, end),
+                "stats": summarize_buckets(buckets),
+                "balance": equity[last - 1] if last > 0 else DEFAULT_BALANCE,
+                "max_drawdown": min(in_period) if in_period else 0.0,
+                "equity": equity[window],
+                "drawdown": drawdown[window],
+                "model_version": model_version,
+            }
+            rel_path = f"{period}/{key}.html"
+            entries[period].append((key, rel_path, data["stats"]))
 
-    report_file = reports_path / f"daily_report_{today}.html"
-    report_file.write_text(html_content)
+            digest = _digest(period, key, {k: v for k, v in data.items() if k != "model_version"},
+                             model_version if current else None)
+            path = os.path.join(root, rel_path)
+            if not force and manifest.get(rel_path) == digest and os.path.exists(path):
+                skipped += 1
+                continue
+            _write(path, _render_report(period, key, data))
+            manifest[rel_path] = digest
+            written += 1
+
+    css_path = os.path.join(root, ASSET_FILE)
+    if not os.path.exists(css_path) or manifest.get(ASSET_FILE) != _digest(CSS):
+        _write(css_path, CSS)
+        manifest[ASSET_FILE] = _digest(CSS)
+    index_path = os.path.join(root, "index.html")
+    _write(index_path, _render_index(entries, equity, drawdown, model_version,
+                                     equity[-1] if daily else DEFAULT_BALANCE))
+    _write(os.path.join(root, MANIFEST_FILE), json.dumps(manifest, indent=1))
+
+    print(f"✅ Reports: {written} written, {skipped} unchanged in {time.perf_counter() - start_time:.2f}s → {index_path}")
+    return {"written": written, "skipped": skipped, "index": index_path}
+
+def generate_daily_report():
+    """Scheduled job: bring every report up to date and return today's daily report."""
+    generate_reports()
+    report_file = os.path.join(REPORTS_DIR, "daily", f"{period_key(datetime.utcnow().date(), 'daily')}.html")
     print(f"✅ Report generated: {report_file}")
     return report_file
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate daily / weekly / monthly HTML reports")
+    parser.add_argument("--periods", default=",".join(PERIODS), help="Comma-separated subset of daily,weekly,monthly")
+    parser.add_argument("--force", action="store_true", help="Rewrite every report, changed or not")
+    args = parser.parse_args()
+
+    try:
+        generate_reports(tuple(p for p in args.periods.split(",") if p), force=args.force)
+    except Exception as e:
+        print(f"❌ Report generation failed: {e}")
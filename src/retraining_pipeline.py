@@ -1,14 +1,17 @@
 # src/retraining_pipeline.py
 
-from src.market_data_collector import fetch_ohlcv
-from src.sentiment_pipeline import fetch_twitter_sentiment
-from src.feature_engineering import add_technical_indicators, merge_sentiment
+from src.feature_store import get_feature_store
 from src.model_trainer import prepare_data, train_lstm_model, save_model
-from src.mlflow_logger import start_experiment_run, log_params_and_metrics, log_artifacts
+from src.mlflow_logger import start_experiment_run, log_params_and_metrics, log_artifacts, MlflowEpochLogger
+from src.drift_monitor import get_drift_monitor
+from src import metrics
 from datetime import datetime
 import os
 import subprocess
 
+TRAINING_ROWS = 1000         # Most recent stored candles used for each retrain
+
+@metrics.timed("retrain.total")
 def retrain_pipeline(versioned=False):
     print("🚨 DEBUG: This is the correct retraining_pipeline.py being executed.")
 
@@ -26,24 +29,22 @@ def retrain_pipeline(versioned=False):
         print(sync_status)
 
     try:
-        print("📅 Fetching fresh market data...")
-        df = fetch_ohlcv("BTC/USDT", timeframe="5m", limit=1000)
-
-        print("💬 Fetching latest sentiment data...")
-        sentiment_scores = fetch_twitter_sentiment()
-
-        print("🔪 Engineering features...")
-        df = add_technical_indicators(df)
-        df = merge_sentiment(df, sentiment_scores)
+        # Sentiment comes from the store the daemon's collector fills; retraining only reads it.
+        # Only candles newer than the feature store's last row are fetched and engineered
+        print("📅 Updating feature store with fresh market data...")
+        store = get_feature_store()
+        with metrics.span("retrain.fetch_ohlcv"):
+            added = store.catch_up(limit=TRAINING_ROWS)
+        print(f"🔪 {added} new feature rows materialized.")
+        with metrics.span("retrain.read_features"):
+            df = store.tail(TRAINING_ROWS)
 
         print("🧠 Preparing data for training...")
         features = ['rsi_14', 'ema_21', 'macd', 'sentiment']
         target_col = 'close'
         window_size = 10
-        X, y, scaler = prepare_data(df, feature_cols=features, target_col=target_col, window_size=window_size)
-
-        print("🎯 Training LSTM model...")
-        model = train_lstm_model(X, y)  # ✅ Only one object returned
+        with metrics.span("retrain.prepare_data"):
+            X, y, scaler = prepare_data(df, feature_cols=features, target_col=target_col, window_size=window_size)
 
         # ✅ Set save paths
         if versioned:
@@ -54,33 +55,46 @@ def retrain_pipeline(versioned=False):
             model_path = "models/lstm_model.keras"
             scaler_path = "models/scaler.save"
 
-        # 🧹 Remove legacy .h5 model if it exists
-        legacy_path = "models/lstm_model.h5"
-        if os.path.exists(legacy_path):
-            os.remove(legacy_path)
-            print("🧹 Removed old HDF5 model: models/lstm_model.h5")
-
-        print(f"💾 Saving model and scaler to: {model_path}")
-        save_model(model, scaler, model_path, scaler_path)
-
-        with open("models/model_latest_path.txt", "w") as f:
-            f.write(model_path)
-
+        # 📈 The MLflow run spans training so the per-epoch curves land in it
         with start_experiment_run(run_name="LSTM_Retrain"):
-            log_params_and_metrics(
-                params={
-                    "model_type": "LSTM",
-                    "versioned": versioned,
-                    "features": ",".join(features),
-                    "rows": len(df),
-                    "window_size": window_size
-                },
-                metrics={
-                    "train_loss": model.history.history['loss'][-1],
-                    "train_accuracy": model.history.history['accuracy'][-1]
-                }
-            )
-            log_artifacts(model_path, scaler_path)
+            log_params_and_metrics(params={
+                "model_type": "LSTM",
+                "versioned": versioned,
+                "features": ",".join(features),
+                "rows": len(df),
+                "window_size": window_size
+            })
+
+            print("🎯 Training LSTM model...")
+            with metrics.span("retrain.train"):
+                model = train_lstm_model(X, y, callbacks=[MlflowEpochLogger()])
+
+            # 🧹 Remove legacy .h5 model if it exists
+            legacy_path = "models/lstm_model.h5"
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+                print("🧹 Removed old HDF5 model: models/lstm_model.h5")
+
+            print(f"💾 Saving model and scaler to: {model_path}")
+            with metrics.span("retrain.save"):
+                save_model(model, scaler, model_path, scaler_path)
+
+            with open("models/model_latest_path.txt", "w") as f:
+                f.write(model_path)
+
+            # 🌊 Re-seed the drift reference with the data this model was trained on
+            reference = df[features].dropna().to_dict("list")
+            reference["confidence"] = model.predict(X, verbose=0)[:, 0]
+            get_drift_monitor().reset_reference(reference)
+
+            # Final metrics in one batch; artifacts are hashed and copied on a background thread
+            with metrics.span("retrain.mlflow"):
+                history = model.history.history
+                log_params_and_metrics(metrics={
+                    "train_loss": history['loss'][-1],
+                    "train_accuracy": history['accuracy'][-1]
+                }, step=len(history['loss']) - 1)
+                log_artifacts(model_path, scaler_path)
 
         success_msg = (f"[{timestamp}] ✅ Retraining complete | "
                        f"Rows: {len(df)} | Features: {features} | "
@@ -0,0 +1,359 @@
+# src/sentiment_collector.py — Background tweet collector with since_id paging, id dedupe and a TTL score cache
+#
+#   python -m src.sentiment_collector --fake   → exercise the collector against a local fake search API
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import requests
+
+from src.config import TWITTER_API_URL, TWITTER_BEARER_TOKEN
+from src.sentiment_pipeline import USE_MOCK_SENTIMENT, score_texts
+from src.sentiment_store import get_sentiment_store
+from src import metrics
+
+STATE_PATH = "logs/sentiment_collector_state.json"
+DEFAULT_QUERY = "bitcoin OR BTC"
+POLL_INTERVAL = 60           # Seconds between searches (recent search allows 450 app requests / 15 min)
+MAX_RESULTS = 100            # Tweets per page (API maximum)
+MAX_PAGES = 5                # Pages followed per poll; older tweets are read by the next polls (backlog cursor)
+SCORE_TTL = 6 * 3600         # Scored tweets are cached (and deduped) this long
+PUBLISH_WINDOW = 3600        # Published aggregate = mean score of tweets created in the last hour
+MAX_BACKOFF = 900            # Cap for retry backoff after failed polls
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"rate limited, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class SentimentCollector:
+    """
+    Polls Twitter recent search on its own thread and publishes the latest sentiment aggregate.
+
+    Each poll only asks for tweets newer than `since_id` (following next_token pages), skips
+    tweet ids already scored, records new scores in the sentiment store and swaps in a fresh
+    `latest()` dict, so the prediction path never waits on the network or the scorer.
+    """
+
+    def __init__(self, query=DEFAULT_QUERY, api_url=TWITTER_API_URL, bearer_token=TWITTER_BEARER_TOKEN,
+                 state_path=STATE_PATH, poll_interval=POLL_INTERVAL, mock=USE_MOCK_SENTIMENT,
+                 scorer=score_texts, store=None):
+        self.query = query
+        self.api_url = api_url.rstrip("/")
+        self.bearer_token = bearer_token
+        self.state_path = state_path
+        self.poll_interval = poll_interval
+        self.mock = mock
+        self.scorer = scorer
+        self.store = store or get_sentiment_store()
+
+        self.since_id = None
+        self.backlog = None              # {"newest", "until_id"} while a burst is still being paged through
+        self._scored = OrderedDict()     # tweet id -> (created epoch, score, cached epoch)
+        self._latest = {"score": 0.0, "count": 0, "updated": None}
+        self._session = None
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._load_state()
+
+    # === Public API ===
+    def latest(self):
+        """Most recent published aggregate {"score", "count", "updated"} — a plain read, no I/O."""
+        return self._latest
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sentiment-collector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def poll_once(self):
+        """One search round. Returns the number of newly scored tweets."""
+        with self._poll_lock:
+            if self.mock:
+                # Neutral, timestamped score per poll so mock runs still build a sentiment series
+                tweets = [{"id": f"mock-{time.time_ns()}", "text": "",
+                           "created_at": datetime.now(timezone.utc).isoformat()}]
+            else:
+                tweets = self._search()
+
+            fresh = [t for t in tweets if t["id"] not in self._scored]
+            if len(tweets) > len(fresh):
+                metrics.inc("sentiment_tweets_total", len(tweets) - len(fresh), result="duplicate")
+
+            if fresh:
+                scores = [0.0] * len(fresh) if self.mock else self.scorer([t["text"] for t in fresh])
+                now = time.time()
+                entries = []
+                for tweet, score in zip(fresh, scores):
+                    created = _parse_time(tweet.get("created_at"))
+                    self._scored[tweet["id"]] = (created.timestamp(), float(score), now)
+                    entries.append({"timestamp": created, "score": float(score)})
+                self.store.add(entries)
+                metrics.inc("sentiment_tweets_total", len(fresh), result="scored")
+
+            self._expire()
+            self._publish()
+            self._save_state()
+            return len(fresh)
+
+    # === Worker ===
+    def _run(self):
+        backoff = self.poll_interval
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                backoff = delay = self.poll_interval
+            except RateLimited as e:
+                delay = max(e.retry_after, self.poll_interval)
+                print(f"⏳ Twitter search {e}.")
+            except Exception as e:
+                backoff = delay = min(backoff * 2, MAX_BACKOFF)
+                print(f"❌ Sentiment poll failed: {e} (retrying in {delay:.0f}s)")
+            self._stop.wait(delay)
+
+    def _search(self):
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers["Authorization"] = f"Bearer {self.bearer_token}"
+
+        # A burst larger than MAX_PAGES is read over several polls: the cursor keeps the burst's newest
+        # id and resumes below the oldest tweet read so far, and since_id only moves once it is drained
+        backlog = self.backlog or {}
+        newest, until_id = backlog.get("newest"), backlog.get("until_id")
+        tweets, oldest, next_token = [], until_id, None
+        for _ in range(MAX_PAGES):
+            params = {"query": self.query, "max_results": MAX_RESULTS, "tweet.fields": "created_at"}
+            if self.since_id:
+                params["since_id"] = self.since_id
+            if until_id:
+                params["until_id"] = until_id
+            if next_token:
+                params["next_token"] = next_token
+
+            response = self._session.get(f"{self.api_url}/tweets/search/recent", params=params, timeout=10)
+            metrics.inc("twitter_requests_total", status=str(response.status_code))
+            if response.status_code == 429:
+                reset = float(response.headers.get("x-rate-limit-reset", 0))
+                raise RateLimited(max(reset - time.time(), 0))
+            response.raise_for_status()
+
+            body = response.json()
+            meta = body.get("meta", {})
+            newest = newest or meta.get("newest_id")   # First page holds the newest tweet
+            tweets.extend(body.get("data", []))
+            oldest = meta.get("oldest_id", oldest)
+            next_token = meta.get("next_token")
+            if not next_token:
+                break
+
+        # Only move the cursor once every page was read, so a failed poll is retried from the same point
+        if next_token:
+            self.backlog = {"newest": newest, "until_id": oldest}
+        else:
+            self.backlog = None
+            if newest:
+                self.since_id = newest
+        return tweets
+
+    # === Cache + aggregate ===
+    def _expire(self):
+        cutoff = time.time() - SCORE_TTL
+        while self._scored:
+            tweet_id, (_, _, cached_at) = next(iter(self._scored.items()))
+            if cached_at >= cutoff:
+                break
+            del self._scored[tweet_id]
+
+    def _publish(self):
+        cutoff = time.time() - PUBLISH_WINDOW
+        recent = [score for created, score, _ in self._scored.values() if created >= cutoff]
+        self._latest = {
+            "score": round(sum(recent) / len(recent), 4) if recent else 0.0,
+            "count": len(recent),
+            "updated": datetime.utcnow().isoformat(timespec="seconds"),
+        }
+
+    # === Persistence ===
+    def _save_state(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"since_id": self.since_id, "backlog": self.backlog, "latest": self._latest}, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"⚠️ Could not save sentiment collector state: {e}")
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            self.since_id = state.get("since_id")
+            self.backlog = state.get("backlog")
+            self._latest = state.get("latest") or self._latest
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load sentiment collector state: {e}")
+
+
+def _parse_time(value):
+    if not value:
+        return datetime.now(timezone.utc)
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+def get_sentiment_collector():
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = SentimentCollector()
+        return _collector
+
+
+# === Fake Twitter recent-search API for local checks ===
+def run_fake_checks():
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+    from src.sentiment_store import SentimentStore
+
+    tweets = []              # Newest last; ids are increasing integers as strings
+    requests_seen = []
+    throttle = {"next": 0}
+
+    def add_tweets(n):
+        for _ in range(n):
+            tweet_id = str(1_000_000 + len(tweets))
+            tweets.append({"id": tweet_id, "text": f"btc tweet {tweet_id}",
+                           "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")})
+
+    class FakeTwitterAPI(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            requests_seen.append(params)
+            if url.path != "/2/tweets/search/recent":
+                return self._reply(404, {"title": "Not Found"})
+            if throttle["next"] > 0:
+                throttle["next"] -= 1
+                return self._reply(429, {"title": "Too Many Requests"}, {"x-rate-limit-reset": str(int(time.time()) + 1)})
+
+            since = int(params.get("since_id", 0))
+            until = int(params.get("until_id", 0)) or float("inf")
+            matching = [t for t in reversed(tweets) if since < int(t["id"]) < until]   # Newest first
+            offset = int(params.get("next_token", 0))
+            size = int(params.get("max_results", 10))
+            page = matching[offset:offset + size]
+            meta = {"result_count": len(page)}
+            if page:
+                meta["newest_id"], meta["oldest_id"] = matching[0]["id"], page[-1]["id"]
+            if offset + size < len(matching):
+                meta["next_token"] = str(offset + size)
+            self._reply(200, {"data": page, "meta": meta} if page else {"meta": meta})
+
+        def _reply(self, status, data, headers=None):
+            raw = json.dumps(data).encode()
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTwitterAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    workdir = tempfile.mkdtemp()
+    scored_texts = []
+
+    def fake_scorer(texts):
+        scored_texts.extend(texts)
+        return [0.5] * len(texts)
+
+    collector = SentimentCollector(api_url=f"http://127.0.0.1:{server.server_port}/2", bearer_token="FAKE",
+                                   state_path=os.path.join(workdir, "state.json"), mock=False,
+                                   scorer=fake_scorer, store=SentimentStore(root=workdir))
+
+    # 1️⃣ First poll follows next_token pages
+    add_tweets(250)
+    assert collector.poll_once() == 250
+    assert len(requests_seen) == 3 and collector.since_id == tweets[-1]["id"], requests_seen
+    print("✅ First poll paged through 250 tweets in 3 requests.")
+
+    # 2️⃣ Later polls ask only for newer tweets and never re-score
+    add_tweets(7)
+    assert collector.poll_once() == 7
+    assert requests_seen[-1]["since_id"] == tweets[-8]["id"]
+    assert len(scored_texts) == 257 and len(set(scored_texts)) == 257
+    collector.since_id = tweets[-3]["id"]      # Simulate an overlapping page
+    assert collector.poll_once() == 0
+    print("✅ since_id paging + tweet-id dedupe (overlap re-scored nothing).")
+
+    # 3️⃣ Published aggregate and sentiment store are fed
+    latest = collector.latest()
+    assert latest["count"] == 257 and latest["score"] == 0.5, latest
+    assert collector.store.buckets()["count"].sum() == 257
+    start = time.perf_counter()
+    for _ in range(100_000):
+        collector.latest()
+    per_read = (time.perf_counter() - start) / 100_000 * 1e6
+    print(f"✅ latest() = {latest['score']} over {latest['count']} tweets, {per_read:.2f}µs per read.")
+
+    # 4️⃣ 429 surfaces as RateLimited without moving since_id
+    since = collector.since_id
+    throttle["next"] = 1
+    try:
+        collector.poll_once()
+        raise AssertionError("expected RateLimited")
+    except RateLimited:
+        assert collector.since_id == since
+    print("✅ Rate limit surfaced, since_id kept.")
+
+    # 5️⃣ since_id survives a restart
+    restarted = SentimentCollector(api_url=collector.api_url, bearer_token="FAKE", state_path=collector.state_path,
+                                   mock=False, scorer=fake_scorer, store=collector.store)
+    assert restarted.since_id == collector.since_id and restarted.latest()["count"] == 257
+    print("✅ since_id and latest aggregate restored after restart.")
+
+    # 6️⃣ A burst over MAX_PAGES pages is drained by the next polls instead of skipped
+    since = collector.since_id
+    add_tweets(MAX_PAGES * MAX_RESULTS + 30)
+    assert collector.poll_once() == MAX_PAGES * MAX_RESULTS
+    assert collector.since_id == since and collector.backlog["newest"] == tweets[-1]["id"], collector.backlog
+    add_tweets(4)                              # Arrive while the burst is still being read
+    assert collector.poll_once() == 30 and collector.backlog is None
+    assert collector.since_id == tweets[-5]["id"]
+    assert collector.poll_once() == 4
+    assert len(scored_texts) == len(tweets) and len(set(scored_texts)) == len(tweets)
+    print(f"✅ Burst of {MAX_PAGES * MAX_RESULTS + 30} tweets drained over 2 polls, nothing skipped.")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    import sys
+    if "--fake" in sys.argv:
+        run_fake_checks()
+    else:
+        collector = get_sentiment_collector()
+        print(f"📥 {collector.poll_once()} new tweets scored. Latest: {collector.latest()}")
@@ -1,31 +1,41 @@
 # src/sentiment_pipeline.py
 
-import tweepy
-from textblob import TextBlob
+from datetime import datetime
 from src.config import TWITTER_BEARER_TOKEN
+from src.sentiment_store import get_sentiment_store
 from src.utils import retry
 
 # ✅ Toggle this ON/OFF to use real or fallback sentiment
 USE_MOCK_SENTIMENT = True  # 🔁 Set to False in real production with a paid API plan
 
+# 🧮 Polarity in [-1, 1] for each text (scorer picked by SENTIMENT_SCORER, batched + cached)
+def score_texts(texts):
+    from src.sentiment_scoring import get_scoring_engine
+    return get_scoring_engine().score(texts)
+
+# One-off synchronous search (the live path reads the background collector instead)
 @retry(max_attempts=3, delay=2, backoff=2)
 def fetch_twitter_sentiment(query="bitcoin OR BTC", max_results=10):
     if USE_MOCK_SENTIMENT:
         print("⚠️ Twitter sentiment skipped — using fallback neutral sentiment.")
-        return [{"timestamp": "mock", "score": 0.0}]
+        # Timestamped like real scores so the mock series flows through the sentiment store too
+        return [{"timestamp": datetime.utcnow(), "score": 0.0}]
 
     try:
+        import tweepy
         client = tweepy.Client(bearer_token=TWITTER_BEARER_TOKEN)
-        response = client.search_recent_tweets(query=query, max_results=max_results)
+        response = client.search_recent_tweets(query=query, max_results=max_results,
+                                               tweet_fields=["created_at"])
         sentiments = []
 
         if response.data:
-            for tweet in response.data:
-                score = TextBlob(tweet.text).sentiment.polarity
+            scores = score_texts([tweet.text for tweet in response.data])
+            for tweet, score in zip(response.data, scores):
                 sentiments.append({
+                    "id": tweet.id,
                     "text": tweet.text,
                     "score": score,
-                    "timestamp": tweet.id
+                    "timestamp": tweet.created_at or datetime.utcnow()
                 })
 
         return sentiments if sentiments else [{"timestamp": "empty", "score": 0.0}]
@@ -34,3 +44,10 @@ def fetch_twitter_sentiment(query="bitcoin OR BTC", max_results=10):
         print(f"❌ Twitter API error: {e}")
         return [{"timestamp": "fallback", "score": 0.0}]
 
+# 🗃️ Make sure tweets are being collected into the sentiment store; returns the latest aggregate.
+# Costs a dict read — polling, dedupe and scoring happen on the collector's own thread.
+def collect_sentiment():
+    from src.sentiment_collector import get_sentiment_collector
+    collector = get_sentiment_collector()
+    collector.start()
+    return collector.latest()
@@ -0,0 +1,162 @@
+# src/sentiment_scoring.py — Batched, pooled sentiment scoring over pluggable scorers
+
+import abc
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from src.config import SENTIMENT_SCORER
+from src import metrics
+
+BATCH_SIZE = 64              # Texts per task sent to a worker
+CACHE_SIZE = 100_000         # Scored texts remembered (by hash) per engine
+POOL_MIN_TEXTS = 256         # Below this, scoring in-process beats pool overhead
+TRANSFORMER_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+
+
+# === Scorers: every one maps a batch of texts to polarity in [-1, 1] ===
+class Scorer(abc.ABC):
+    name = "base"
+    pooled = True            # Cheap to load in every worker process
+
+    @abc.abstractmethod
+    def score_batch(self, texts):
+        """Polarity in [-1, 1] for each text, in order."""
+
+
+class TextBlobScorer(Scorer):
+    name = "textblob"
+
+    def __init__(self):
+        from textblob import TextBlob
+        self._blob = TextBlob
+
+    def score_batch(self, texts):
+        return [self._blob(text).sentiment.polarity for text in texts]
+
+
+class VaderScorer(Scorer):
+    name = "vader"
+
+    def __init__(self):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        self._analyzer = SentimentIntensityAnalyzer()
+
+    def score_batch(self, texts):
+        return [self._analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+class TransformerScorer(Scorer):
+    name = "transformer"
+    pooled = False           # One model copy; torch already spreads a batch over CPU threads
+
+    def __init__(self, model=TRANSFORMER_MODEL):
+        from transformers import pipeline
+        self._pipe = pipeline("sentiment-analysis", model=model, device=-1, truncation=True)
+
+    def score_batch(self, texts):
+        results = self._pipe(list(texts), batch_size=BATCH_SIZE)
+        sign = {"positive": 1.0, "negative": -1.0}
+        return [sign.get(r["label"].lower(), 0.0) * r["score"] for r in results]
+
+
+SCORERS = {cls.name: cls for cls in (TextBlobScorer, VaderScorer, TransformerScorer)}
+
+
+# === Worker-process side ===
+_worker_scorer = None
+
+def _init_worker(name):
+    global _worker_scorer
+    _worker_scorer = SCORERS[name]()
+
+def _score_in_worker(texts):
+    return _worker_scorer.score_batch(texts)
+
+
+class ScoringEngine:
+    """
+    Scores texts with one scorer: repeated texts come from a hash-keyed LRU cache, new ones are
+    split into batches and, for large enough jobs, spread over a persistent process pool.
+    """
+
+    def __init__(self, scorer=SENTIMENT_SCORER, workers=None, batch_size=BATCH_SIZE):
+        if scorer not in SCORERS:
+            raise ValueError(f"❌ Unknown sentiment scorer: {scorer} (choose from {', '.join(SCORERS)})")
+        self.scorer_name = scorer
+        self.batch_size = batch_size
+        # Scorers that aren't pooled keep one in-process model whatever `workers` asks for
+        self.workers = (workers or max(1, (os.cpu_count() or 2) - 1)) if SCORERS[scorer].pooled else 1
+
+        self._scorer = None
+        self._pool = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text):
+        return hashlib.sha1(text.encode("utf-8")).digest()
+
+    def score(self, texts):
+        texts = list(texts)
+        keys = [self._key(text) for text in texts]
+
+        with self._lock:
+            known, missing = {}, {}
+            for key, text in zip(keys, texts):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    known[key] = self._cache[key]
+                elif key not in missing:
+                    missing[key] = text
+        metrics.inc("sentiment_score_cache_total", len(texts) - len(missing), result="hit", scorer=self.scorer_name)
+        metrics.inc("sentiment_score_cache_total", len(missing), result="miss", scorer=self.scorer_name)
+
+        if missing:
+            with metrics.span(f"sentiment.score.{self.scorer_name}"):
+                scores = self._score_uncached(list(missing.values()))
+            fresh = {key: float(score) for key, score in zip(missing, scores)}
+            known.update(fresh)
+            with self._lock:
+                self._cache.update(fresh)
+                while len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        return [known[key] for key in keys]
+
+    def _score_uncached(self, texts):
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.workers > 1 and len(texts) >= POOL_MIN_TEXTS:
+            if self._pool is None:
+                # Spawned, not forked: the engine lives in threaded processes (API, daemon), and a
+                # forked child could inherit a lock some other thread was holding
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.scorer_name,),
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            results = self._pool.map(_score_in_worker, batches)
+        else:
+            if self._scorer is None:
+                self._scorer = SCORERS[self.scorer_name]()
+            results = map(self._scorer.score_batch, batches)
+        return [score for batch in results for score in batch]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_scoring_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ScoringEngine()
+            atexit.register(_engine.close)
+        return _engine
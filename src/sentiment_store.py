@@ -0,0 +1,152 @@
+# src/sentiment_store.py — Timestamped sentiment in per-minute buckets, attached to candles by as-of join
+
+import glob
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+
+SENTIMENT_DIR = "data/sentiment"
+BUCKET = pd.Timedelta(minutes=1)     # Storage granularity (any candle timeframe can be joined)
+WINDOW = pd.Timedelta(hours=1)       # A candle's sentiment = mean score over this window up to its close
+MAX_PARTS = 64                       # Append parts are compacted into one file beyond this
+AGG_COLUMNS = ["count", "sum", "sumsq"]
+
+
+def _aggregate(frames):
+    """Merge partial bucket aggregates (counts and sums are additive, so parts just add up)."""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame({"bucket": pd.Series(dtype="datetime64[ns]"),
+                             **{col: pd.Series(dtype=float) for col in AGG_COLUMNS}})
+    df = pd.concat(frames, ignore_index=True)
+    df["bucket"] = df["bucket"].astype("datetime64[ns]")
+    return df.groupby("bucket", as_index=False)[AGG_COLUMNS].sum()
+
+
+class SentimentStore:
+    """
+    Append-only store of sentiment scores aggregated into per-minute buckets
+    (count, sum, sum of squares) as Parquet parts under data/sentiment/<source>/.
+
+    `asof` attaches to each candle the mean score of the WINDOW ending at the candle's close,
+    using only scores already known then, via cumulative sums and a sorted search.
+    """
+
+    def __init__(self, source="twitter", root=SENTIMENT_DIR):
+        self.source = source
+        self.path = os.path.join(root, source)
+        self._lock = threading.Lock()
+        self._buckets = None
+        self._parts_seen = None
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def _write_part(self, df, name=None):
+        os.makedirs(self.path, exist_ok=True)
+        part_path = name or os.path.join(self.path, f"part-{time.time_ns()}.parquet")
+        tmp_path = part_path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, part_path)
+
+    def buckets(self):
+        """All buckets, re-read only when the set of parts changed (e.g. another process appended)."""
+        with self._lock:
+            parts = self._parts()
+            if self._buckets is None or parts != self._parts_seen:
+                self._buckets = _aggregate([pd.read_parquet(p) for p in parts])
+                self._parts_seen = parts
+            return self._buckets
+
+    # === Writes ===
+    def add(self, scores):
+        """
+        Record [{"timestamp": datetime, "score": float}, ...]. Entries without a real
+        timestamp (API error/empty placeholders) are not observations and are skipped.
+        """
+        rows = []
+        for entry in scores:
+            ts = entry.get("timestamp")
+            if not isinstance(ts, datetime):
+                continue
+            ts = pd.Timestamp(ts)
+            rows.append((ts.tz_convert(None) if ts.tzinfo else ts, float(entry["score"])))
+        if not rows:
+            return 0
+
+        df = pd.DataFrame(rows, columns=["timestamp", "score"])
+        partial = pd.DataFrame({
+            "bucket": df["timestamp"].dt.floor(BUCKET).astype("datetime64[ns]"),
+            "count": 1.0,
+            "sum": df["score"],
+            "sumsq": df["score"] ** 2,
+        }).groupby("bucket", as_index=False).sum()
+
+        buckets = self.buckets()
+        with self._lock:
+            self._write_part(partial)
+            self._buckets = _aggregate([buckets, partial])
+            parts = self._parts()
+            if len(parts) > MAX_PARTS:
+                self._write_part(self._buckets, name=parts[-1])
+                for part in parts[:-1]:
+                    os.remove(part)
+                parts = parts[-1:]
+            self._parts_seen = parts
+        metrics.inc("sentiment_scores_total", len(rows), source=self.source)
+        return len(rows)
+
+    # === Reads ===
+    def asof(self, timestamps, step):
+        """
+        Sentiment for candles opening at `timestamps` with duration `step`: mean score over the
+        WINDOW ending at each candle's close, from buckets closed by then (0 where no scores).
+        """
+        buckets = self.buckets()
+        opens = pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype="datetime64[ns]")
+        if buckets.empty:
+            return np.zeros(len(opens))
+
+        starts = buckets["bucket"].to_numpy(dtype="datetime64[ns]")
+        cum_count = np.concatenate([[0.0], np.cumsum(buckets["count"].to_numpy())])
+        cum_sum = np.concatenate([[0.0], np.cumsum(buckets["sum"].to_numpy())])
+
+        closes = opens + np.timedelta64(pd.Timedelta(step))
+        hi = np.searchsorted(starts, closes - np.timedelta64(BUCKET), side="right")
+        lo = np.searchsorted(starts, closes - np.timedelta64(WINDOW), side="left")
+        count = cum_count[hi] - cum_count[lo]
+        total = cum_sum[hi] - cum_sum[lo]
+        return np.divide(total, count, out=np.zeros(len(opens)), where=count > 0)
+
+    def series(self, start=None, end=None):
+        """Per-bucket mean/std plus the rolling WINDOW mean/std/count (for analysis and dashboards)."""
+        df = self.buckets().set_index("bucket")
+        rolling = df[AGG_COLUMNS].rolling(WINDOW).sum()
+        out = pd.DataFrame(index=df.index)
+        out["count"] = df["count"]
+        out["mean"] = df["sum"] / df["count"]
+        out["std"] = np.sqrt((df["sumsq"] / df["count"] - out["mean"] ** 2).clip(lower=0))
+        out["rolling_count"] = rolling["count"]
+        out["rolling_mean"] = rolling["sum"] / rolling["count"]
+        out["rolling_std"] = np.sqrt((rolling["sumsq"] / rolling["count"] - out["rolling_mean"] ** 2).clip(lower=0))
+        if start is not None:
+            out = out[out.index >= pd.Timestamp(start)]
+        if end is not None:
+            out = out[out.index < pd.Timestamp(end)]
+        return out.reset_index()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_sentiment_store(source="twitter"):
+    with _stores_lock:
+        if source not in _stores:
+            _stores[source] = SentimentStore(source)
+        return _stores[source]
@@ -0,0 +1,114 @@
+# src/synthetic_data.py — Deterministic synthetic candles, logs and a fixture model (offline use)
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.utils import timeframe_to_seconds
+
+FEATURES = ['rsi_14', 'ema_21', 'macd', 'sentiment']
+
+
+# === OHLCV ===
+def generate_ohlcv(n=10_000, start="2024-01-01", timeframe="5m", seed=42,
+                   start_price=30_000.0, volatility=0.002):
+    """Geometric random walk candles with consistent open/high/low/close/volume."""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    wick = np.abs(rng.normal(0, volatility / 2, n)) * close
+
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=n, freq=pd.Timedelta(seconds=timeframe_to_seconds(timeframe))),
+        "open": open_,
+        "high": np.maximum(open_, close) + wick,
+        "low": np.minimum(open_, close) - wick,
+        "close": close,
+        "volume": rng.lognormal(3, 0.5, n),
+    })
+
+
+# === Logs (same schemas as init_log_files) ===
+def _timestamps_ending_now(n, step_seconds):
+    end = pd.Timestamp(datetime.utcnow()).floor("s")
+    return pd.date_range(end=end, periods=n, freq=pd.Timedelta(seconds=step_seconds))
+
+def generate_confidence_log(n=10_000, seed=7):
+    rng = np.random.default_rng(seed)
+    confidence = rng.uniform(0, 1, n)
+    signal = np.where(confidence > 0.7, "LONG", np.where(confidence < 0.3, "SHORT", "FILTERED"))
+    return pd.DataFrame({
+        "timestamp": _timestamps_ending_now(n, 300).strftime("%Y-%m-%d %H:%M:%S"),
+        "signal": signal,
+        "confidence": confidence.round(4),
+        "rsi": rng.uniform(10, 90, n).round(2),
+        "price": (30_000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))).round(2),
+        "source": "live",
+    })
+
+def generate_virtual_positions(n=10_000, seed=11, start_balance=10_000.0):
+    rng = np.random.default_rng(seed)
+    exit_time = _timestamps_ending_now(n, 900)
+    pnl_percent = rng.normal(0.05, 0.8, n).round(2)
+    entry_price = (30_000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))).round(2)
+    return pd.DataFrame({
+        "timestamp": exit_time,
+        "entry_time": exit_time - pd.Timedelta(minutes=15),
+        "signal": rng.choice(["LONG", "SHORT"], n),
+        "entry_price": entry_price,
+        "exit_price": (entry_price * (1 + pnl_percent / 100)).round(2),
+        "pnl_percent": pnl_percent,
+        "balance_after": (start_balance * np.cumprod(1 + pnl_percent / 100)).round(2),
+    })
+
+
+# === Tweets (sentiment scoring fixtures) ===
+_POSITIVE = ["bullish", "great", "moon", "strong", "breakout", "love", "pumping", "amazing", "winning", "solid"]
+_NEGATIVE = ["bearish", "terrible", "crash", "weak", "dump", "hate", "scam", "awful", "losing", "panic"]
+_NEUTRAL = ["BTC", "bitcoin", "price", "chart", "futures", "market", "today", "volume", "funding", "ETF"]
+
+def generate_tweet_corpus(n=10_000, seed=3, duplicate_rate=0.2):
+    """Short crypto-flavoured tweets; `duplicate_rate` of them repeat earlier ones (retweets/spam)."""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for i in range(n):
+        if texts and rng.random() < duplicate_rate:
+            texts.append(texts[rng.integers(len(texts))])
+            continue
+        mood = _POSITIVE if rng.random() < 0.5 else _NEGATIVE
+        words = list(rng.choice(_NEUTRAL, rng.integers(4, 12))) + list(rng.choice(mood, rng.integers(1, 4)))
+        rng.shuffle(words)
+        texts.append(f"{' '.join(words)} ${int(rng.integers(20_000, 80_000))} #{i}")
+    return texts
+
+
+# === Fixture model ===
+def build_fixture_artifacts(models_dir="models", window_size=10, seed=0):
+    """
+    Save a tiny untrained LSTM + a scaler fitted on synthetic features, and point
+    models/model_latest_path.txt at them. Returns (model_path, scaler_path).
+    """
+    import joblib
+    import keras
+    from keras.layers import LSTM, Dense, Input
+    from keras.models import Sequential
+    from sklearn.preprocessing import MinMaxScaler
+    from src.feature_engineering import add_technical_indicators, merge_sentiment
+
+    keras.utils.set_random_seed(seed)
+    model = Sequential([Input(shape=(window_size, len(FEATURES))), LSTM(8), Dense(1, activation="sigmoid")])
+    model.compile(optimizer="adam", loss="binary_crossentropy")
+
+    df = merge_sentiment(add_technical_indicators(generate_ohlcv(2_000, seed=seed)))
+    scaler = MinMaxScaler().fit(df[FEATURES].dropna().values)
+
+    os.makedirs(models_dir, exist_ok=True)
+    model_path = os.path.join(models_dir, "fixture_model.keras")
+    scaler_path = os.path.join(models_dir, "fixture_scaler.save")
+    model.save(model_path)
+    joblib.dump(scaler, scaler_path)
+    with open(os.path.join(models_dir, "model_latest_path.txt"), "w") as f:
+        f.write(model_path)
+    return model_path, scaler_path
@@ -1,12 +1,290 @@
-# src/telegram_alerts.py
+# src/telegram_alerts.py — Queued, rate-limited Telegram alert dispatcher
 
-from telegram import Bot
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_API_URL
+
+ALERT_QUEUE_DIR = "logs/alert_queue"     # One <pid>.json of unsent alerts per process
+MIN_SEND_INTERVAL = 1.1      # Telegram allows ~1 message/sec per chat
+MAX_PER_MINUTE = 20          # ...and 20 messages/min into a group chat
+COALESCE_WINDOW = 2.0        # Quiet period that ends a burst before it is sent
+DEDUPE_WINDOW = 300          # Identical alerts sent within 5 min are dropped
+MAX_MESSAGE_LEN = 4096       # Telegram hard limit per message
+MAX_BACKOFF = 60             # Cap for retry backoff after send failures
+
+
+class AlertDispatcher:
+    """
+    Queues alerts and sends them from one background worker with a single bot session.
+    Bursts are coalesced into a digest, duplicates are merged and unsent alerts are persisted.
+
+    Each process (daemon, API, job children) persists only its own queue file, so no two
+    dispatchers ever send or overwrite the same alerts. A queue left behind by a process that
+    has exited is adopted by the next dispatcher to start.
+    """
+
+    def __init__(self, token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID,
+                 api_url=TELEGRAM_API_URL, queue_dir=ALERT_QUEUE_DIR, owner=None):
+        self.token = token
+        self.chat_id = chat_id
+        self.api_url = api_url.rstrip("/")
+        self.queue_dir = queue_dir
+        self.owner = owner or os.getpid()
+        self.queue_path = os.path.join(queue_dir, f"{self.owner}.json")
+
+        self._cond = threading.Condition()
+        self._pending = deque()          # [{"text", "count", "queued_at"}]
+        self._recently_sent = {}         # text -> last sent time (dedupe)
+        self._send_times = deque()       # send timestamps in the last minute
+        self._last_enqueue = 0.0
+        self._dirty = False              # Queue changed since it was last written
+        self._bot = None
+        self._worker = None
+        self._stopping = False
+
+        self._load_pending()
+
+    # === Public API ===
+    def enqueue(self, text):
+        now = time.time()
+        with self._cond:
+            for item in self._pending:
+                if item["text"] == text:
+                    item["count"] += 1
+                    break
+            else:
+                sent_at = self._recently_sent.get(text)
+                if sent_at and now - sent_at < DEDUPE_WINDOW:
+                    return False
+                self._pending.append({"text": text, "count": 1, "queued_at": now})
+
+            self._last_enqueue = now
+            self._dirty = True               # Written by the worker, not on the caller's path
+            self._cond.notify()
+
+        self._ensure_worker()
+        return True
+
+    def flush(self, timeout=30):
+        """Block until the queue is drained or the timeout expires."""
+        self._ensure_worker()
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._pending and time.time() < deadline:
+                self._cond.wait(timeout=0.1)
+            return not self._pending
+
+    def stop(self, timeout=10):
+        self.flush(timeout=timeout)
+        with self._cond:
+            self._stopping = True
+            self._persist()
+            self._cond.notify_all()
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending)
+
+    # === Worker ===
+    def _ensure_worker(self):
+        if self._worker and self._worker.is_alive():
+            return
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="telegram-alerts", daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        backoff = 1.0
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping and not self._pending:
+                    return
+
+                if self._dirty:
+                    self._persist()
+                # Let a burst settle so it goes out as one digest
+                while time.time() - self._last_enqueue < COALESCE_WINDOW and not self._stopping:
+                    self._cond.wait(timeout=COALESCE_WINDOW)
+
+                # Counts are snapshotted: repeats arriving while this batch is in flight stay queued
+                batch = [(item, dict(item)) for item in self._pending]
+
+            try:
+                for text, items in digest_chunks([copy for _, copy in batch]):
+                    self._wait_for_rate_limit()
+                    self._send(text)
+                    carried = {id(copy) for copy in items}
+                    self._mark_sent([(item, copy) for item, copy in batch if id(copy) in carried])
+                backoff = 1.0
+            except Exception as e:
+                # Chunks already delivered were dequeued; only the rest is retried
+                delay = getattr(e, "retry_after", None) or backoff
+                print(f"❌ Failed to send Telegram alert: {e} (retrying in {delay:.0f}s)")
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                self._backoff(delay)
+
+    def _backoff(self, delay):
+        # Sleep before a retry, still writing out alerts queued meanwhile
+        deadline = time.time() + delay
+        with self._cond:
+            while True:
+                if self._dirty:
+                    self._persist()
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return
+                self._cond.wait(timeout=remaining)
+
+    def _mark_sent(self, sent):
+        sent_at = time.time()
+        with self._cond:
+            for item, copy in sent:
+                item["count"] -= copy["count"]
+                if item["count"] <= 0:
+                    self._pending.remove(item)
+                self._recently_sent[item["text"]] = sent_at
+            self._recently_sent = {
+                text: ts for text, ts in self._recently_sent.items()
+                if sent_at - ts < DEDUPE_WINDOW
+            }
+            self._persist()
+            self._cond.notify_all()
+
+    def _wait_for_rate_limit(self):
+        now = time.time()
+        while self._send_times and now - self._send_times[0] > 60:
+            self._send_times.popleft()
+
+        wait = 0.0
+        if self._send_times:
+            wait = max(wait, MIN_SEND_INTERVAL - (now - self._send_times[-1]))
+        if len(self._send_times) >= MAX_PER_MINUTE:
+            wait = max(wait, 60 - (now - self._send_times[0]))
+        if wait > 0:
+            time.sleep(wait)
+
+    def _send(self, text):
+        if self._bot is None:
+            from telegram import Bot
+            self._bot = Bot(token=self.token, base_url=f"{self.api_url}/bot")
+        self._bot.send_message(chat_id=self.chat_id, text=text)
+        self._send_times.append(time.time())
+        print("📤 Telegram alert sent!")
+
+    # === Persistence (called with the condition held) ===
+    def _persist(self):
+        self._dirty = False
+        try:
+            os.makedirs(self.queue_dir, exist_ok=True)
+            if not self._pending:
+                if os.path.exists(self.queue_path):
+                    os.remove(self.queue_path)
+                return
+            tmp_path = self.queue_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(list(self._pending), f)
+            os.replace(tmp_path, self.queue_path)
+        except OSError as e:
+            print(f"⚠️ Could not persist alert queue: {e}")
+
+    def _load_pending(self):
+        # Our own file (a previous process with this pid) plus files of owners no longer running
+        if not os.path.isdir(self.queue_dir):
+            return
+        for name in sorted(os.listdir(self.queue_dir)):
+            owner, ext = os.path.splitext(name)
+            if ext != ".json" or not owner.isdigit():
+                continue
+            if int(owner) != self.owner and _process_alive(int(owner)):
+                continue
+            path = os.path.join(self.queue_dir, name)
+            claimed = os.path.join(self.queue_dir, f"{self.owner}.adopting-{owner}")
+            try:
+                os.replace(path, claimed)    # Atomic: only one starting dispatcher adopts a file
+            except OSError:
+                continue
+            try:
+                with open(claimed, "r") as f:
+                    self._merge(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not restore alert queue {name}: {e}")
+            self._persist()
+            os.remove(claimed)
+        if self._pending:
+            print(f"📬 Restored {len(self._pending)} unsent alert(s).")
+
+    def _merge(self, items):
+        for restored in items:
+            for item in self._pending:
+                if item["text"] == restored["text"]:
+                    item["count"] += restored["count"]
+                    break
+            else:
+                self._pending.append(restored)
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        return True                      # No cheap check: never adopt another process's queue
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def digest_chunks(batch):
+    """
+    Turn queued alerts into one message, or a digest split at Telegram's length limit:
+    [(message text, [the batch items it carries])], every item in exactly one message.
+    """
+    texts = [
+        item["text"] + (f"\n(×{item['count']})" if item["count"] > 1 else "")
+        for item in batch
+    ]
+    if len(texts) == 1:
+        return [(texts[0][:MAX_MESSAGE_LEN], list(batch))]
+
+    header = f"🗞️ Alert digest ({len(texts)} alerts)\n\n"
+    chunks, current, items = [], header, []
+    for item, text in zip(batch, texts):
+        block = text[:MAX_MESSAGE_LEN - len(header)] + "\n\n"
+        if items and len(current) + len(block) > MAX_MESSAGE_LEN:
+            chunks.append((current.rstrip(), items))
+            current, items = header, []
+        current += block
+        items.append(item)
+    chunks.append((current.rstrip(), items))
+    return chunks
+
+def build_digest(batch):
+    """Message texts only (see digest_chunks)."""
+    return [text for text, _ in digest_chunks(batch)]
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher()
+            atexit.register(_dispatcher.stop)
+        return _dispatcher
 
 def send_alert(message):
     try:
-        bot = Bot(token=TELEGRAM_BOT_TOKEN)
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
-        print("📤 Telegram alert sent!")
+        if get_dispatcher().enqueue(message):
+            print("📨 Telegram alert queued.")
     except Exception as e:
-        print(f"❌ Failed to send Telegram alert: {e}")
+        print(f"❌ Failed to queue Telegram alert: {e}")
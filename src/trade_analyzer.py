@@ -3,10 +3,35 @@
 import pandas as pd
 import os
 
+from src.aggregate_cache import get_aggregate_cache
+from src.analytics import BOOTSTRAP_CONFIDENCE, BOOTSTRAP_RESAMPLES, analyze_trades
+
 TRADE_LOG_PATH = "logs/virtual_positions.csv"
 SUMMARY_LOG_PATH = "logs/performance_summary.txt"
 
-def analyze_performance():
+def print_headline():
+    """Count, PnL and win rate from the running aggregates, without reading the trade log."""
+    m = get_aggregate_cache().total_stats()
+    if not m["trades"]:
+        print("⚠️ No trades to analyze.")
+        return
+    print(f"""
+📊 Trade Performance (headline)
+────────────────────────────
+📈 Total Trades:       {m['trades']}
+💰 Total PnL (%):      {m['total_pnl']:.2f}%
+🏆 Win Rate:           {m['win_rate']:.2f}%
+📊 Avg PnL:            {m['avg_pnl']:.2f}% (σ {m['std_pnl']:.2f}%)
+📊 Avg Win:            {m['avg_win']:.2f}%
+📉 Avg Loss:           {m['avg_loss']:.2f}%
+💼 Balance:            ${m['last_balance']:.2f}
+""")
+
+def analyze_performance(full=True):
+    # Drawdowns, ratios and intervals need the whole trade series; the headline does not
+    if not full:
+        return print_headline()
+
     if not os.path.exists(TRADE_LOG_PATH):
         print("⚠️ No trade log file found.")
         return
@@ -35,25 +60,29 @@ def analyze_performance():
             print("⚠️ No valid trade data after cleaning timestamps.")
             return
 
-        wins = df[df["pnl_percent"] > 0]
-        losses = df[df["pnl_percent"] < 0]
-        total_trades = len(df)
-        total_pnl = df["pnl_percent"].sum()
-        win_rate = len(wins) / total_trades * 100
-        avg_win = wins["pnl_percent"].mean() if not wins.empty else 0
-        avg_loss = losses["pnl_percent"].mean() if not losses.empty else 0
-        max_drawdown = df["pnl_percent"].min()
+        m = analyze_trades(df)
+        ci = m["bootstrap"]
+
+        def interval(name):
+            return f"  [{ci[name][0]:.2f}, {ci[name][1]:.2f}]" if name in ci else ""
 
         summary = f"""
 📊 Trade Performance Summary
 ────────────────────────────
-📈 Total Trades:       {total_trades}
-💰 Total PnL (%):      {total_pnl:.2f}%
-🏆 Win Rate:           {win_rate:.2f}%
-📊 Avg Win:            {avg_win:.2f}%
-📉 Avg Loss:           {avg_loss:.2f}%
-🔻 Max Drawdown:       {max_drawdown:.2f}%
+📈 Total Trades:       {m['trades']}
+💰 Total PnL (%):      {m['total_pnl']:.2f}%
+📈 Total Return:       {m['total_return']:.2f}%{interval('total_return')}
+🏆 Win Rate:           {m['win_rate']:.2f}%{interval('win_rate')}
+📊 Avg PnL:            {m['avg_pnl']:.2f}%{interval('avg_pnl')}
+📊 Avg Win:            {m['avg_win']:.2f}%
+📉 Avg Loss:           {m['avg_loss']:.2f}%
+🔻 Max Drawdown:       {m['max_drawdown']:.2f}%{interval('max_drawdown')} (longest {m['max_drawdown_days']:.1f} days under water)
+📐 Sharpe / Sortino:   {m['sharpe']:.2f} / {m['sortino']:.2f}
+🧗 CAGR / Calmar:      {m['cagr'] * 100:.2f}% / {m['calmar']:.2f}
+⏱️ Exposure:           {m['exposure']:.1f}% of the time in a position
+🔄 Turnover:           {m['turnover_per_year']:.1f}x equity per year
 
+Brackets: {BOOTSTRAP_CONFIDENCE:.0%} block-bootstrap intervals ({BOOTSTRAP_RESAMPLES} resamples)
 📝 Summary also saved to: {SUMMARY_LOG_PATH}
 """
 
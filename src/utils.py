@@ -1,14 +1,18 @@
 # src/utils.py
 
+import csv
 import os
-import pandas as pd
 from datetime import datetime, timedelta
 import time
 import functools
 import random
+from src import metrics
 
 # === Log predictions to CSV ===
-def log_prediction(signal, confidence, rsi, price, source="live"):
+# candle_time: open time of the last candle in the prediction window (the candle that was scored)
+def log_prediction(signal, confidence, rsi, price, source="live", candle_time=None):
+    import pandas as pd
+
     os.makedirs("logs", exist_ok=True)
     log_path = "logs/confidence_log.csv"
 
@@ -18,13 +22,56 @@ def log_prediction(signal, confidence, rsi, price, source="live"):
         "confidence": round(confidence, 4),
         "rsi": round(rsi, 2),
         "price": round(price, 2),
-        "source": source
+        "source": source,
+        "candle_time": pd.Timestamp(candle_time).strftime("%Y-%m-%d %H:%M:%S") if candle_time is not None else None
     }])
 
     if not os.path.exists(log_path):
         new_row.to_csv(log_path, index=False)
-    else:
-        new_row.to_csv(log_path, mode="a", header=False, index=False)
+        return
+    with open(log_path, "r") as f:
+        header = f.readline()
+    if "candle_time" not in header:
+        # One-time upgrade of a log written before candle_time existed (old rows left empty)
+        old = pd.read_csv(log_path)
+        old["candle_time"] = None
+        tmp_path = log_path + ".tmp"
+        old.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, log_path)
+    new_row.to_csv(log_path, mode="a", header=False, index=False)
+
+# === Last log line (optionally containing `contains`), read backwards from the end ===
+def read_last_line(path, contains=None, block_size=65536):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        rest = b""
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + rest).split(b"\n")
+            rest = lines.pop(0) if pos > 0 else b""   # Possibly cut: completed by the next block
+            for line in reversed(lines):
+                text = line.decode("utf-8", "replace")
+                if text.strip() and (contains is None or contains in text):
+                    return text.strip()
+    return None
+
+# === Timeframe helper: "5m" → 300, "1h" → 3600 ... ===
+def timeframe_to_seconds(timeframe):
+    units = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+# === ccxt URL overrides pointing Binance USDⓈ-M futures at another host (testnet, local simulator) ===
+def binance_futures_urls(base_url):
+    base = base_url.rstrip("/")
+    return {
+        "fapiPublic": f"{base}/fapi/v1", "fapiPublicV2": f"{base}/fapi/v2", "fapiPublicV3": f"{base}/fapi/v3",
+        "fapiPrivate": f"{base}/fapi/v1", "fapiPrivateV2": f"{base}/fapi/v2", "fapiPrivateV3": f"{base}/fapi/v3",
+        "fapiData": f"{base}/futures/data",
+    }
 
 # === Retry Decorator for Robustness ===
 def retry(max_attempts=3, delay=2, backoff=2, jitter=True, logger=None):
@@ -38,6 +85,7 @@ def retry(max_attempts=3, delay=2, backoff=2, jitter=True, logger=None):
                     return func(*args, **kwargs)
                 except Exception as e:
                     attempts += 1
+                    metrics.inc("retry_attempts_total", func=func.__name__)
                     msg = f"⚠️ Attempt {attempts} failed: {e}"
                     print(msg) if not logger else logger(msg)
                     if attempts == max_attempts:
@@ -68,7 +116,7 @@ def init_log_files():
     confidence_path = "logs/confidence_log.csv"
     if not os.path.exists(confidence_path) or os.path.getsize(confidence_path) == 0:
         with open(confidence_path, "w") as f:
-            f.write("timestamp,signal,confidence,rsi,price,source\n")
+            f.write("timestamp,signal,confidence,rsi,price,source,candle_time\n")
 
     # Trade Log
     trade_log_path = "logs/trade_log.csv"
@@ -88,43 +136,31 @@ def inject_virtual_trade_test_row():
     if not os.path.exists(path):
         return
     try:
-        df = pd.read_csv(path)
-        if df.shape[0] == 0:
+        # Cheap emptiness check (header only) so startup doesn't need pandas
+        with open(path, "r") as f:
+            f.readline()
+            has_rows = bool(f.readline().strip())
+        if not has_rows:
             now = datetime.utcnow()
-            test_row = pd.DataFrame([{
-                "timestamp": now,
-                "entry_time": now - timedelta(minutes=15),
-                "signal": "LONG",
-                "entry_price": 26000,
-                "exit_price": 26300,
-                "pnl_percent": 1.15,
-                "balance_after": 10115.0
-            }])
-            test_row.to_csv(path, mode="a", header=False, index=False)
+            with open(path, "a", newline="") as f:
+                csv.writer(f).writerow([now, now - timedelta(minutes=15), "LONG", 26000, 26300, 1.15, 10115.0])
             print("✅ Inserted test row into virtual_positions.csv.")
     except Exception as e:
         print(f"⚠️ Could not insert test row: {e}")
 
 # === Daily Summary Log ===
 def generate_daily_summary_log():
-    try:
-        df = pd.read_csv("logs/virtual_positions.csv")
-        if df.empty:
-            print("📭 No virtual position data found.")
-            return
+    from src.aggregate_cache import get_aggregate_cache
 
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    try:
         today = datetime.utcnow().date()
-        today_trades = df[df['timestamp'].dt.date == today]
-
-        if today_trades.empty:
+        stats = get_aggregate_cache().trade_stats(days=1, end=today)
+        if not stats["trades"]:
             print("📭 No trades today to summarize.")
             return
 
-        avg_pnl = today_trades['pnl_percent'].mean()
-        win_rate = (today_trades['pnl_percent'] > 0).mean() * 100
-        trades = len(today_trades)
-        balance_end = today_trades['balance_after'].iloc[-1]
+        avg_pnl, win_rate, trades = stats["avg_pnl"], stats["win_rate"], stats["trades"]
+        balance_end = stats["last_balance"]
 
         summary = f"""
 📘 Daily Summary Log ({today})
@@ -1,19 +1,148 @@
 # test_telegram.py
+#
+# python test_telegram.py          → send a real message through the configured bot
+# python test_telegram.py --fake   → exercise the alert dispatcher against a local fake Bot API
+# python -m pytest test_telegram.py → the same fake checks under pytest
 
-from telegram import Bot
+import json
 import os
-from dotenv import load_dotenv
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-load_dotenv()
+from src.telegram_alerts import AlertDispatcher, MIN_SEND_INTERVAL
+from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
-bot = Bot(token=os.getenv("TELEGRAM_BOT_TOKEN"))
-chat_id = os.getenv("TELEGRAM_CHAT_ID")
 
-try:
-    bot.send_message(chat_id=chat_id, text="✅ Telegram test message from CryptoFuturesML!")
-    print("✅ Telegram message sent successfully.")
-except Exception as e:
-    print(f"❌ Telegram test failed: {e}")
+# === Fake Telegram Bot API (sendMessage only) ===
+class FakeBotAPI(BaseHTTPRequestHandler):
+    received = []            # (time, text)
+    throttle_next = 1        # Number of upcoming requests answered with 429
 
-print("Bot Token:", bot.token)
-print("Chat ID:", chat_id)
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            from urllib.parse import parse_qs
+            payload = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+
+        if not self.path.endswith("/sendMessage"):
+            return self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+        if FakeBotAPI.throttle_next > 0:
+            FakeBotAPI.throttle_next -= 1
+            return self._reply(429, {
+                "ok": False, "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            })
+
+        FakeBotAPI.received.append((time.time(), payload.get("text", "")))
+        self._reply(200, {"ok": True, "result": {
+            "message_id": len(FakeBotAPI.received),
+            "date": int(time.time()),
+            "chat": {"id": int(payload.get("chat_id", 1)), "type": "private"},
+            "text": payload.get("text", ""),
+        }})
+
+    def _reply(self, status, data):
+        raw = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_fake_checks():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBotAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_port}"
+    queue_dir = tempfile.mkdtemp()
+    token = "123456:FAKE"
+
+    # 1️⃣ Burst + duplicate → one digest, after surviving a 429
+    dispatcher = AlertDispatcher(token=token, chat_id="1", api_url=api_url, queue_dir=queue_dir)
+    for i in range(5):
+        dispatcher.enqueue(f"Alert {i}")
+    dispatcher.enqueue("Alert 0")
+    assert dispatcher.flush(timeout=15), "queue did not drain"
+    assert len(FakeBotAPI.received) == 1, FakeBotAPI.received
+    digest = FakeBotAPI.received[0][1]
+    assert "Alert digest (5 alerts)" in digest and "(×2)" in digest, digest
+    print("✅ Burst coalesced into one digest with merged duplicate (after a 429).")
+
+    # 2️⃣ Recently sent duplicates are dropped
+    assert dispatcher.enqueue("Alert 3") is False
+    print("✅ Recently sent duplicate dropped.")
+
+    # 3️⃣ Per-chat spacing between consecutive sends
+    dispatcher.enqueue("Spacing A")
+    dispatcher.flush(timeout=15)
+    dispatcher.enqueue("Spacing B")
+    dispatcher.flush(timeout=15)
+    gap = FakeBotAPI.received[-1][0] - FakeBotAPI.received[-2][0]
+    assert gap >= MIN_SEND_INTERVAL, gap
+    print(f"✅ Rate limit respected ({gap:.2f}s between sends).")
+
+    # 4️⃣ Unsent alerts survive a restart
+    offline_dir = tempfile.mkdtemp()
+    offline = AlertDispatcher(token=token, chat_id="1", api_url="http://127.0.0.1:9", queue_dir=offline_dir)
+    offline.enqueue("Survives restart")
+    time.sleep(0.2)
+    restarted = AlertDispatcher(token=token, chat_id="1", api_url=api_url, queue_dir=offline_dir)
+    assert restarted.pending_count() == 1
+    assert restarted.flush(timeout=15)
+    assert FakeBotAPI.received[-1][1] == "Survives restart"
+    print("✅ Persisted alert delivered after restart.")
+
+    # 5️⃣ A second process never takes a running process's queue; an exited one's is adopted
+    shared_dir = tempfile.mkdtemp()
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    running = AlertDispatcher(token=token, chat_id="1", api_url="http://127.0.0.1:9", queue_dir=shared_dir)
+    running.enqueue("Owned by a running process")
+    crashed = AlertDispatcher(token=token, chat_id="1", api_url="http://127.0.0.1:9", queue_dir=shared_dir,
+                              owner=exited.pid)
+    crashed.enqueue("Left behind by an exited process")
+    time.sleep(0.2)                                  # Queues are written by the workers
+    child = AlertDispatcher(token=token, chat_id="1", api_url=api_url, queue_dir=shared_dir, owner=exited.pid + 1)
+    assert child.pending_count() == 1, child.pending_count()
+    assert child.flush(timeout=15)
+    assert FakeBotAPI.received[-1][1] == "Left behind by an exited process"
+    assert running.pending_count() == 1 and os.path.exists(running.queue_path)
+    print("✅ Running process's queue left alone; exited process's queue adopted and delivered once.")
+
+    server.shutdown()
+
+
+def test_dispatcher_against_fake_bot_api():
+    import pytest
+    pytest.importorskip("telegram")
+    run_fake_checks()
+
+
+def run_live_check():
+    dispatcher = AlertDispatcher()
+    dispatcher.enqueue("✅ Telegram test message from CryptoFuturesML!")
+    if dispatcher.flush(timeout=30):
+        print("✅ Telegram message sent successfully.")
+    else:
+        print("❌ Telegram test failed: message still queued.")
+
+    print("Bot Token:", TELEGRAM_BOT_TOKEN)
+    print("Chat ID:", TELEGRAM_CHAT_ID)
+
+
+if __name__ == "__main__":
+    if "--fake" in sys.argv:
+        run_fake_checks()
+    else:
+        run_live_check()